@@ -1,6 +1,8 @@
 from typing import Optional
 import asyncio
+import copy
 import json
+import time
 
 from agno.agent import Agent
 from agno.run.response import RunEvent
@@ -14,36 +16,61 @@ from pipecat.frames.frames import (
     LLMFullResponseStartFrame,
     LLMMessagesFrame,
     LLMTextFrame,
+    MetricsFrame,
     StartFrame,
     StartInterruptionFrame,
     FunctionCallInProgressFrame,
     FunctionCallResultFrame,
 )
+from pipecat.metrics.metrics import LLMTokenUsage
 from pipecat.processors.frame_processor import FrameDirection
 from pipecat.services.ai_services import LLMService
 from loguru import logger
 
+from history import ConversationHistory, message_text
+from hedging import HedgedStream, HedgingPolicy
+from routing import ModelRouter, RouteMetricsData
+from tool_cache import ToolCacheMetricsData, ToolResultCache
+from tool_trace import ToolTrace
+
 
 class AgentLLM(LLMService):
     """AgentLLM service that integrates Agno agents with Pipecat.
 
     This service uses Agno Agent to process LLM messages and run the agent in an async task.
     It handles interruptions by canceling the running task and properly propagates tool calls.
-    The Agno agent itself manages history and context.
+    The Agno agent itself manages history and context, unless a ConversationHistory
+    is given, in which case the service replays a bounded history on every turn.
+    A ToolTrace, if given, records every tool call the service sees.
     """
 
     def __init__(
         self,
         *,
         agent: Agent,
+        history: Optional[ConversationHistory] = None,
+        tool_cache: Optional[ToolResultCache] = None,
+        hedging: Optional[HedgingPolicy] = None,
+        router: Optional[ModelRouter] = None,
+        tool_trace: Optional[ToolTrace] = None,
         **kwargs,
     ):
         super().__init__(**kwargs)
         self._agent = agent
+        self._history = history
+        self._tool_cache = tool_cache
+        self._hedging = hedging
+        self._router = router
+        self._tool_trace = tool_trace
+        self._backup_agent: Optional[Agent] = None
         self._model_name = agent.model.id if agent.model else "unknown"
         self.set_model_name(self._model_name)
         self._llm_task: Optional[asyncio.Task] = None
 
+        # Per-session prompt cache accounting
+        self._prompt_tokens = 0
+        self._cached_prompt_tokens = 0
+
     def can_generate_metrics(self) -> bool:
         return True
 
@@ -58,6 +85,12 @@ class AgentLLM(LLMService):
         await super().stop(frame)
         # Cancel any ongoing tasks
         await self._cancel_llm_task()
+        if self._hedging:
+            logger.info(
+                f"{self} Hedged requests: {self._hedging.hedges_sent} sent, {self._hedging.hedges_won} won"
+            )
+        if self._router:
+            self._router.log_stats()
 
     async def _cancel_llm_task(self):
         """Cancel the LLM task if it exists."""
@@ -105,10 +138,25 @@ class AgentLLM(LLMService):
             # Start TTFB metrics
             await self.start_ttfb_metrics()
 
+            user_text = " ".join(message_text(m) for m in frame.messages)
+            route = None
+            if self._router:
+                route = self._router.classify(user_text)
+                self._agent.model = self._router.model_for(route)
+                self.set_model_name(self._agent.model.id)
+                logger.debug(
+                    f"{self} Routing turn to {route} model {self._agent.model.id}"
+                )
+
+            frame_messages = frame.messages
+            if self._history:
+                self._history.start_turn(user_text)
+                frame_messages = self._history.build_messages(frame.messages)
+
             # Convert messages to Agno Message objects if they're not already
             # This provides better compatibility with the Agno Agent
             messages = []
-            for msg in frame.messages:
+            for msg in frame_messages:
                 if isinstance(msg, dict):
                     # Use Message.from_dict if available, or just pass the dict
                     try:
@@ -123,13 +171,33 @@ class AgentLLM(LLMService):
             logger.debug(f"{self} Running agent with messages: {messages}")
 
             # Pass the processed messages to agent.arun()
-            response_iter = await self._agent.arun(messages=messages, stream=True)
+            hedged_stream = None
+            if self._hedging:
+                hedged_stream = HedgedStream(
+                    lambda: self._agent.arun(messages=messages, stream=True),
+                    lambda: self._start_backup_run(messages),
+                    self._hedging,
+                    is_first_token=_is_first_token,
+                )
+                response_iter = hedged_stream
+            else:
+                response_iter = await self._agent.arun(messages=messages, stream=True)
+
+            # Agno reports every tool call of the run on each event, so only
+            # push frames for the ones we haven't seen yet
+            started_tool_calls = set()
+            completed_tool_calls = set()
+            run_started = time.monotonic()
+            ttfb = None
 
             async for response in response_iter:
                 logger.debug(f"Received response from agent: {response}")
 
-                # Stop TTFB metrics after the first response
-                await self.stop_ttfb_metrics()
+                # Stop TTFB metrics at the first text or tool call, agno emits
+                # bookkeeping events such as RunStarted before that
+                if ttfb is None and _is_first_token(response):
+                    ttfb = time.monotonic() - run_started
+                    await self.stop_ttfb_metrics()
 
                 # Handle different response events from the Agno agent
                 if response.event == RunEvent.run_response.value:
@@ -139,80 +207,97 @@ class AgentLLM(LLMService):
                         logger.debug(
                             f"Pushing LLMTextFrame with content: {response.content}"
                         )
+                        if self._history:
+                            self._history.add_assistant_text(response.content)
                         await self.push_frame(LLMTextFrame(response.content))
 
                 elif response.event == RunEvent.tool_call_started.value:
                     logger.debug("Processing ToolCallStarted event")
                     # Handle tool call started events - push frames both ways
-                    if response.tools:
-                        for tool_call in response.tools:
-                            function_name = tool_call.get("tool_name", "unknown")
-                            tool_call_id = tool_call.get("tool_call_id", "unknown")
-                            arguments = tool_call.get("function", {}).get(
-                                "arguments", "{}"
-                            )
-
-                            # Parse arguments if they're a string
-                            if isinstance(arguments, str):
-                                try:
-                                    arguments = json.loads(arguments)
-                                except json.JSONDecodeError:
-                                    logger.warning(
-                                        f"Failed to parse arguments: {arguments}"
-                                    )
-
-                            # Push frame both upstream and downstream
-                            progress_frame = FunctionCallInProgressFrame(
-                                function_name=function_name,
-                                tool_call_id=tool_call_id,
-                                arguments=arguments,
-                                cancel_on_interruption=True,
-                            )
-                            logger.debug(
-                                f"Pushing FunctionCallInProgressFrame for tool caall: {function_name},{tool_call_id},{arguments}"
-                            )
-                            await self.push_frame(
-                                progress_frame, FrameDirection.DOWNSTREAM
-                            )
-                            await self.push_frame(
-                                progress_frame, FrameDirection.UPSTREAM
-                            )
+                    for tool_call in response.tools or []:
+                        function_name = tool_call.get("tool_name", "unknown")
+                        tool_call_id = tool_call.get("tool_call_id", "unknown")
+                        if tool_call_id in started_tool_calls:
+                            continue
+                        started_tool_calls.add(tool_call_id)
+                        arguments = _tool_call_arguments(tool_call)
+                        if self._tool_trace:
+                            self._tool_trace.started(tool_call_id)
+
+                        # Push frame both upstream and downstream
+                        progress_frame = FunctionCallInProgressFrame(
+                            function_name=function_name,
+                            tool_call_id=tool_call_id,
+                            arguments=arguments,
+                            cancel_on_interruption=True,
+                        )
+                        logger.debug(
+                            f"Pushing FunctionCallInProgressFrame for tool caall: {function_name},{tool_call_id},{arguments}"
+                        )
+                        await self.push_frame(progress_frame, FrameDirection.DOWNSTREAM)
+                        await self.push_frame(progress_frame, FrameDirection.UPSTREAM)
 
                 elif response.event == RunEvent.tool_call_completed.value:
                     logger.debug("Processing ToolCallCompleted event")
                     # Handle tool call completed events - push frames both ways
-                    if response.tools:
-                        for tool_call in response.tools:
-                            function_name = tool_call.get("tool_name", "unknown")
-                            tool_call_id = tool_call.get("tool_call_id", "unknown")
-                            arguments = tool_call.get("function", {}).get(
-                                "arguments", "{}"
-                            )
-                            result = tool_call.get("content", "")
-
-                            # Parse arguments if they're a string
-                            if isinstance(arguments, str):
-                                try:
-                                    arguments = json.loads(arguments)
-                                except json.JSONDecodeError:
-                                    logger.warning(
-                                        f"Failed to parse arguments: {arguments}"
-                                    )
-
-                            # Push frame both upstream and downstream
-                            result_frame = FunctionCallResultFrame(
-                                function_name=function_name,
-                                tool_call_id=tool_call_id,
-                                arguments=arguments,
-                                result=result,
+                    for tool_call in response.tools or []:
+                        function_name = tool_call.get("tool_name", "unknown")
+                        tool_call_id = tool_call.get("tool_call_id", "unknown")
+                        # Calls that have only started don't carry a result yet
+                        if (
+                            "tool_call_error" not in tool_call
+                            or tool_call_id in completed_tool_calls
+                        ):
+                            continue
+                        completed_tool_calls.add(tool_call_id)
+                        arguments = _tool_call_arguments(tool_call)
+                        result = tool_call.get("content", "")
+
+                        if self._history:
+                            self._history.record_tool_call(
+                                function_name, arguments, str(result)
                             )
-                            logger.debug(
-                                f"Pushing FunctionCallResultFrame with result: {result}"
-                            )
-                            await self.push_frame(
-                                result_frame, FrameDirection.DOWNSTREAM
+
+                        # Push frame both upstream and downstream
+                        result_frame = FunctionCallResultFrame(
+                            function_name=function_name,
+                            tool_call_id=tool_call_id,
+                            arguments=arguments,
+                            result=result,
+                        )
+                        logger.debug(
+                            f"Pushing FunctionCallResultFrame with result: {result}"
+                        )
+                        await self.push_frame(result_frame, FrameDirection.DOWNSTREAM)
+                        await self.push_frame(result_frame, FrameDirection.UPSTREAM)
+
+                        cache_hit = (
+                            self._tool_cache.was_hit(function_name, arguments)
+                            if self._tool_cache
+                            else None
+                        )
+                        if self._tool_trace:
+                            self._tool_trace.completed(
+                                tool_call_id,
+                                function_name,
+                                arguments,
+                                result,
+                                cached=cache_hit,
                             )
-                            await self.push_frame(result_frame, FrameDirection.UPSTREAM)
+                        await self._report_tool_cache_usage(function_name, cache_hit)
+
+            if self._history:
+                self._history.end_turn()
+
+            prompt_tokens, completion_tokens = await self._report_token_usage(
+                self._backup_agent
+                if hedged_stream and hedged_stream.winner == 1
+                else self._agent
+            )
+            if self._router:
+                await self._report_route_usage(
+                    route, ttfb, prompt_tokens, completion_tokens
+                )
 
             # Signal end metrics and end of response
             logger.debug("Ending LLM response processing...")
@@ -229,3 +314,143 @@ class AgentLLM(LLMService):
             logger.exception(f"Error processing LLM messages: {e}")
             await self.push_error(ErrorFrame(f"Error processing LLM messages: {e}"))
             await self.push_frame(LLMFullResponseEndFrame())
+
+    async def _start_backup_run(self, messages: list):
+        """Run the same turn on a throwaway copy of the agent for a hedged request.
+
+        The copy shares tools and tool hooks but has its own model state. Its run is
+        not written back to the primary agent's memory, so hedging expects the
+        history to be kept by a ConversationHistory.
+
+        The model is a shallow copy, so the backup request goes out on the pooled
+        http_client (ComponentPool.openai_chat) over a warm connection; a deep
+        copy would carry a client of its own that is never closed.
+        """
+        model = copy.copy(self._agent.model)
+        model.clear()
+        self._backup_agent = self._agent.deep_copy(
+            update={
+                "model": model,
+                "tools": self._agent.tools,
+                "tool_hooks": self._agent.tool_hooks,
+            }
+        )
+        messages = [
+            m.model_copy(deep=True) if isinstance(m, Message) else m for m in messages
+        ]
+        return await self._backup_agent.arun(messages=messages, stream=True)
+
+    async def _report_token_usage(self, agent: Agent):
+        """Report cached versus uncached prompt tokens for the turn that just finished."""
+        run_response = getattr(agent, "run_response", None)
+        metrics = getattr(run_response, "metrics", None) or {}
+
+        prompt_tokens = _sum_metric(metrics.get("input_tokens")) or _sum_metric(
+            metrics.get("prompt_tokens")
+        )
+        completion_tokens = _sum_metric(metrics.get("output_tokens")) or _sum_metric(
+            metrics.get("completion_tokens")
+        )
+        cached_tokens = _sum_metric(metrics.get("cached_tokens"))
+        if not cached_tokens:
+            # Older OpenAI usage payloads only carry prompt_tokens_details
+            details = metrics.get("prompt_tokens_details") or []
+            if isinstance(details, dict):
+                details = [details]
+            cached_tokens = sum((d or {}).get("cached_tokens", 0) or 0 for d in details)
+
+        if not prompt_tokens:
+            return 0, 0
+
+        self._prompt_tokens += prompt_tokens
+        self._cached_prompt_tokens += cached_tokens
+        logger.info(
+            f"{self} Prompt tokens this turn: {prompt_tokens} "
+            f"(cached: {cached_tokens}, uncached: {prompt_tokens - cached_tokens}); "
+            f"session cache hit rate: {self._cached_prompt_tokens / self._prompt_tokens:.0%}"
+        )
+        await self.start_llm_usage_metrics(
+            LLMTokenUsage(
+                prompt_tokens=prompt_tokens,
+                completion_tokens=completion_tokens,
+                total_tokens=prompt_tokens + completion_tokens,
+                cache_read_input_tokens=cached_tokens,
+            )
+        )
+        return prompt_tokens, completion_tokens
+
+    async def _report_route_usage(
+        self,
+        route: str,
+        ttfb: Optional[float],
+        prompt_tokens: int,
+        completion_tokens: int,
+    ):
+        """Record per-route TTFB and token usage for the turn that just finished."""
+        self._router.record(route, ttfb, prompt_tokens, completion_tokens)
+        if not self.metrics_enabled:
+            return
+        await self.push_frame(
+            MetricsFrame(
+                data=[
+                    RouteMetricsData(
+                        processor=self.name,
+                        model=self._agent.model.id,
+                        route=route,
+                        ttfb=ttfb,
+                        prompt_tokens=prompt_tokens,
+                        completion_tokens=completion_tokens,
+                    )
+                ]
+            )
+        )
+
+    async def _report_tool_cache_usage(self, function_name: str, hit: Optional[bool]):
+        """Report whether a completed tool call was answered from the session cache."""
+        if hit is None or not self.metrics_enabled:
+            return
+        await self.push_frame(
+            MetricsFrame(
+                data=[
+                    ToolCacheMetricsData(
+                        processor=self.name,
+                        model=self._model_name,
+                        tool=function_name,
+                        hit=hit,
+                        hits=self._tool_cache.hits,
+                        misses=self._tool_cache.misses,
+                    )
+                ]
+            )
+        )
+
+
+def _is_first_token(response) -> bool:
+    """Whether an agno run event carries the first text or tool call of a response."""
+    if response.event == RunEvent.run_response.value:
+        return isinstance(response.content, str) and bool(response.content)
+    return response.event == RunEvent.tool_call_started.value
+
+
+def _tool_call_arguments(tool_call: dict) -> dict:
+    """Get the parsed arguments of an Agno tool call dict."""
+    arguments = tool_call.get("tool_args")
+    if arguments is None:
+        arguments = tool_call.get("function", {}).get("arguments", "{}")
+
+    # Parse arguments if they're a string
+    if isinstance(arguments, str):
+        try:
+            arguments = json.loads(arguments)
+        except json.JSONDecodeError:
+            logger.warning(f"Failed to parse arguments: {arguments}")
+    return arguments
+
+
+def _sum_metric(value) -> int:
+    """Agno aggregates run metrics as one value per model call; sum them up."""
+    if value is None:
+        return 0
+    if isinstance(value, (list, tuple)):
+        return sum(v or 0 for v in value)
+    return int(value)
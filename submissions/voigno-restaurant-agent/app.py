@@ -1,9 +1,23 @@
-import json
 import modal
 from loguru import logger
 
 MAX_SESSION_TIME = 15 * 60
+# Resources of a websocket container and the calls it carries. Modal routes up
+# to MAX_CALLS_PER_CONTAINER calls to a container and scales out when they
+# average TARGET_CALLS_PER_CONTAINER; server.py's SessionManager enforces the
+# same maximum and also turns calls away when CPU, memory or event loop lag run
+# out (see /metrics).
+CONTAINER_CPU = 0.125
+CONTAINER_MEMORY_MB = 300
+MAX_CALLS_PER_CONTAINER = 4
+TARGET_CALLS_PER_CONTAINER = 3
+# Recordings S3 couldn't take before their container stopped, one subdirectory
+# per container; uploaded by upload_spilled_recordings
+RECORDING_SPILL_DIR = "/recording_spill"
 app = modal.App("rest-book-bot")
+recording_spill = modal.Volume.from_name(
+    "rest-book-bot-recording-spill", create_if_missing=True
+)
 
 # Create Modal image with all dependencies and include bot.py
 image = (
@@ -15,7 +29,29 @@ image = (
     .add_local_file("audio_s3.py", "/root/audio_s3.py")
     .add_local_file("agent_response.py", "/root/agent_response.py")
     .add_local_file("agnoagentservice.py", "/root/agnoagentservice.py")
-    .add_local_file("restraunt_data.py", "/root/restraunt_data.py")
+    .add_local_file("restaurant_data.py", "/root/restaurant_data.py")
+    .add_local_file("restaurant_config.py", "/root/restaurant_config.py")
+    .add_local_file("prompts.py", "/root/prompts.py")
+    .add_local_file("history.py", "/root/history.py")
+    .add_local_file("tool_cache.py", "/root/tool_cache.py")
+    .add_local_file("hedging.py", "/root/hedging.py")
+    .add_local_file("routing.py", "/root/routing.py")
+    .add_local_file("faq_cache.py", "/root/faq_cache.py")
+    .add_local_file("audio_cache.py", "/root/audio_cache.py")
+    .add_local_file("telephony.py", "/root/telephony.py")
+    .add_local_file("recording_codecs.py", "/root/recording_codecs.py")
+    .add_local_file("upload_queue.py", "/root/upload_queue.py")
+    .add_local_file("component_pool.py", "/root/component_pool.py")
+    .add_local_file("connections.py", "/root/connections.py")
+    .add_local_file("server.py", "/root/server.py")
+    .add_local_file("session_manager.py", "/root/session_manager.py")
+    .add_local_file("turn_latency.py", "/root/turn_latency.py")
+    .add_local_file("frame_profiler.py", "/root/frame_profiler.py")
+    .add_local_file("loop_watchdog.py", "/root/loop_watchdog.py")
+    .add_local_file("tool_trace.py", "/root/tool_trace.py")
+    # Imported by bot.py when LOCAL_PROVIDERS=1
+    .add_local_file("local_providers.py", "/root/local_providers.py")
+    .add_local_file("stub_model.py", "/root/stub_model.py")
 )
 
 
@@ -30,9 +66,14 @@ image = (
 )
 @modal.asgi_app()
 def twiml_endpoint():
-    from fastapi import FastAPI
+    from fastapi import FastAPI, Request
     from fastapi.responses import HTMLResponse
     from fastapi.middleware.cors import CORSMiddleware
+    from telephony import render_stream_twiml, stream_parameters_from_webhook
+
+    # Read the TwiML template once per container instead of on every call
+    with open("/root/templates/streams.xml", "r") as file:
+        twiml_template = file.read()
 
     web_app = FastAPI()
     web_app.add_middleware(
@@ -44,63 +85,86 @@ def twiml_endpoint():
     )
 
     @web_app.post("/twiml")
-    async def start_call():
+    async def start_call(request: Request):
         logger.info("POST TwiML received")
-        # Read the TwiML template
-        with open("/root/templates/streams.xml", "r") as file:
-            return HTMLResponse(
-                content=file.read(),
-                media_type="application/xml",
-            )
+        # Pass the caller's number on to the media stream
+        parameters = stream_parameters_from_webhook(await request.body())
+        return HTMLResponse(
+            content=render_stream_twiml(twiml_template, parameters),
+            media_type="application/xml",
+        )
 
     return web_app
 
 
-# WebSocket endpoint function with increased resources to handle bot processing
-@app.function(
+# WebSocket endpoint with increased resources to handle bot processing. New
+# containers start from a memory snapshot taken after `load`, so scale-out
+# skips importing pipecat/agno and loading the VAD model (see server.py).
+@app.cls(
     image=image,
-    cpu=0.125,
-    memory=300,  
-    secrets=[modal.Secret.from_dotenv()],
+    cpu=CONTAINER_CPU,
+    memory=CONTAINER_MEMORY_MB,
+    secrets=[
+        modal.Secret.from_dotenv(),
+        modal.Secret.from_dict(
+            {
+                "CONTAINER_CPU": str(CONTAINER_CPU),
+                "MAX_SESSIONS": str(MAX_CALLS_PER_CONTAINER),
+                "MAX_MEMORY_MB": str(int(CONTAINER_MEMORY_MB * 0.9)),
+                "RECORDING_SPILL_DIR": RECORDING_SPILL_DIR,
+            }
+        ),
+    ],
+    # Committed in the background and when the container stops
+    volumes={RECORDING_SPILL_DIR: recording_spill},
     min_containers=1,
     buffer_containers=1,
-    enable_memory_snapshot=False,
+    enable_memory_snapshot=True,
     timeout=MAX_SESSION_TIME,  # Set timeout for long-running sessions
 )
-@modal.asgi_app()
-def websocket_endpoint():
-    from fastapi import FastAPI, WebSocket
-    from fastapi.middleware.cors import CORSMiddleware
-    from bot import run_bot  # Import run_bot directly
+@modal.concurrent(
+    max_inputs=MAX_CALLS_PER_CONTAINER, target_inputs=TARGET_CALLS_PER_CONTAINER
+)
+class WebsocketServer:
+    @modal.enter(snap=True)
+    def load(self):
+        import server
 
-    web_app = FastAPI()
-    web_app.add_middleware(
-        CORSMiddleware,
-        allow_origins=["*"],
-        allow_credentials=True,
-        allow_methods=["*"],
-        allow_headers=["*"],
-    )
+        server.load()
 
-    @web_app.websocket("/ws-handler")
-    async def websocket_handler(websocket: WebSocket):
-        try:
-            await websocket.accept()
-            start_data = websocket.iter_text()
-            await start_data.__anext__()
-            call_data = json.loads(await start_data.__anext__())
-            print(call_data, flush=True)
-            stream_sid = call_data["start"]["streamSid"]
-            call_sid = call_data["start"]["callSid"]
-            print("WebSocket connection accepted")
-            await run_bot(websocket, call_sid, stream_sid)
+    @modal.enter(snap=False)
+    def connect(self):
+        import server
 
-        except Exception as e:
-            logger.error(f"Error in websocket handler: {e}")
-            import traceback
+        server.connect()
 
-            logger.error(traceback.format_exc())
+    # Same URL as the former websocket_endpoint function
+    @modal.asgi_app(label="rest-book-bot-websocket-endpoint")
+    def websocket_endpoint(self):
+        from server import create_app
 
-        logger.info("WebSocket connection closed")
+        return create_app()
 
-    return web_app
+
+# Uploads what stopped containers spilled. One container at a time, so no
+# recording is picked up twice.
+@app.function(
+    image=image,
+    cpu=0.125,
+    memory=256,
+    secrets=[modal.Secret.from_dotenv()],
+    volumes={RECORDING_SPILL_DIR: recording_spill},
+    schedule=modal.Period(minutes=15),
+    max_containers=1,
+    timeout=10 * 60,
+)
+async def upload_spilled_recordings():
+    from upload_queue import upload_spilled
+
+    await recording_spill.reload.aio()
+    queue = await upload_spilled(RECORDING_SPILL_DIR, timeout=8 * 60)
+    await recording_spill.commit.aio()
+    logger.info(
+        f"Spilled recordings: {queue.uploaded} uploaded, {queue.spilled} spilled "
+        f"again, {queue.failed} failed"
+    )
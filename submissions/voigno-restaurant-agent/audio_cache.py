@@ -0,0 +1,223 @@
+import asyncio
+import hashlib
+import itertools
+import os
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from loguru import logger
+from pipecat.frames.frames import (
+    Frame,
+    FunctionCallInProgressFrame,
+    LLMFullResponseStartFrame,
+    StartFrame,
+    TTSAudioRawFrame,
+    TTSStartedFrame,
+    TTSStoppedFrame,
+)
+from pipecat.processors.frame_processor import FrameDirection, FrameProcessor
+
+# (voice_id, text, sample_rate, encoding)
+PhraseKey = Tuple[str, str, int, str]
+
+# synthesize(text, sample_rate, encoding) -> raw audio bytes
+Synthesizer = Callable[[str, int, str], Awaitable[bytes]]
+
+
+class PhraseAudioCache:
+    """
+    Pre-synthesized audio for fixed phrases (greeting, hold fillers).
+
+    Audio is keyed by (voice_id, text, sample_rate, encoding) and kept in memory,
+    and in `cache_dir` when given so a new container can load it from disk instead
+    of calling the TTS provider again. Encoding is "pcm_s16le" (what the pipeline
+    plays) or "pcm_mulaw". One cache is meant to be shared by all calls of a
+    container; concurrent requests for the same phrase share one synthesis.
+    """
+
+    def __init__(
+        self,
+        *,
+        voice_id: str,
+        synthesize: Synthesizer,
+        cache_dir: Optional[str] = None,
+    ):
+        self._voice_id = voice_id
+        self._synthesize = synthesize
+        self._cache_dir = cache_dir
+        self._audio: Dict[PhraseKey, bytes] = {}
+        self._pending: Dict[PhraseKey, asyncio.Task] = {}
+
+    def key(self, text: str, sample_rate: int, encoding: str = "pcm_s16le"):
+        return (self._voice_id, text, sample_rate, encoding)
+
+    def get_cached(
+        self, text: str, sample_rate: int, encoding: str = "pcm_s16le"
+    ) -> Optional[bytes]:
+        """Audio for a phrase if it is already in memory, without waiting."""
+        return self._audio.get(self.key(text, sample_rate, encoding))
+
+    async def get(
+        self, text: str, sample_rate: int, encoding: str = "pcm_s16le"
+    ) -> bytes:
+        key = self.key(text, sample_rate, encoding)
+        audio = self._audio.get(key)
+        if audio is not None:
+            return audio
+        task = self._pending.get(key)
+        if task is None:
+            task = asyncio.create_task(self._load(key))
+            self._pending[key] = task
+        try:
+            return await asyncio.shield(task)
+        finally:
+            if task.done():
+                self._pending.pop(key, None)
+
+    async def warm(
+        self, texts: List[str], sample_rate: int, encoding: str = "pcm_s16le"
+    ):
+        """Load or synthesize all phrases, logging instead of raising on failure."""
+        results = await asyncio.gather(
+            *(self.get(text, sample_rate, encoding) for text in texts),
+            return_exceptions=True,
+        )
+        for text, result in zip(texts, results):
+            if isinstance(result, Exception):
+                logger.warning(f"Could not pre-synthesize '{text}': {result}")
+        logger.info(
+            f"Phrase audio cache ready: {len(self._audio)} phrase(s) at {sample_rate} Hz"
+        )
+
+    async def _load(self, key: PhraseKey) -> bytes:
+        _, text, sample_rate, encoding = key
+        path = self._path(key)
+        if path and os.path.exists(path):
+            audio = await asyncio.to_thread(_read_file, path)
+            logger.debug(f"Loaded phrase audio for '{text}' from {path}")
+        else:
+            audio = await self._synthesize(text, sample_rate, encoding)
+            logger.debug(f"Synthesized phrase audio for '{text}' ({len(audio)} bytes)")
+            if path:
+                await asyncio.to_thread(_write_file, path, audio)
+        self._audio[key] = audio
+        return audio
+
+    def _path(self, key: PhraseKey) -> Optional[str]:
+        if not self._cache_dir:
+            return None
+        digest = hashlib.sha256("\0".join(map(str, key)).encode()).hexdigest()[:24]
+        extension = "ulaw" if key[3] == "pcm_mulaw" else "pcm"
+        return os.path.join(self._cache_dir, f"{digest}.{extension}")
+
+
+def cartesia_synthesizer(
+    api_key: Optional[str],
+    voice_id: str,
+    model: str = "sonic-2",
+    language: str = "en",
+) -> Synthesizer:
+    """
+    Synthesize phrases with Cartesia's non-streaming bytes endpoint.
+
+    Without an api_key, CARTESIA_API_KEY is read when synthesizing, so no key is
+    kept in a memory snapshot taken before secrets are loaded.
+    """
+
+    async def synthesize(text: str, sample_rate: int, encoding: str) -> bytes:
+        from cartesia import AsyncCartesia
+
+        client = AsyncCartesia(api_key=api_key or os.getenv("CARTESIA_API_KEY"))
+        try:
+            return await client.tts.bytes(
+                model_id=model,
+                transcript=text,
+                voice_id=voice_id,
+                language=language,
+                output_format={
+                    "container": "raw",
+                    "encoding": encoding,
+                    "sample_rate": sample_rate,
+                },
+            )
+        finally:
+            await client.close()
+
+    return synthesize
+
+
+def _read_file(path: str) -> bytes:
+    with open(path, "rb") as file:
+        return file.read()
+
+
+def _write_file(path: str, audio: bytes):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # Write then rename so a concurrent reader never sees a partial file
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as file:
+        file.write(audio)
+    os.replace(tmp_path, path)
+
+
+class CachedPhrasePlayer(FrameProcessor):
+    """
+    Plays cached phrase audio straight to the output transport.
+
+    Place right after the TTS service. `play` pushes a cached phrase as TTS audio
+    and returns False when the phrase isn't cached yet (synthesis is then started in
+    the background), so callers can fall back to `tts.say`. When fillers are given,
+    one of them is played on the first FunctionCallInProgressFrame of a response,
+    unless the bot has already started speaking in that response.
+    """
+
+    def __init__(
+        self,
+        cache: PhraseAudioCache,
+        *,
+        sample_rate: int,
+        fillers: Optional[List[str]] = None,
+        **kwargs,
+    ):
+        super().__init__(**kwargs)
+        self._cache = cache
+        self._sample_rate = sample_rate
+        self._fillers = itertools.cycle(fillers) if fillers else None
+        self._response_has_audio = False
+        self._filler_played = False
+
+    async def play(self, text: str) -> bool:
+        audio = self._cache.get_cached(text, self._sample_rate)
+        if audio is None:
+            logger.debug(f"{self} No cached audio for '{text}' yet")
+            self.create_task(self._cache.get(text, self._sample_rate))
+            return False
+
+        logger.debug(f"{self} Playing cached audio for '{text}'")
+        await self.push_frame(TTSStartedFrame())
+        await self.push_frame(
+            TTSAudioRawFrame(audio=audio, sample_rate=self._sample_rate, num_channels=1)
+        )
+        await self.push_frame(TTSStoppedFrame())
+        return True
+
+    async def process_frame(self, frame: Frame, direction: FrameDirection):
+        await super().process_frame(frame, direction)
+
+        if isinstance(frame, StartFrame):
+            self._sample_rate = frame.audio_out_sample_rate or self._sample_rate
+        elif isinstance(frame, LLMFullResponseStartFrame):
+            self._response_has_audio = False
+            self._filler_played = False
+        elif isinstance(frame, TTSAudioRawFrame):
+            self._response_has_audio = True
+
+        await self.push_frame(frame, direction)
+
+        if (
+            isinstance(frame, FunctionCallInProgressFrame)
+            and direction == FrameDirection.DOWNSTREAM
+            and self._fillers
+            and not self._filler_played
+            and not self._response_has_audio
+        ):
+            self._filler_played = await self.play(next(self._fillers))
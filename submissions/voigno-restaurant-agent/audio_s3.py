@@ -1,6 +1,399 @@
-# Global variable to store the session and client
+import asyncio
+import base64
+import datetime
+import json
+import os
+from typing import Optional
+
+from loguru import logger
+
+from recording_codecs import PcmWavCodec, RecordingCodec
+
+# Global variables to store the session and clients (one per endpoint)
 _session = None
-_s3_client = None
+_s3_clients = {}
+
+# S3 rejects multipart parts under 5 MiB, except for the last one
+MIN_PART_SIZE = 5 * 1024 * 1024
+
+
+async def get_s3_client(endpoint_url: str = None):
+    """
+    Return a shared aioboto3 S3 client, created on first use.
+
+    Args:
+        endpoint_url: Custom S3 endpoint, e.g. a local MinIO or moto server
+            (default: the S3_ENDPOINT_URL env var, else AWS)
+    """
+    import aioboto3
+
+    global _session
+
+    endpoint_url = endpoint_url or os.getenv("S3_ENDPOINT_URL") or None
+
+    # Initialize session and client if they don't exist
+    if _session is None:
+        _session = aioboto3.Session()
+
+    if endpoint_url not in _s3_clients:
+        _s3_clients[endpoint_url] = await _session.client(
+            "s3", endpoint_url=endpoint_url
+        ).__aenter__()
+    return _s3_clients[endpoint_url]
+
+
+def recording_key(
+    s3_prefix: str = "audio_recordings/", call_sid: str = None, extension: str = "wav"
+) -> str:
+    """S3 key for a new conversation recording."""
+    timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+    suffix = f"_{call_sid}" if call_sid else ""
+    return f"{s3_prefix}conversation_recording_{timestamp}{suffix}.{extension}"
+
+
+class StreamingS3Recorder:
+    """
+    Upload a call recording to S3 as it is recorded.
+
+    PCM passed to `write` is encoded with `codec` in a worker thread (16-bit PCM
+    WAV by default, see recording_codecs.py) and sent in `part_size` parts of an
+    S3 multipart upload while the call goes on, so memory per call stays at
+    roughly two parts no matter how long the call is. A WAV header needs the final
+    data size, so the first part is held back until the end.
+
+    Finishing is split in two: `close` ends the encoding (no network), `upload`
+    sends what is left and can be retried. If a part fails during the call, it
+    and all later audio go to `spill_dir` on disk (or stay in memory without
+    one) and are sent by `upload`. `spill` moves a closed recording to disk with
+    a manifest that `load` restores from, so another container can finish it
+    (see upload_queue.upload_spilled).
+
+    Args:
+        bucket_name: Name of the S3 bucket
+        key: S3 key of the recording
+        sample_rate: Audio sample rate in Hz
+        num_channels: Number of audio channels
+        codec: Encoder for the recording (default: 16-bit PCM WAV)
+        part_size: Bytes per uploaded part (default and minimum: 5 MiB)
+        endpoint_url: Custom S3 endpoint (see get_s3_client)
+        spill_dir: Local directory for audio that can't be uploaded yet
+    """
+
+    def __init__(
+        self,
+        bucket_name: str,
+        key: str,
+        sample_rate: int,
+        num_channels: int = 1,
+        codec: Optional[RecordingCodec] = None,
+        part_size: int = MIN_PART_SIZE,
+        endpoint_url: str = None,
+        spill_dir: str = None,
+    ):
+        self.bucket_name = bucket_name
+        self.key = key
+        self.sample_rate = sample_rate
+        self.num_channels = num_channels
+        self.codec = codec or PcmWavCodec(sample_rate, num_channels)
+        self._content_type = self.codec.content_type
+        self._part_size = max(part_size, MIN_PART_SIZE)
+        self._endpoint_url = endpoint_url
+        self._spill_dir = spill_dir
+
+        self._first_part = bytearray()
+        self._pending = bytearray()
+        self._data_size = 0
+        self._upload_id = None
+        self._next_part_number = 2
+        self._parts = {}
+        # Encoded audio that still has to be sent as parts, in order: in memory,
+        # or in a spill file once anything has been spilled
+        self._overflow = bytearray()
+        self._overflow_size = 0
+        self._overflow_uploaded = 0
+        self._header = None
+        self._closed = False
+        self._completed = False
+        # Part being uploaded; at most one, so a slow upload pushes back on
+        # write instead of letting audio pile up in memory
+        self._upload_task = None
+        self._lock = asyncio.Lock()
+
+    @property
+    def data_size(self) -> int:
+        return self._data_size
+
+    @property
+    def uri(self) -> str:
+        return f"s3://{self.bucket_name}/{self.key}"
+
+    async def write(self, audio: bytes):
+        """Add audio; uploads a part in the background whenever one is full."""
+        async with self._lock:
+            if self._closed:
+                return
+            self._append(await asyncio.to_thread(self.codec.encode, audio))
+
+            while len(self._pending) >= self._part_size:
+                part = bytes(self._pending[: self._part_size])
+                del self._pending[: self._part_size]
+                await self._wait_for_upload()
+                if self._overflow_size:
+                    # S3 already failed once in this call; keep the parts in order
+                    await self._add_overflow(part)
+                else:
+                    self._upload_task = asyncio.create_task(self._upload_or_spill(part))
+
+    async def close(self):
+        """Finish encoding and build the header. Audio written afterwards is dropped."""
+        async with self._lock:
+            if self._closed:
+                return
+            await self._wait_for_upload()
+            self._append(await asyncio.to_thread(self.codec.finish))
+            await self._add_overflow(bytes(self._pending))
+            self._pending = bytearray()
+            self._header = self.codec.header(self._data_size)
+            self._closed = True
+
+    async def upload(self) -> str:
+        """
+        Send everything not uploaded yet and finish the upload. Safe to retry.
+
+        Returns:
+            str: S3 URI of the saved file
+        """
+        async with self._lock:
+            if not self._closed:
+                raise RuntimeError("close() the recorder before uploading it")
+            if self._completed:
+                return self.uri
+
+            client = await get_s3_client(self._endpoint_url)
+            first_part = self._header + await self._read_first_part()
+
+            if self._upload_id is None and self._overflow_size < self._part_size:
+                await client.put_object(
+                    Bucket=self.bucket_name,
+                    Key=self.key,
+                    Body=first_part + await self._read_overflow(0, self._overflow_size),
+                    ContentType=self._content_type,
+                )
+            else:
+                await self._ensure_upload_id()
+                while self._overflow_uploaded < self._overflow_size:
+                    part = await self._read_overflow(
+                        self._overflow_uploaded, self._part_size
+                    )
+                    await self._upload_part(self._next_part_number, part)
+                    self._next_part_number += 1
+                    self._overflow_uploaded += len(part)
+                await self._upload_part(1, first_part)
+                await client.complete_multipart_upload(
+                    Bucket=self.bucket_name,
+                    Key=self.key,
+                    UploadId=self._upload_id,
+                    MultipartUpload={
+                        "Parts": [
+                            {"PartNumber": number, "ETag": etag}
+                            for number, etag in sorted(self._parts.items())
+                        ]
+                    },
+                )
+
+            self._completed = True
+            self._first_part = bytearray()
+            self._overflow = bytearray()
+            await asyncio.to_thread(self._remove_spill_files)
+            return self.uri
+
+    async def complete(self) -> str:
+        """Close and upload in one go."""
+        await self.close()
+        return await self.upload()
+
+    async def spill(self) -> str:
+        """
+        Move a closed recording out of memory into spill_dir.
+
+        Returns:
+            str: Path of the manifest to pass to `load`
+        """
+        async with self._lock:
+            if not self._closed or not self._spill_dir:
+                raise RuntimeError("Only closed recorders with a spill_dir can spill")
+            if self._first_part:
+                await asyncio.to_thread(
+                    _write_file,
+                    self._spill_path("first"),
+                    bytes(self._first_part),
+                    "wb",
+                )
+                self._first_part = bytearray()
+            if self._overflow:
+                await asyncio.to_thread(
+                    _write_file,
+                    self._spill_path("overflow"),
+                    bytes(self._overflow),
+                    "wb",
+                )
+                self._overflow = bytearray()
+
+            manifest = {
+                "bucket_name": self.bucket_name,
+                "key": self.key,
+                "sample_rate": self.sample_rate,
+                "num_channels": self.num_channels,
+                "content_type": self._content_type,
+                "part_size": self._part_size,
+                "endpoint_url": self._endpoint_url,
+                "data_size": self._data_size,
+                "header": base64.b64encode(self._header).decode("ascii"),
+                "upload_id": self._upload_id,
+                "next_part_number": self._next_part_number,
+                "parts": self._parts,
+                "overflow_size": self._overflow_size,
+                "overflow_uploaded": self._overflow_uploaded,
+            }
+            path = self._spill_path("json")
+            await asyncio.to_thread(
+                _write_file, path, json.dumps(manifest).encode(), "wb"
+            )
+            return path
+
+    @classmethod
+    def load(cls, manifest_path: str) -> "StreamingS3Recorder":
+        """Restore a closed recorder saved by `spill`."""
+        with open(manifest_path) as file:
+            manifest = json.load(file)
+        recorder = cls(
+            bucket_name=manifest["bucket_name"],
+            key=manifest["key"],
+            sample_rate=manifest["sample_rate"],
+            num_channels=manifest["num_channels"],
+            part_size=manifest["part_size"],
+            endpoint_url=manifest["endpoint_url"],
+            spill_dir=os.path.dirname(manifest_path),
+        )
+        recorder._content_type = manifest["content_type"]
+        recorder._data_size = manifest["data_size"]
+        recorder._header = base64.b64decode(manifest["header"])
+        recorder._upload_id = manifest["upload_id"]
+        recorder._next_part_number = manifest["next_part_number"]
+        recorder._parts = {int(n): etag for n, etag in manifest["parts"].items()}
+        recorder._overflow_size = manifest["overflow_size"]
+        recorder._overflow_uploaded = manifest["overflow_uploaded"]
+        recorder._closed = True
+        return recorder
+
+    async def abort(self):
+        """Drop the upload and any spilled audio, so neither S3 nor disk keeps parts."""
+        if self._upload_task:
+            self._upload_task.cancel()
+        await asyncio.to_thread(self._remove_spill_files)
+        if self._upload_id is None:
+            return
+        try:
+            client = await get_s3_client(self._endpoint_url)
+            await client.abort_multipart_upload(
+                Bucket=self.bucket_name, Key=self.key, UploadId=self._upload_id
+            )
+        except Exception as e:
+            # The parts stay in S3 until a lifecycle rule removes them
+            logger.error(f"Error aborting upload of {self.uri}: {e}")
+
+    def _append(self, audio: bytes):
+        self._data_size += len(audio)
+        room = self._part_size - len(self._first_part)
+        if room > 0:
+            self._first_part.extend(audio[:room])
+            audio = audio[room:]
+        self._pending.extend(audio)
+
+    async def _upload_or_spill(self, part: bytes):
+        part_number = self._next_part_number
+        self._next_part_number += 1
+        try:
+            await self._ensure_upload_id()
+            await self._upload_part(part_number, part)
+        except Exception as e:
+            logger.warning(
+                f"Error uploading part {part_number} of {self.uri}, keeping it: {e}"
+            )
+            self._next_part_number = part_number
+            await self._add_overflow(part)
+
+    async def _add_overflow(self, data: bytes):
+        if not data:
+            return
+        if self._spill_dir and not self._overflow:
+            await asyncio.to_thread(
+                _write_file, self._spill_path("overflow"), data, "ab"
+            )
+        else:
+            self._overflow.extend(data)
+        self._overflow_size += len(data)
+
+    async def _read_overflow(self, offset: int, size: int) -> bytes:
+        if self._overflow or not self._overflow_size:
+            return bytes(self._overflow[offset : offset + size])
+        return await asyncio.to_thread(
+            _read_file, self._spill_path("overflow"), offset, size
+        )
+
+    async def _read_first_part(self) -> bytes:
+        path = self._spill_path("first")
+        if self._first_part or not path or not os.path.exists(path):
+            return bytes(self._first_part)
+        return await asyncio.to_thread(_read_file, path)
+
+    async def _ensure_upload_id(self):
+        if self._upload_id is None:
+            client = await get_s3_client(self._endpoint_url)
+            response = await client.create_multipart_upload(
+                Bucket=self.bucket_name, Key=self.key, ContentType=self._content_type
+            )
+            self._upload_id = response["UploadId"]
+
+    async def _wait_for_upload(self):
+        if self._upload_task:
+            task, self._upload_task = self._upload_task, None
+            await task
+
+    async def _upload_part(self, part_number: int, body: bytes):
+        client = await get_s3_client(self._endpoint_url)
+        response = await client.upload_part(
+            Bucket=self.bucket_name,
+            Key=self.key,
+            UploadId=self._upload_id,
+            PartNumber=part_number,
+            Body=body,
+        )
+        self._parts[part_number] = response["ETag"]
+
+    def _spill_path(self, suffix: str) -> Optional[str]:
+        if not self._spill_dir:
+            return None
+        name = self.key.replace("/", "_")
+        return os.path.join(self._spill_dir, f"{name}.{suffix}")
+
+    def _remove_spill_files(self):
+        for suffix in ("json", "first", "overflow"):
+            path = self._spill_path(suffix)
+            if path and os.path.exists(path):
+                os.remove(path)
+
+
+def _write_file(path: str, data: bytes, mode: str):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, mode) as file:
+        file.write(data)
+
+
+def _read_file(path: str, offset: int = 0, size: int = -1) -> bytes:
+    with open(path, "rb") as file:
+        file.seek(offset)
+        return file.read(size)
 
 
 async def save_audio_to_s3(
@@ -26,10 +419,6 @@ async def save_audio_to_s3(
     # Lazy imports - only imported when function is called
     import io
     import wave
-    import datetime
-    import aioboto3
-
-    global _session, _s3_client
 
     if len(audio) <= 0:
         print("No audio data to save")
@@ -37,8 +426,7 @@ async def save_audio_to_s3(
 
     try:
         # Generate unique filename with timestamp
-        timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-        key = f"{s3_prefix}conversation_recording_{timestamp}.wav"
+        key = recording_key(s3_prefix)
 
         # Create WAV file in memory
         buffer = io.BytesIO()
@@ -51,15 +439,9 @@ async def save_audio_to_s3(
         # Rewind the buffer for upload
         buffer.seek(0)
 
-        # Initialize session and client if they don't exist
-        if _session is None:
-            _session = aioboto3.Session()
-
-        if _s3_client is None:
-            _s3_client = await _session.client("s3").__aenter__()
-
         # Use existing client
-        await _s3_client.upload_fileobj(buffer, bucket_name, key)
+        s3_client = await get_s3_client()
+        await s3_client.upload_fileobj(buffer, bucket_name, key)
 
         s3_uri = f"s3://{bucket_name}/{key}"
         print(f"Audio saved to {s3_uri}")
@@ -0,0 +1,4 @@
+"""Offline benchmarks. Run from the project directory, e.g.
+
+python -m benchmarks.hedging_bench
+"""
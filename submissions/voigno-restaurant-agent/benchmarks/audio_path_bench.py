@@ -0,0 +1,136 @@
+"""CPU per call of the per-frame audio work, telephony (8 kHz) vs wideband path.
+
+Replays Twilio media events through the same components run_bot uses for every
+audio frame: TwilioFrameSerializer (μ-law decode and resampling in, resampling
+and μ-law encode out), Silero VAD, and the resampling AudioBufferProcessor does
+for the recording. STT and TTS are remote, so only their audio format matters
+here. Bot audio is generated at the pipeline output rate and sent back for
+`--bot-talk-ratio` of the call.
+
+    python -m benchmarks.audio_path_bench --seconds 60
+    python -m benchmarks.audio_path_bench --capture twilio_session.jsonl
+"""
+
+import argparse
+import asyncio
+import json
+import time
+
+import numpy as np
+from loguru import logger
+from pipecat.audio.utils import create_default_resampler
+from pipecat.audio.vad.silero import SileroVADAnalyzer
+from pipecat.frames.frames import OutputAudioRawFrame, StartFrame
+from pipecat.serializers.twilio import TwilioFrameSerializer
+
+from recording_codecs import pcm_to_ulaw
+from telephony import (
+    TELEPHONY,
+    TWILIO_SAMPLE_RATE,
+    WIDEBAND,
+    AudioPath,
+    read_twilio_capture,
+    twilio_media_messages,
+)
+
+STREAM_SID = "MZbenchmark"
+# 40 ms, the default audio_out_10ms_chunks of the output transport
+OUTPUT_CHUNK_SECONDS = 0.04
+
+
+def synthetic_speech(seconds: float, sample_rate: int, seed: int = 7) -> bytes:
+    """Voiced bursts with pauses, loud enough to keep the VAD busy."""
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * sample_rate)) / sample_rate
+    f0 = 140 + 20 * np.sin(2 * np.pi * 0.5 * t)
+    phase = 2 * np.pi * np.cumsum(f0) / sample_rate
+    voiced = sum(np.sin(k * phase) / k for k in range(1, 8))
+    # 1.5 s of speech, then 1 s of silence
+    envelope = ((t % 2.5) < 1.5).astype(float)
+    signal = 0.3 * voiced * envelope + 0.01 * rng.standard_normal(len(t))
+    return (np.clip(signal, -1, 1) * 32767).astype(np.int16).tobytes()
+
+
+async def run_path(path: AudioPath, messages: list, bot_audio: bytes) -> dict:
+    serializer = TwilioFrameSerializer(
+        stream_sid=STREAM_SID,
+        params=TwilioFrameSerializer.InputParams(auto_hang_up=False),
+    )
+    # Only the sample rates of the StartFrame are used by the serializer
+    await serializer.setup(
+        StartFrame(
+            clock=None,
+            task_manager=None,
+            audio_in_sample_rate=path.in_sample_rate,
+            audio_out_sample_rate=path.out_sample_rate,
+        )
+    )
+    vad = SileroVADAnalyzer()
+    vad.set_sample_rate(path.in_sample_rate)
+    recording_resampler = create_default_resampler()
+    chunk_bytes = int(path.out_sample_rate * OUTPUT_CHUNK_SECONDS) * 2
+
+    started = time.process_time()
+    for message in messages:
+        frame = await serializer.deserialize(message)
+        vad.analyze_audio(frame.audio)
+        await recording_resampler.resample(
+            frame.audio, path.in_sample_rate, path.out_sample_rate
+        )
+    for start in range(0, len(bot_audio), chunk_bytes):
+        await serializer.serialize(
+            OutputAudioRawFrame(
+                audio=bot_audio[start : start + chunk_bytes],
+                sample_rate=path.out_sample_rate,
+                num_channels=1,
+            )
+        )
+    return {"cpu_s": time.process_time() - started}
+
+
+async def main(args):
+    if args.capture:
+        with open(args.capture) as file:
+            messages = list(read_twilio_capture(file))
+    else:
+        pcm = synthetic_speech(args.seconds, TWILIO_SAMPLE_RATE)
+        messages = list(twilio_media_messages(STREAM_SID, pcm_to_ulaw(pcm)))
+    call_seconds = len(messages) * 0.02
+
+    results = {}
+    for path in (WIDEBAND, TELEPHONY):
+        bot_audio = synthetic_speech(
+            call_seconds * args.bot_talk_ratio, path.out_sample_rate, seed=11
+        )
+        # One untimed run to load the VAD model and warm up the resamplers
+        await run_path(path, messages[:50], bot_audio[:4800])
+        runs = [
+            (await run_path(path, messages, bot_audio))["cpu_s"]
+            for _ in range(args.repeat)
+        ]
+        cpu_per_minute = min(runs) / call_seconds * 60
+        results[path.name] = {
+            "in_hz": path.in_sample_rate,
+            "out_hz": path.out_sample_rate,
+            "call_s": round(call_seconds, 1),
+            "cpu_s_per_call_minute": round(cpu_per_minute, 3),
+            # Share of the websocket container's CPU (cpu=0.125 in app.py)
+            "share_of_container_cpu": round(cpu_per_minute / 60 / args.cpu, 3),
+        }
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--seconds", type=float, default=60)
+    parser.add_argument(
+        "--capture", help="captured Twilio websocket messages, one JSON per line"
+    )
+    parser.add_argument("--bot-talk-ratio", type=float, default=0.5)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--cpu", type=float, default=0.125)
+    args = parser.parse_args()
+
+    logger.remove()
+    asyncio.run(main(args))
@@ -0,0 +1,103 @@
+"""Recording size and encode CPU per call minute for each recording codec.
+
+Audio is fed to the codecs in the same 5 s chunks run_bot hands to the recorder.
+By default the input is synthetic speech at 8 kHz; pass a 16-bit WAV (e.g. a
+downloaded call recording) with --wav for realistic FLAC/Opus numbers. Codecs
+that need PyAV are skipped when it isn't installed.
+
+    python -m benchmarks.codec_bench --seconds 60 --channels 2
+    python -m benchmarks.codec_bench --wav recording.wav
+"""
+
+import argparse
+import json
+import time
+import wave
+
+import numpy as np
+
+from benchmarks.audio_path_bench import synthetic_speech
+from recording_codecs import RECORDING_CODECS, create_codec
+
+CHUNK_SECONDS = 5
+
+
+def load_audio(args):
+    if args.wav:
+        with wave.open(args.wav, "rb") as wav:
+            if wav.getsampwidth() != 2:
+                raise SystemExit("--wav must be 16-bit PCM")
+            return (
+                wav.readframes(wav.getnframes()),
+                wav.getframerate(),
+                wav.getnchannels(),
+            )
+
+    pcm = synthetic_speech(args.seconds, args.sample_rate)
+    if args.channels == 2:
+        # Caller on the left, a second synthetic voice for the bot on the right
+        bot = synthetic_speech(args.seconds, args.sample_rate, seed=11)
+        pcm = np.column_stack(
+            (np.frombuffer(pcm, np.int16), np.frombuffer(bot, np.int16))
+        ).tobytes()
+    return pcm, args.sample_rate, args.channels
+
+
+def run_codec(name: str, pcm: bytes, sample_rate: int, num_channels: int) -> dict:
+    chunk_bytes = sample_rate * 2 * num_channels * CHUNK_SECONDS
+    started = time.process_time()
+    codec = create_codec(name, sample_rate, num_channels)
+    size = 0
+    for start in range(0, len(pcm), chunk_bytes):
+        size += len(codec.encode(pcm[start : start + chunk_bytes]))
+    size += len(codec.finish())
+    size += len(codec.header(size))
+    return {"bytes": size, "cpu_s": time.process_time() - started}
+
+
+def main(args):
+    pcm, sample_rate, num_channels = load_audio(args)
+    minutes = len(pcm) / (sample_rate * 2 * num_channels) / 60
+
+    results = {}
+    for name in RECORDING_CODECS:
+        try:
+            runs = [
+                run_codec(name, pcm, sample_rate, num_channels)
+                for _ in range(args.repeat)
+            ]
+        except ImportError as e:
+            results[name] = {"skipped": str(e)}
+            continue
+        size = runs[0]["bytes"]
+        results[name] = {
+            "kb_per_minute": round(size / minutes / 1000, 1),
+            "vs_pcm_wav": round(size / (len(pcm) + 44), 3),
+            "encode_cpu_ms_per_minute": round(
+                min(r["cpu_s"] for r in runs) / minutes * 1000, 1
+            ),
+        }
+
+    print(
+        json.dumps(
+            {
+                "sample_rate": sample_rate,
+                "channels": num_channels,
+                "minutes": round(minutes, 2),
+                "codecs": results,
+            },
+            indent=2,
+        )
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument(
+        "--wav", help="16-bit PCM WAV to encode instead of synthetic audio"
+    )
+    parser.add_argument("--seconds", type=float, default=60)
+    parser.add_argument("--sample-rate", type=int, default=8000)
+    parser.add_argument("--channels", type=int, choices=(1, 2), default=1)
+    parser.add_argument("--repeat", type=int, default=3)
+    main(parser.parse_args())
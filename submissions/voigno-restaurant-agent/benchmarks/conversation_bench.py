@@ -0,0 +1,406 @@
+"""LLM round trips, tool calls and prompt tokens per scripted booking conversation.
+
+Each scenario in benchmarks/scenarios/ is a script in the format of
+local_providers.py (caller transcripts and model steps) plus `setup`: tool calls
+run on the toolkit first, e.g. to fill a slot or create the caller's bookings.
+The caller's turns go through AgentMessageAggregator and AgentLLM, with the
+agent built like a call's (bot.create_agent) on the stub model, and the toolkit
+on a seeded mongomock database.
+
+The stub model answers instantly, so time is simulated: every model request
+costs `--llm-ttfb-ms` plus `--prefill-ms-per-1k` per thousand prompt tokens
+before its first token, plus its completion tokens at `--tokens-per-second`.
+Tool calls and the pipeline itself take the real time they take. Per scenario
+it reports LLM requests, tool calls, prompt and completion tokens, and the
+simulated time to the first text and to the end of each reply.
+
+Prompt changes show up as prompt tokens and simulated time, toolkit changes as
+tool time. To compare with a saved run, exiting 1 on a regression:
+
+    python -m benchmarks.conversation_bench --output conversations.json
+    python -m benchmarks.conversation_bench --baseline conversations.json
+
+The stub replays the script whatever the prompt says. To see how a real model
+handles the prompt, `--record gpt-4o-mini --record-dir DIR` runs the scenarios
+on it (OPENAI_API_KEY) and writes its steps as new scenarios, dates as
+"{today+N}", which are then benchmarked like the others.
+"""
+
+import argparse
+import asyncio
+import glob
+import json
+import os
+import statistics
+import sys
+import time
+from typing import Dict, List, Optional
+
+from loguru import logger
+from pipecat.frames.frames import (
+    FunctionCallInProgressFrame,
+    FunctionCallResultFrame,
+    LLMFullResponseEndFrame,
+    LLMTextFrame,
+    TranscriptionFrame,
+    UserStartedSpeakingFrame,
+    UserStoppedSpeakingFrame,
+)
+from pipecat.pipeline.pipeline import Pipeline
+from pipecat.pipeline.runner import PipelineRunner
+from pipecat.pipeline.task import PipelineTask
+from pipecat.processors.frame_processor import FrameDirection, FrameProcessor
+from pipecat.utils.time import time_now_iso8601
+
+SCENARIO_DIR = os.path.join(os.path.dirname(__file__), "scenarios")
+# Compared with --baseline; any increase of a count is a regression
+COUNTS = ("llm_requests", "tool_calls", "prompt_tokens")
+TIMES = ("simulated_ms",)
+
+
+class TurnProbe(FrameProcessor):
+    """Last processor of the pipeline: times a reply and its tool calls."""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.transcribed = asyncio.Event()
+        self.response_end = asyncio.Event()
+        self.begin(0.0)
+
+    def begin(self, started: float):
+        self.started = started
+        self.ended = started
+        self.first_text: Optional[float] = None
+        self.tool_started: Dict[str, float] = {}
+        self.tool_seconds = 0.0
+        self.transcribed.clear()
+        self.response_end.clear()
+
+    async def process_frame(self, frame, direction: FrameDirection):
+        await super().process_frame(frame, direction)
+        now = time.perf_counter()
+        if isinstance(frame, TranscriptionFrame):
+            self.transcribed.set()
+        elif isinstance(frame, LLMTextFrame):
+            if self.first_text is None:
+                self.first_text = now
+        elif isinstance(frame, FunctionCallInProgressFrame):
+            self.tool_started[frame.tool_call_id] = now
+        elif isinstance(frame, FunctionCallResultFrame):
+            self.tool_seconds += now - self.tool_started.pop(frame.tool_call_id, now)
+        elif isinstance(frame, LLMFullResponseEndFrame):
+            self.ended = now
+            self.response_end.set()
+        await self.push_frame(frame, direction)
+
+
+def run_steps(agent) -> List[dict]:
+    """
+    The model's steps in the agent's last run: the assistant messages after the
+    last user message, each with its text and tool calls.
+    """
+    messages = getattr(agent.run_response, "messages", None) or []
+    last_user = max(
+        (i for i, message in enumerate(messages) if message.role == "user"),
+        default=-1,
+    )
+    steps = []
+    for message in messages[last_user + 1 :]:
+        if message.role != "assistant":
+            continue
+        steps.append(
+            {
+                "text": message.content if isinstance(message.content, str) else "",
+                "tool_calls": [
+                    {
+                        "name": call["function"]["name"],
+                        "arguments": json.loads(call["function"]["arguments"] or "{}"),
+                    }
+                    for call in message.tool_calls or []
+                ],
+            }
+        )
+    return steps
+
+
+def load_scenarios(names: List[str]) -> Dict[str, dict]:
+    paths = []
+    for name in names or [os.path.join(SCENARIO_DIR, "*.json")]:
+        if not name.endswith(".json"):
+            name = os.path.join(SCENARIO_DIR, f"{name}.json")
+        paths += sorted(glob.glob(name))
+    scenarios = {}
+    for path in paths:
+        with open(path) as file:
+            scenarios[os.path.splitext(os.path.basename(path))[0]] = json.load(file)
+    return scenarios
+
+
+def create_toolkit(scenario: dict, args):
+    """A toolkit on a freshly seeded database, with the scenario's setup applied."""
+    import mongomock
+
+    from local_providers import fill_dates, seed_bookings
+    from restaurant_data import RestaurantBookingToolkit
+
+    toolkit = RestaurantBookingToolkit(mongo_uri="mongodb://localhost", connect=False)
+    toolkit.connect(client=mongomock.MongoClient())
+    seed_bookings(
+        toolkit.db,
+        days=args.days,
+        occupancy=scenario.get("occupancy", args.occupancy),
+        seed=args.seed,
+    )
+    for call in fill_dates(scenario.get("setup", [])):
+        getattr(toolkit, call["name"])(**call["arguments"])
+    return toolkit
+
+
+def simulated_seconds(usage: Dict[str, int], args) -> Dict[str, float]:
+    """Modeled time to first token and to the end of one model request."""
+    ttfb = (
+        args.llm_ttfb_ms + usage["input_tokens"] / 1000 * args.prefill_ms_per_1k
+    ) / 1000
+    return {
+        "ttfb": ttfb,
+        "total": ttfb + usage["output_tokens"] / args.tokens_per_second,
+    }
+
+
+async def run_scenario(scenario: dict, model, args) -> dict:
+    import bot
+    from agent_response import AgentMessageAggregator
+    from agnoagentservice import AgentLLM
+    from history import ConversationHistory
+    from tool_cache import ToolResultCache
+
+    toolkit = create_toolkit(scenario, args)
+    tool_cache = ToolResultCache()
+    agent = bot.create_agent(
+        model,
+        tools=list(toolkit.functions.values()),
+        tool_cache=tool_cache,
+        phone_number=scenario.get("caller", "+15550001111"),
+    )
+    llm = AgentLLM(
+        agent=agent,
+        history=ConversationHistory(max_verbatim_turns=3),
+        tool_cache=tool_cache,
+    )
+    probe = TurnProbe()
+    task = PipelineTask(
+        Pipeline([AgentMessageAggregator(aggregation_timeout=1.0), llm, probe])
+    )
+    runner = asyncio.create_task(PipelineRunner(handle_sigint=False).run(task))
+    await asyncio.sleep(0.05)
+
+    turns = []
+    try:
+        for transcript in scenario["transcripts"]:
+            requests_before = len(getattr(model, "requests", []))
+            await task.queue_frames(
+                [
+                    UserStartedSpeakingFrame(),
+                    TranscriptionFrame(transcript, "", time_now_iso8601()),
+                ]
+            )
+            await probe.transcribed.wait()
+            probe.begin(time.perf_counter())
+            # The aggregator pushes the user message when the caller stops
+            await task.queue_frame(UserStoppedSpeakingFrame())
+            await asyncio.wait_for(probe.response_end.wait(), args.turn_timeout)
+            turns.append(
+                turn_report(
+                    transcript,
+                    probe,
+                    run_steps(agent),
+                    getattr(model, "requests", [])[requests_before:],
+                    args,
+                )
+            )
+    finally:
+        await task.cancel()
+        await runner
+    return {
+        "description": scenario.get("description", ""),
+        "caller_turns": len(turns),
+        "llm_requests": sum(turn["llm_requests"] for turn in turns),
+        "tool_calls": sum(len(turn["tools"]) for turn in turns),
+        "tools": [tool for turn in turns for tool in turn["tools"]],
+        "prompt_tokens": sum(turn["prompt_tokens"] for turn in turns),
+        "completion_tokens": sum(turn["completion_tokens"] for turn in turns),
+        "tool_ms": round(sum(turn["tool_ms"] for turn in turns), 1),
+        "processing_ms": round(sum(turn["processing_ms"] for turn in turns), 1),
+        "simulated_ms": round(sum(turn["simulated_ms"] for turn in turns), 1),
+        "turns": turns,
+    }
+
+
+def turn_report(
+    transcript: str, probe: TurnProbe, steps: List[dict], requests: list, args
+) -> dict:
+    processing = probe.ended - probe.started
+    modeled = [simulated_seconds(usage, args) for usage in requests]
+    # Model requests until the one that started speaking: the caller waits for
+    # all of them, and for that one until its first token
+    first_text = None
+    if probe.first_text is not None:
+        index = next(
+            (i for i, step in enumerate(steps) if step["text"]), len(steps) - 1
+        )
+        waited = sum(m["total"] for m in modeled[:index])
+        if index < len(modeled):
+            waited += modeled[index]["ttfb"]
+        first_text = round((probe.first_text - probe.started + waited) * 1000, 1)
+    return {
+        "transcript": transcript,
+        "llm_requests": len(requests) or len(steps),
+        "tools": [call["name"] for step in steps for call in step["tool_calls"]],
+        "prompt_tokens": sum(usage["input_tokens"] for usage in requests),
+        "completion_tokens": sum(usage["output_tokens"] for usage in requests),
+        "tool_ms": round(probe.tool_seconds * 1000, 1),
+        "processing_ms": round(processing * 1000, 1),
+        "first_text_ms": first_text,
+        "simulated_ms": round(
+            (processing + sum(m["total"] for m in modeled)) * 1000, 1
+        ),
+        "steps": steps,
+    }
+
+
+async def benchmark(scenarios: Dict[str, dict], args) -> dict:
+    from local_providers import script_replies
+    from stub_model import StubModel, scripted_replies
+
+    results = {}
+    for name, scenario in scenarios.items():
+        runs = []
+        for _ in range(args.runs):
+            model = StubModel(
+                id="gpt-4o-mini",
+                script=scripted_replies(script_replies(scenario)),
+            )
+            runs.append(await run_scenario(scenario, model, args))
+        # Counts are the same on every run; times vary with the machine
+        result = runs[-1]
+        for key in ("tool_ms", "processing_ms", "simulated_ms"):
+            result[key] = statistics.median(run[key] for run in runs)
+        for turn in result["turns"]:
+            del turn["steps"]
+        results[name] = result
+        print(
+            f"{name}: {result['llm_requests']} LLM requests, "
+            f"{result['tool_calls']} tool calls, {result['prompt_tokens']} prompt "
+            f"tokens, {result['simulated_ms']:.0f} ms simulated",
+            file=sys.stderr,
+        )
+    return results
+
+
+async def record(scenarios: Dict[str, dict], args):
+    """Run the scenarios on a real model and save its steps as new scenarios."""
+    from agno.models.openai import OpenAIChat
+
+    from local_providers import template_dates
+
+    os.makedirs(args.record_dir, exist_ok=True)
+    for name, scenario in scenarios.items():
+        model = OpenAIChat(id=args.record, api_key=os.getenv("OPENAI_API_KEY"))
+        result = await run_scenario(scenario, model, args)
+        steps = [
+            step if step["tool_calls"] else step["text"]
+            for turn in result["turns"]
+            for step in turn["steps"]
+        ]
+        recorded = {
+            **scenario,
+            "description": f"{scenario.get('description', name)} "
+            f"(recorded from {args.record})",
+            "model": template_dates(steps),
+        }
+        path = os.path.join(args.record_dir, f"{name}.json")
+        with open(path, "w") as file:
+            json.dump(recorded, file, indent=2)
+        print(
+            f"{name}: {result['llm_requests']} LLM requests, "
+            f"{result['tool_calls']} tool calls ({', '.join(result['tools'])}), "
+            f"written to {path}",
+            file=sys.stderr,
+        )
+
+
+def regressions(results: Dict[str, dict], baseline: Dict[str, dict], tolerance):
+    found = []
+    for name, result in results.items():
+        before = baseline.get(name)
+        if not before:
+            continue
+        for key in COUNTS:
+            if result[key] > before[key]:
+                found.append(f"{name}: {key} {before[key]} -> {result[key]}")
+        for key in TIMES:
+            if result[key] > before[key] * (1 + tolerance):
+                found.append(f"{name}: {key} {before[key]:.0f} -> {result[key]:.0f}")
+    return found
+
+
+async def main(args):
+    scenarios = load_scenarios(args.scenarios)
+    if args.record:
+        await record(scenarios, args)
+        return
+
+    results = await benchmark(scenarios, args)
+    report = {
+        "latency_model": {
+            "llm_ttfb_ms": args.llm_ttfb_ms,
+            "prefill_ms_per_1k": args.prefill_ms_per_1k,
+            "tokens_per_second": args.tokens_per_second,
+        },
+        "scenarios": results,
+    }
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=2)
+    print(json.dumps(report, indent=2))
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)["scenarios"]
+        found = regressions(results, baseline, args.tolerance)
+        for line in found:
+            print(f"Regression: {line}", file=sys.stderr)
+        if found:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument(
+        "scenarios", nargs="*", help="scenario names or JSON files (default: all)"
+    )
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--days", type=int, default=14, help="days of seeded slots")
+    parser.add_argument("--occupancy", type=float, default=0.3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--llm-ttfb-ms", type=float, default=350)
+    parser.add_argument("--prefill-ms-per-1k", type=float, default=100)
+    parser.add_argument("--tokens-per-second", type=float, default=80)
+    parser.add_argument("--turn-timeout", type=float, default=60)
+    parser.add_argument("--output", help="write the results here as JSON")
+    parser.add_argument("--baseline", help="results of an earlier run to compare with")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.1,
+        help="allowed relative increase of the simulated time over the baseline",
+    )
+    parser.add_argument("--record", metavar="MODEL_ID")
+    parser.add_argument("--record-dir", default="recorded_scenarios")
+    args = parser.parse_args()
+
+    # bot.py sets up its own log handler when imported
+    import bot  # noqa: F401
+
+    logger.remove()
+    asyncio.run(main(args))
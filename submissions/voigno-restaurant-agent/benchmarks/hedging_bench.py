@@ -0,0 +1,148 @@
+"""TTFB of AgentLLM with and without hedged requests, against a local stub model.
+
+The stub model's time to first token is drawn from a lognormal body plus a slow
+tail, the shape that makes hedging worthwhile. Both modes use the same seed.
+
+    python -m benchmarks.hedging_bench --sessions 20 --turns 10 --time-scale 0.2
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import statistics
+
+from agno.agent import Agent
+from loguru import logger
+from pipecat.frames.frames import (
+    LLMFullResponseEndFrame,
+    LLMMessagesFrame,
+    LLMTextFrame,
+)
+from pipecat.pipeline.pipeline import Pipeline
+from pipecat.pipeline.runner import PipelineRunner
+from pipecat.pipeline.task import PipelineTask
+from pipecat.processors.frame_processor import FrameDirection, FrameProcessor
+
+from agnoagentservice import AgentLLM
+from hedging import HedgingPolicy, TTFBWindow
+from history import ConversationHistory
+from stub_model import StubModel
+
+
+class FirstTokenProbe(FrameProcessor):
+    """Records when the first text of each response reaches the end of the pipeline."""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.first_text = asyncio.Event()
+        self.response_end = asyncio.Event()
+
+    async def process_frame(self, frame, direction: FrameDirection):
+        await super().process_frame(frame, direction)
+        if isinstance(frame, LLMTextFrame):
+            self.first_text.set()
+        elif isinstance(frame, LLMFullResponseEndFrame):
+            self.response_end.set()
+        await self.push_frame(frame, direction)
+
+
+def latency_sampler(rng: random.Random, args):
+    def sample() -> float:
+        if rng.random() < args.tail_fraction:
+            seconds = rng.uniform(args.tail_min, args.tail_max)
+        else:
+            seconds = rng.lognormvariate(args.median_mu, args.sigma)
+        return seconds * args.time_scale
+
+    return sample
+
+
+async def run_session(sampler, hedging, turns: int) -> list:
+    agent = Agent(model=StubModel(ttfb=sampler), stream=True)
+    llm = AgentLLM(agent=agent, history=ConversationHistory(), hedging=hedging)
+    probe = FirstTokenProbe()
+    task = PipelineTask(Pipeline([llm, probe]))
+    runner = asyncio.create_task(PipelineRunner(handle_sigint=False).run(task))
+    await asyncio.sleep(0.05)
+
+    loop = asyncio.get_running_loop()
+    ttfbs = []
+    for turn in range(turns):
+        probe.first_text.clear()
+        probe.response_end.clear()
+        started = loop.time()
+        await task.queue_frame(
+            LLMMessagesFrame(messages=[{"role": "user", "content": f"turn {turn}"}])
+        )
+        await probe.first_text.wait()
+        ttfbs.append(loop.time() - started)
+        await probe.response_end.wait()
+
+    await task.cancel()
+    await runner
+    return ttfbs
+
+
+def percentile(values: list, p: float) -> float:
+    return statistics.quantiles(values, n=100, method="inclusive")[int(p) - 1]
+
+
+async def main(args):
+    results = {}
+    for mode in ("single", "hedged"):
+        # Same seed for both modes; hedged requests draw their latency from the
+        # same distribution as the primary ones
+        rng = random.Random(args.seed)
+        ttfbs = []
+        hedges_sent = hedges_won = 0
+        # Shared by the sessions, like by the calls of a container
+        ttfb = TTFBWindow(
+            initial_deadline=args.initial_deadline * args.time_scale,
+            min_deadline=0.3 * args.time_scale,
+            max_deadline=4.0 * args.time_scale,
+        )
+        for _ in range(args.sessions):
+            hedging = None
+            if mode == "hedged":
+                hedging = HedgingPolicy(ttfb, max_hedges_per_session=args.max_hedges)
+            ttfbs += await run_session(latency_sampler(rng, args), hedging, args.turns)
+            if hedging:
+                hedges_sent += hedging.hedges_sent
+                hedges_won += hedging.hedges_won
+
+        scaled = [t / args.time_scale for t in ttfbs]
+        results[mode] = {
+            "turns": len(scaled),
+            "p50_s": round(percentile(scaled, 50), 3),
+            "p90_s": round(percentile(scaled, 90), 3),
+            "p99_s": round(percentile(scaled, 99), 3),
+            "extra_requests": hedges_sent,
+            "hedges_won": hedges_won,
+        }
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--sessions", type=int, default=20)
+    parser.add_argument("--turns", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--median-mu", type=float, default=-0.9)
+    parser.add_argument("--sigma", type=float, default=0.35)
+    parser.add_argument("--tail-fraction", type=float, default=0.08)
+    parser.add_argument("--tail-min", type=float, default=2.0)
+    parser.add_argument("--tail-max", type=float, default=5.0)
+    parser.add_argument("--initial-deadline", type=float, default=1.0)
+    parser.add_argument("--max-hedges", type=int, default=3)
+    parser.add_argument(
+        "--time-scale",
+        type=float,
+        default=0.2,
+        help="multiply all injected latencies to run faster; results are scaled back",
+    )
+    args = parser.parse_args()
+
+    logger.remove()
+    asyncio.run(main(args))
@@ -0,0 +1,63 @@
+"""Import time of the call server, grouped by top-level package.
+
+Runs `python -X importtime` in a fresh interpreter and sums each module's own
+import time into its top-level package, so the heaviest dependencies stand out.
+
+    python -m benchmarks.import_profile
+    python -m benchmarks.import_profile --module bot --top 15
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+from collections import defaultdict
+
+
+def import_times(module: str) -> list:
+    """(module, self_us, cumulative_us) for every module imported by `module`."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise SystemExit(f"import {module} failed:\n{result.stderr[-2000:]}")
+
+    times = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:") :].split("|")
+        times.append((name.strip(), int(self_us), int(cumulative_us)))
+    return times
+
+
+def main(args):
+    times = import_times(args.module)
+    by_package = defaultdict(int)
+    for name, self_us, _ in times:
+        by_package[name.split(".")[0]] += self_us
+    total_us = next(c for n, _, c in reversed(times) if n == args.module)
+
+    top = sorted(by_package.items(), key=lambda item: item[1], reverse=True)
+    print(
+        json.dumps(
+            {
+                "module": args.module,
+                "total_ms": round(total_us / 1000),
+                "modules": len(times),
+                "packages_ms": {
+                    package: round(us / 1000, 1) for package, us in top[: args.top]
+                },
+            },
+            indent=2,
+        )
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--module", default="server")
+    parser.add_argument("--top", type=int, default=20)
+    main(parser.parse_args())
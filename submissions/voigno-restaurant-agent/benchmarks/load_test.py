@@ -0,0 +1,377 @@
+"""Concurrent-call load test: how many calls a container carries before audio degrades.
+
+For each container size, a call server (server.create_app with LOCAL_PROVIDERS=1,
+see local_providers.py) runs in a child process with CONTAINER_CPU set to the
+size and its CPU affinity limited to that many cores (at least one; a fractional
+size can't be enforced this way, so compare the reported `cpu`, a share of the
+allotment, with 1.0). Admission limits are lifted, so calls beyond them degrade
+instead of being turned away.
+
+The number of concurrent calls then ramps up. Each step opens N fake Twilio
+media streams to /ws-handler, started over `--stagger` seconds, each playing a
+synthesized session in real time (20 ms mu-law frames, see replay.py). Per step:
+
+- turn_ms: end of the caller's utterance to the first bot audio heard
+- server_turn_ms: the server's own turn latency (turn_latency.py)
+- jitter_ms: deviation of the bot audio's inter-arrival times from the
+  duration of the previous message, within a burst of speech
+- late_frames: bot audio messages that arrived after the caller's jitter buffer
+  (`--jitter-buffer-ms`) ran dry, i.e. audible gaps; a pause over 0.5 s starts
+  a new burst instead
+- loop_lag_ms: the server's event loop lag (p99 and worst bucket of the
+  LOOP_WATCHDOG histogram over the step) and its worst 0.5 s sample; cpu:
+  the highest 5 s average
+- client_send_lag_ms: how late the load generator itself sent audio; if this is
+  high, the generator is the bottleneck and the step is not valid
+
+A step passes if turn latency p95, jitter p95, late frames and CPU stay within
+the `--max-*` limits. The ramp stops at the first failing step; the container's
+capacity is the last passing N.
+
+    python -m benchmarks.load_test --cpus 0.125,1 --calls 1,2,4,8 --output capacity.json
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import subprocess
+import sys
+import time
+from typing import Dict, List, Optional
+
+from benchmarks.replay import (
+    DEFAULT_SCRIPT,
+    CallClient,
+    configure_local_server,
+    free_port,
+    start_s3_stand_in,
+    start_server,
+    synthesize_session,
+    with_call_sid,
+)
+
+# Silence between bot messages that starts a new burst rather than a gap
+BURST_GAP = 0.5
+
+
+def percentiles(values: List[float]) -> Dict[str, float]:
+    ordered = sorted(values)
+    if not ordered:
+        return {}
+
+    def at(q: float) -> float:
+        return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))], 1)
+
+    return {"p50": at(0.5), "p95": at(0.95), "max": round(ordered[-1], 1)}
+
+
+def audio_continuity(
+    arrivals: List[float], seconds: List[float], jitter_buffer: float
+) -> dict:
+    """
+    Jitter and late messages of the bot audio one caller received.
+
+    Within a burst, message i is due to play at the burst's first arrival plus
+    `jitter_buffer` plus the audio before it; arriving after that is a gap.
+    """
+    jitter = []
+    late = 0
+    due = None
+    for index, arrival in enumerate(arrivals):
+        if due is None or arrival > due + BURST_GAP:
+            due = arrival + jitter_buffer
+        else:
+            jitter.append(abs(arrival - arrivals[index - 1] - seconds[index - 1]))
+            if arrival > due:
+                late += 1
+                # Playback resumes when the late audio arrives
+                due = arrival
+        due += seconds[index]
+    return {"jitter": jitter, "late": late}
+
+
+def lag_buckets(before: Optional[dict], after: Optional[dict]) -> dict:
+    """
+    Buckets of the 99th percentile and the worst event loop lag between two
+    watchdog histograms.
+    """
+    if not before or not after:
+        return {}
+    counts = [
+        (label, count - before["lag_histogram"].get(label, 0))
+        for label, count in after["lag_histogram"].items()
+    ]
+    total = sum(count for _, count in counts)
+    buckets = {}
+    seen = 0
+    for label, count in counts:
+        seen += count
+        if total and seen >= 0.99 * total:
+            buckets.setdefault("p99", label)
+        if count:
+            buckets["max"] = label
+    return buckets
+
+
+async def serve(cpu: float, port: int, script: str):
+    """Child process: a call server on local providers until terminated."""
+    if hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, set(range(max(1, math.ceil(cpu)))))
+    os.environ.update(
+        CONTAINER_CPU=str(cpu),
+        LOOP_WATCHDOG="1",
+        MAX_SESSIONS="100000",
+        MAX_CPU="100000",
+        MAX_LOOP_LAG_MS="100000",
+        MAX_MEMORY_MB="100000",
+    )
+    bot = configure_local_server(script, "WARNING")
+    moto = start_s3_stand_in(bot.RECORDING_BUCKET)
+    # uvicorn shuts down on SIGTERM
+    _, task = await start_server(port)
+    print("READY", flush=True)
+    try:
+        await task
+    finally:
+        if moto:
+            moto.stop()
+
+
+class LoadStep:
+    """One step of the ramp: `calls` concurrent calls against a running server."""
+
+    def __init__(self, base_url: str, session: List[dict], calls: int, args):
+        self.base_url = base_url
+        self.session = session
+        self.calls = calls
+        self.args = args
+        self.cpu = 0.0
+        self.loop_lag = 0.0
+        self.rejected = 0
+
+    async def run(self, step: int) -> dict:
+        import httpx
+
+        async with httpx.AsyncClient(base_url=self.base_url, timeout=10) as http:
+            before = (await http.get("/metrics")).json()
+            ws_url = self.base_url.replace("http", "ws", 1) + "/ws-handler"
+            clients = [
+                CallClient(ws_url, with_call_sid(self.session, f"CAload{step}x{i}"))
+                for i in range(self.calls)
+            ]
+            poller = asyncio.create_task(self._poll(http))
+            results = await asyncio.gather(
+                *(self._call(client, i) for i, client in enumerate(clients)),
+                return_exceptions=True,
+            )
+            poller.cancel()
+            # Give the observers time to record the last turns
+            await asyncio.sleep(0.5)
+            after = (await http.get("/metrics")).json()
+            server_turns = []
+            for client in clients:
+                turns = (await http.get(f"/turns/{client.call_sid}")).json()
+                server_turns += [t["total_ms"] for t in turns if t["complete"]]
+
+        completed = [r for r in results if isinstance(r, dict)]
+        jitter, late, messages = [], 0, 0
+        for client in clients:
+            continuity = audio_continuity(
+                client.received,
+                client.received_seconds,
+                self.args.jitter_buffer_ms / 1000,
+            )
+            jitter += continuity["jitter"]
+            late += continuity["late"]
+            messages += len(client.received)
+        turn_ms = [ms for r in completed for ms in r["heard_after_ms"] if ms]
+        missing = sum(len(c.utterance_ends) for c in clients) - len(turn_ms)
+        return {
+            "calls": self.calls,
+            "failed": len(results) - len(completed),
+            "rejected": self.rejected,
+            "turn_ms": percentiles(turn_ms),
+            "unanswered_turns": missing,
+            "server_turn_ms": percentiles(server_turns),
+            "greeting_ms": percentiles(
+                [r["greeting_ms"] for r in completed if r["greeting_ms"] is not None]
+            ),
+            "jitter_ms": percentiles([j * 1000 for j in jitter]),
+            "late_frames": late,
+            "frames_received": messages,
+            "loop_lag_ms": {
+                **lag_buckets(before.get("loop_watchdog"), after.get("loop_watchdog")),
+                "max_sample": self.loop_lag,
+            },
+            "cpu": self.cpu,
+            "memory_mb": after["memory_mb"],
+            "client_send_lag_ms": max(
+                (r["send_lag_ms"] for r in completed), default=None
+            ),
+        }
+
+    async def _call(self, client: CallClient, index: int) -> dict:
+        await asyncio.sleep(self.args.stagger * index / max(1, self.calls))
+        try:
+            return await client.run()
+        except Exception as e:
+            # The server turns a call away by closing the handshake
+            if "403" in str(e):
+                self.rejected += 1
+            raise
+
+    async def _poll(self, http):
+        while True:
+            await asyncio.sleep(1.0)
+            try:
+                metrics = (await http.get("/metrics")).json()
+            except Exception:
+                continue
+            self.cpu = max(self.cpu, metrics["cpu"])
+            self.loop_lag = max(self.loop_lag, metrics["loop_lag_ms"])
+
+
+def passes(result: dict, args) -> bool:
+    return (
+        not result["failed"]
+        and not result["unanswered_turns"]
+        and result["turn_ms"].get("p95", math.inf) <= args.max_turn_p95_ms
+        and result["jitter_ms"].get("p95", 0) <= args.max_jitter_p95_ms
+        and result["late_frames"] <= args.max_late_frames
+        and result["cpu"] <= args.max_cpu
+    )
+
+
+async def run_container(cpu: float, session: List[dict], args) -> dict:
+    import httpx
+
+    port = free_port()
+    env = dict(os.environ)
+    for name in ("stt", "llm", "tts"):
+        latency = getattr(args, f"{name}_latency_ms")
+        if latency is not None:
+            env[f"LOCAL_{name.upper()}_LATENCY_MS"] = str(latency)
+    process = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "benchmarks.load_test",
+            "--child",
+            str(cpu),
+            str(port),
+            "--script",
+            args.script,
+        ],
+        stdout=subprocess.PIPE,
+        stderr=None if args.server_log else subprocess.DEVNULL,
+        text=True,
+        env=env,
+    )
+    for line in process.stdout:
+        if line.startswith("READY"):
+            break
+    else:
+        raise SystemExit("server did not start, run with --server-log to see why")
+
+    base_url = f"http://127.0.0.1:{port}"
+    steps = []
+    capacity = 0
+    try:
+        # Let the phrase cache warm up before the first call
+        await asyncio.sleep(1.0)
+        for index, calls in enumerate(args.calls):
+            result = await LoadStep(base_url, session, calls, args).run(index)
+            result["passed"] = passes(result, args)
+            steps.append(result)
+            print(f"cpu={cpu} {json.dumps(result)}", file=sys.stderr)
+            if not result["passed"]:
+                break
+            capacity = calls
+            # Let recordings upload and sessions close between steps
+            await asyncio.sleep(2.0)
+        async with httpx.AsyncClient(base_url=base_url) as http:
+            idle = (await http.get("/metrics")).json()["memory_mb"]
+    finally:
+        # Graceful shutdown: the server drains its recording uploads
+        process.terminate()
+        try:
+            process.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            process.kill()
+    return {"cpu": cpu, "capacity": capacity, "idle_memory_mb": idle, "steps": steps}
+
+
+async def main(args):
+    with open(args.script) as file:
+        transcripts = json.load(file).get("transcripts", [])
+    session = synthesize_session([args.utterance] * len(transcripts), pause=args.pause)
+    started = time.time()
+    containers = [await run_container(cpu, session, args) for cpu in args.cpus]
+    report = {
+        "started": started,
+        "session_seconds": round(int(session[-2]["media"]["timestamp"]) / 1000, 1),
+        "limits": {
+            "max_turn_p95_ms": args.max_turn_p95_ms,
+            "max_jitter_p95_ms": args.max_jitter_p95_ms,
+            "max_late_frames": args.max_late_frames,
+            "max_cpu": args.max_cpu,
+            "jitter_buffer_ms": args.jitter_buffer_ms,
+        },
+        "containers": containers,
+    }
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=2)
+    print(
+        json.dumps(
+            {str(c["cpu"]): c["capacity"] for c in containers},
+            indent=2,
+        )
+    )
+
+
+def _numbers(kind):
+    return lambda text: [kind(value) for value in text.split(",")]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument(
+        "--cpus",
+        type=_numbers(float),
+        default=[0.125],
+        help="container sizes in CPUs, comma separated",
+    )
+    parser.add_argument(
+        "--calls",
+        type=_numbers(int),
+        default=[1, 2, 4, 8, 16],
+        help="concurrent calls per step, comma separated",
+    )
+    parser.add_argument("--script", default=DEFAULT_SCRIPT)
+    parser.add_argument("--utterance", type=float, default=2.0)
+    parser.add_argument("--pause", type=float, default=5.0)
+    parser.add_argument(
+        "--stagger", type=float, default=2.0, help="seconds to start a step's calls"
+    )
+    parser.add_argument("--stt-latency-ms", type=float)
+    parser.add_argument("--llm-latency-ms", type=float)
+    parser.add_argument("--tts-latency-ms", type=float)
+    parser.add_argument("--jitter-buffer-ms", type=float, default=60)
+    parser.add_argument("--max-turn-p95-ms", type=float, default=1500)
+    parser.add_argument("--max-jitter-p95-ms", type=float, default=20)
+    parser.add_argument("--max-late-frames", type=int, default=0)
+    parser.add_argument("--max-cpu", type=float, default=0.9)
+    parser.add_argument("--output", help="write the capacity curve here as JSON")
+    parser.add_argument(
+        "--server-log", action="store_true", help="show the server's warnings"
+    )
+    parser.add_argument("--child", nargs=2, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        asyncio.run(serve(float(args.child[0]), int(args.child[1]), args.script))
+    else:
+        asyncio.run(main(args))
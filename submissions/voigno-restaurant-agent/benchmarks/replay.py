@@ -0,0 +1,387 @@
+"""Replay a Twilio media-stream session into the call server, offline.
+
+The server (server.create_app) runs in-process with LOCAL_PROVIDERS=1, so STT,
+LLM, TTS and MongoDB are the stand-ins of local_providers.py, driven by a
+script. The session's messages (connected, start, media, stop) are sent over a
+real websocket to /ws-handler at the pace of their media timestamps.
+
+A session is a JSON-lines file of Twilio messages as received by the websocket.
+Without one, a session is synthesized: a lead-in while the greeting plays, then
+one tone burst per scripted transcript, separated by pauses for the reply.
+
+Per turn it reports the time from the end of the caller's utterance to the
+first bot audio received (what the caller hears, fillers included), and the
+server's stage breakdown (turn_latency.py). Recordings go to an in-process moto
+S3 if moto is installed.
+
+    python -m benchmarks.replay --runs 3
+    python -m benchmarks.replay --session call.jsonl --script benchmarks/scripts/booking.json
+"""
+
+import argparse
+import asyncio
+import base64
+import json
+import os
+import socket
+import statistics
+import sys
+import tempfile
+import time
+from typing import List, Optional
+
+from recording_codecs import pcm_to_ulaw, ulaw_to_pcm
+
+SAMPLE_RATE = 8000
+FRAME_MS = 20
+DEFAULT_SCRIPT = os.path.join(os.path.dirname(__file__), "scripts", "booking.json")
+
+
+def media_message(stream_sid: str, chunk: int, pcm: bytes) -> dict:
+    return {
+        "event": "media",
+        "sequenceNumber": str(chunk + 2),
+        "media": {
+            "track": "inbound",
+            "chunk": str(chunk + 1),
+            "timestamp": str(chunk * FRAME_MS),
+            "payload": base64.b64encode(pcm_to_ulaw(pcm)).decode(),
+        },
+        "streamSid": stream_sid,
+    }
+
+
+def synthesize_session(
+    utterances: List[float],
+    *,
+    lead_in: float = 6.0,
+    pause: float = 5.0,
+    call_sid: str = "CAreplay",
+    stream_sid: str = "MZreplay",
+    caller: str = "+15550001111",
+) -> List[dict]:
+    """
+    Twilio messages of a call: `lead_in` seconds of silence, then a tone of each
+    length in `utterances`, each followed by `pause` seconds of silence.
+    """
+    from local_providers import tone
+
+    frame_bytes = SAMPLE_RATE * FRAME_MS // 1000 * 2
+    silence = b"\0" * frame_bytes
+    audio = bytearray(silence * int(lead_in * 1000 / FRAME_MS))
+    for seconds in utterances:
+        audio += tone(seconds, SAMPLE_RATE)
+        audio += silence * int(pause * 1000 / FRAME_MS)
+
+    messages = [
+        {"event": "connected", "protocol": "Call", "version": "1.0.0"},
+        {
+            "event": "start",
+            "sequenceNumber": "1",
+            "start": {
+                "accountSid": "ACreplay",
+                "streamSid": stream_sid,
+                "callSid": call_sid,
+                "tracks": ["inbound"],
+                "mediaFormat": {
+                    "encoding": "audio/x-mulaw",
+                    "sampleRate": SAMPLE_RATE,
+                    "channels": 1,
+                },
+                "customParameters": {"From": caller, "To": "+15550009999"},
+            },
+            "streamSid": stream_sid,
+        },
+    ]
+    for chunk, offset in enumerate(range(0, len(audio), frame_bytes)):
+        pcm = bytes(audio[offset : offset + frame_bytes]).ljust(frame_bytes, b"\0")
+        messages.append(media_message(stream_sid, chunk, pcm))
+    messages.append(
+        {
+            "event": "stop",
+            "sequenceNumber": str(len(messages)),
+            "streamSid": stream_sid,
+            "stop": {"accountSid": "ACreplay", "callSid": call_sid},
+        }
+    )
+    return messages
+
+
+def load_session(path: str) -> List[dict]:
+    with open(path) as file:
+        return [json.loads(line) for line in file if line.strip()]
+
+
+def write_session(path: str, messages: List[dict]):
+    with open(path, "w") as file:
+        for message in messages:
+            file.write(json.dumps(message) + "\n")
+
+
+def with_call_sid(messages: List[dict], call_sid: str) -> List[dict]:
+    """A copy of a session whose start message carries another call SID."""
+    copied = [dict(message) for message in messages]
+    for message in copied:
+        if message.get("event") == "start":
+            message["start"] = {**message["start"], "callSid": call_sid}
+    return copied
+
+
+class CallClient:
+    """
+    Plays a session to the server like Twilio would and times the bot's audio.
+
+    A caller utterance ends where its audio goes quiet for at least `min_pause`
+    seconds; the reply latency is from there to the first media message from
+    the bot.
+
+    Args:
+        url: Websocket URL of /ws-handler
+        messages: Session to play
+        threshold: Level (RMS, fraction of full scale) that counts as voiced
+        min_pause: Seconds of quiet that end an utterance
+    """
+
+    def __init__(
+        self,
+        url: str,
+        messages: List[dict],
+        threshold: float = 0.02,
+        min_pause: float = 0.3,
+    ):
+        self.url = url
+        self.messages = messages
+        self.threshold = threshold
+        self.min_pause = min_pause
+        self.utterance_ends: List[float] = []
+        self.utterance_starts: List[float] = []
+        self.received: List[float] = []
+        # Seconds of audio in each media message received
+        self.received_seconds: List[float] = []
+        # Worst delay of a media message behind its timestamp, client side
+        self.send_lag = 0.0
+        self.clears = 0
+        self.connected_at = 0.0
+
+    @property
+    def call_sid(self) -> Optional[str]:
+        for message in self.messages:
+            if message.get("event") == "start":
+                return message["start"]["callSid"]
+        return None
+
+    async def run(self) -> dict:
+        import websockets
+
+        async with websockets.connect(self.url, max_size=None) as websocket:
+            self.connected_at = time.monotonic()
+            receiver = asyncio.create_task(self._receive(websocket))
+            try:
+                await self._send(websocket)
+            finally:
+                await websocket.close()
+                await asyncio.gather(receiver, return_exceptions=True)
+        return self.report()
+
+    async def _send(self, websocket):
+        from local_providers import pcm_level
+
+        voiced = False
+        quiet_since = None
+        started = None
+        for message in self.messages:
+            if message.get("event") == "media":
+                if started is None:
+                    started = time.monotonic()
+                due = started + int(message["media"]["timestamp"]) / 1000
+                await asyncio.sleep(max(0.0, due - time.monotonic()))
+                pcm = ulaw_to_pcm(base64.b64decode(message["media"]["payload"]))
+                now = time.monotonic()
+                self.send_lag = max(self.send_lag, now - due)
+                if pcm_level(pcm) >= self.threshold:
+                    if not voiced:
+                        voiced = True
+                        self.utterance_starts.append(now)
+                    quiet_since = None
+                elif voiced:
+                    quiet_since = quiet_since or now
+                    # Short gaps between words don't end the utterance
+                    if now - quiet_since >= self.min_pause:
+                        voiced = False
+                        self.utterance_ends.append(quiet_since)
+            await websocket.send(json.dumps(message))
+
+    async def _receive(self, websocket):
+        try:
+            async for raw in websocket:
+                message = json.loads(raw)
+                if message.get("event") == "media":
+                    self.received.append(time.monotonic())
+                    # 8-bit mu-law: one byte per sample
+                    payload = base64.b64decode(message["media"]["payload"])
+                    self.received_seconds.append(len(payload) / SAMPLE_RATE)
+                elif message.get("event") == "clear":
+                    self.clears += 1
+        except Exception:
+            pass
+
+    def report(self) -> dict:
+        greeting = next(
+            (t - self.connected_at for t in self.received if t >= self.connected_at),
+            None,
+        )
+        turns = []
+        for index, end in enumerate(self.utterance_ends):
+            next_start = (
+                self.utterance_starts[index + 1]
+                if index + 1 < len(self.utterance_starts)
+                else float("inf")
+            )
+            heard = next((t for t in self.received if end <= t < next_start), None)
+            turns.append(round((heard - end) * 1000) if heard else None)
+        return {
+            "call_sid": self.call_sid,
+            "greeting_ms": round(greeting * 1000) if greeting is not None else None,
+            "heard_after_ms": turns,
+            "media_received": len(self.received),
+            "clears": self.clears,
+            "send_lag_ms": round(self.send_lag * 1000),
+        }
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_s3_stand_in(bucket: str):
+    """In-process moto S3 for the call recordings, if moto is installed."""
+    try:
+        import boto3
+        from moto.server import ThreadedMotoServer
+    except ImportError:
+        print("moto is not installed: recordings will fail to upload", file=sys.stderr)
+        return None
+    port = free_port()
+    moto = ThreadedMotoServer(port=port, verbose=False)
+    moto.start()
+    endpoint = f"http://127.0.0.1:{port}"
+    os.environ.update(
+        S3_ENDPOINT_URL=endpoint,
+        AWS_ACCESS_KEY_ID="replay",
+        AWS_SECRET_ACCESS_KEY="replay",
+        AWS_DEFAULT_REGION="us-east-1",
+    )
+    boto3.client("s3", endpoint_url=endpoint).create_bucket(Bucket=bucket)
+    return moto
+
+
+def configure_local_server(script: str, log_level: str):
+    """Environment for an in-process server on local providers; call before importing it."""
+    os.environ["LOCAL_PROVIDERS"] = "1"
+    os.environ["LOCAL_PROVIDERS_SCRIPT"] = script
+    os.environ.setdefault("RECORDING_SPILL_DIR", tempfile.mkdtemp(prefix="replay_"))
+    # The benchmark process also runs the client and S3; only limit sessions
+    os.environ.setdefault("CONTAINER_CPU", str(os.cpu_count() or 1))
+    os.environ.setdefault("MAX_MEMORY_MB", "100000")
+    os.environ.setdefault("MAX_LOOP_LAG_MS", "100000")
+
+    import bot
+    from loguru import logger
+
+    logger.remove()
+    logger.add(sys.stderr, level=log_level)
+    return bot
+
+
+async def start_server(port: int):
+    import uvicorn
+
+    import server
+
+    # Recordings go to a local S3 or nowhere; don't wait the production 20 s
+    server.RECORDING_DRAIN_SECONDS = 2
+    uvicorn_server = uvicorn.Server(
+        uvicorn.Config(
+            server.create_app(), host="127.0.0.1", port=port, log_level="warning"
+        )
+    )
+    task = asyncio.create_task(uvicorn_server.serve())
+    while not uvicorn_server.started:
+        if task.done():
+            task.result()
+        await asyncio.sleep(0.05)
+    return uvicorn_server, task
+
+
+async def stop_server(uvicorn_server, task):
+    uvicorn_server.should_exit = True
+    await task
+
+
+async def main(args):
+    bot = configure_local_server(args.script, args.log_level)
+    moto = start_s3_stand_in(bot.RECORDING_BUCKET)
+
+    if args.session:
+        session = load_session(args.session)
+    else:
+        with open(args.script) as file:
+            transcripts = json.load(file).get("transcripts", [])
+        session = synthesize_session([args.utterance] * len(transcripts))
+    if args.write_session:
+        write_session(args.write_session, session)
+
+    port = free_port()
+    uvicorn_server, task = await start_server(port)
+    results = []
+    try:
+        for run in range(args.runs):
+            client = CallClient(
+                f"ws://127.0.0.1:{port}/ws-handler",
+                with_call_sid(session, f"CAreplay{run}"),
+            )
+            result = await client.run()
+            # Give the observer time to record the last turn
+            await asyncio.sleep(0.5)
+            result["server_turns"] = bot.turn_latency.turns(client.call_sid)
+            results.append(result)
+            print(json.dumps(result), file=sys.stderr)
+    finally:
+        await stop_server(uvicorn_server, task)
+        if moto:
+            moto.stop()
+
+    heard = [ms for result in results for ms in result["heard_after_ms"] if ms]
+    greetings = [r["greeting_ms"] for r in results if r["greeting_ms"] is not None]
+    print(
+        json.dumps(
+            {
+                "runs": args.runs,
+                "turns_per_run": [len(r["heard_after_ms"]) for r in results],
+                "greeting_median_ms": (
+                    statistics.median(greetings) if greetings else None
+                ),
+                "heard_after_median_ms": statistics.median(heard) if heard else None,
+                "server": bot.turn_latency.stats(),
+            },
+            indent=2,
+        )
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--session", help="JSON-lines Twilio session to replay")
+    parser.add_argument("--script", default=DEFAULT_SCRIPT)
+    parser.add_argument("--runs", type=int, default=1)
+    parser.add_argument(
+        "--utterance",
+        type=float,
+        default=2.0,
+        help="seconds per caller utterance of a synthesized session",
+    )
+    parser.add_argument("--write-session", help="save the replayed session here")
+    parser.add_argument("--log-level", default="WARNING")
+    asyncio.run(main(parser.parse_args()))
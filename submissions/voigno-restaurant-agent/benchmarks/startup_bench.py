@@ -0,0 +1,108 @@
+"""Boot-to-ready time of a call server container, by startup phase.
+
+Each run starts a fresh interpreter that goes through the same phases as a
+Modal container of app.py's WebsocketServer:
+
+    import    import server (pipecat, agno, providers; compiles the prompt)
+    load      server.load(): VAD model and tool schemas   } in the memory snapshot
+    connect   server.connect(): network clients             } after every restore
+    startup   the FastAPI startup event                     }
+
+`boot_to_ready` is the wall time from spawning the process to the end of
+startup, including the interpreter itself. With memory snapshots only the
+phases after `load` run on a new container, plus Modal's restore.
+
+    python -m benchmarks.startup_bench --runs 5
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+PHASES = ("import", "load", "connect", "startup")
+
+
+async def _child(mongo_uri: str):
+    timings = {}
+    started = time.perf_counter()
+
+    import server
+
+    timings["import"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    server.load()
+    timings["load"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    os.environ.setdefault("MONGODB_URI", mongo_uri)
+    server.connect()
+    timings["connect"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    web_app = server.create_app()
+    # Runs the startup event on enter and the shutdown event on exit
+    async with web_app.router.lifespan_context(web_app):
+        timings["startup"] = time.perf_counter() - started
+        print("READY " + json.dumps(timings), flush=True)
+
+
+def run_once(mongo_uri: str) -> dict:
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "benchmarks.startup_bench", "--child", mongo_uri],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+        text=True,
+    )
+    for line in process.stdout:
+        if line.startswith("READY "):
+            timings = json.loads(line[len("READY ") :])
+            timings["boot_to_ready"] = time.perf_counter() - started
+            break
+    else:
+        raise SystemExit("server did not start, run with --child to see why")
+    process.wait()
+    return timings
+
+
+def main(args):
+    runs = [run_once(args.mongo_uri) for _ in range(args.runs)]
+    median = {
+        name: round(statistics.median(run[name] for run in runs) * 1000)
+        for name in (*PHASES, "boot_to_ready")
+    }
+    after_restore = median["connect"] + median["startup"]
+    print(
+        json.dumps(
+            {
+                "runs": args.runs,
+                "median_ms": median,
+                "snapshot_phases_ms": median["import"] + median["load"],
+                "post_restore_phases_ms": after_restore,
+            },
+            indent=2,
+        )
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument(
+        "--mongo-uri",
+        default="mongodb://localhost:27017",
+        help="used if MONGODB_URI isn't set; the client connects lazily",
+    )
+    parser.add_argument("--child", metavar="MONGO_URI", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        asyncio.run(_child(args.child))
+    else:
+        main(args)
@@ -0,0 +1,271 @@
+"""Replay a recorded tool-call trace against a toolkit backend.
+
+A trace is the JSON-lines file AgentLLM appends to when the server runs with
+TOOL_TRACE_PATH (tool_trace.py): one record per tool call of every call, with
+its start time, arguments, duration and result size. The replay runs the same
+calls on a RestaurantBookingToolkit over the database of toolkit_bench.py
+(seeded mongomock, or a local mongod with `--mongo-uri`), each call's tool calls
+in order and different calls concurrently, at the original pace divided by
+`--speed` (0: back to back).
+
+Dates in the arguments are shifted so the trace's first day is today, where
+the seeded days are; `--keep-dates` replays them as recorded. With `--cache`,
+each call's tool calls go through a ToolResultCache of its own like in
+production, to see what a cache change does to the hit rate and latency.
+
+Per tool it reports the recorded and replayed p50/p95 latency, database round
+trips and result sizes, plus how far the replay fell behind the trace's pace:
+
+    python -m benchmarks.tool_trace_replay trace.jsonl --speed 10 --output replay.json
+    python -m benchmarks.tool_trace_replay trace.jsonl --speed 0 --baseline replay.json
+"""
+
+import argparse
+import asyncio
+import json
+import re
+import statistics
+import sys
+import time
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from typing import Dict, List
+
+from benchmarks.toolkit_bench import (
+    add_database_arguments,
+    close_database,
+    create_toolkit,
+    database_report,
+    percentile,
+    timed_call,
+)
+
+# Compared with --baseline; any increase of a count is a regression
+COUNTS = ("round_trips",)
+TIMES = ("p95_ms",)
+DATE = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+
+
+def shift_dates(arguments: dict, days: int) -> dict:
+    """The arguments with every YYYY-MM-DD value moved by `days`."""
+    shifted = {}
+    for name, value in arguments.items():
+        if isinstance(value, str) and DATE.match(value):
+            moved = datetime.strptime(value, "%Y-%m-%d") + timedelta(days=days)
+            value = moved.strftime("%Y-%m-%d")
+        shifted[name] = value
+    return shifted
+
+
+class TraceReplay:
+    """
+    Replays trace records on a toolkit and collects a result per record.
+
+    Args:
+        toolkit: RestaurantBookingToolkit to run the tool calls on
+        records: Trace records, oldest first
+        speed: Divides the trace's gaps between tool calls; 0 replays back to back
+        date_shift: Days added to every date argument
+        cache: Put a ToolResultCache per call in front of the toolkit
+    """
+
+    def __init__(
+        self,
+        toolkit,
+        records: List[dict],
+        speed: float = 1.0,
+        date_shift: int = 0,
+        cache: bool = False,
+    ):
+        self.toolkit = toolkit
+        self.records = records
+        self.speed = speed
+        self.date_shift = date_shift
+        self.cache = cache
+        self.results: List[dict] = []
+        self.skipped: Dict[str, int] = defaultdict(int)
+
+    async def run(self) -> float:
+        """Replay all calls; returns the wall time in seconds."""
+        by_call: Dict[str, List[dict]] = defaultdict(list)
+        for record in self.records:
+            by_call[record["call"]].append(record)
+        started = time.monotonic()
+        await asyncio.gather(
+            *(self._replay_call(calls, started) for calls in by_call.values())
+        )
+        return time.monotonic() - started
+
+    async def _replay_call(self, records: List[dict], started: float):
+        from tool_cache import ToolResultCache
+
+        cache = ToolResultCache() if self.cache else None
+        first = self.records[0]["ts"]
+        for record in records:
+            name = record["tool"]
+            function = getattr(self.toolkit, name, None)
+            if function is None or not callable(function):
+                self.skipped[name] += 1
+                continue
+
+            due = started
+            if self.speed:
+                due += (record["ts"] - first) / self.speed
+                await asyncio.sleep(max(0.0, due - time.monotonic()))
+            lateness = time.monotonic() - due if self.speed else 0.0
+
+            arguments = shift_dates(record["args"], self.date_shift)
+            if cache:
+                call = lambda **kwargs: cache(name, function, kwargs)  # noqa: E731
+            else:
+                call = function
+            seconds, round_trips, result = await asyncio.to_thread(
+                timed_call, call, arguments
+            )
+            self.results.append(
+                {
+                    "tool": name,
+                    "recorded_ms": record["ms"],
+                    "ms": seconds * 1000,
+                    "round_trips": round_trips,
+                    "recorded_bytes": record["bytes"],
+                    "bytes": len(str(result).encode()),
+                    "recorded_cached": record.get("cached"),
+                    "cached": cache.was_hit(name, arguments) if cache else None,
+                    "lateness_ms": lateness * 1000,
+                }
+            )
+
+    def report(self) -> Dict[str, dict]:
+        by_tool: Dict[str, List[dict]] = defaultdict(list)
+        for result in self.results:
+            by_tool[result["tool"]].append(result)
+        report = {}
+        for name, results in sorted(by_tool.items()):
+            recorded = [result["recorded_ms"] for result in results]
+            replayed = [result["ms"] for result in results]
+            report[name] = {
+                "calls": len(results),
+                "recorded_p50_ms": round(statistics.median(recorded), 3),
+                "recorded_p95_ms": round(percentile(recorded, 0.95), 3),
+                "p50_ms": round(statistics.median(replayed), 3),
+                "p95_ms": round(percentile(replayed, 0.95), 3),
+                "max_ms": round(max(replayed), 3),
+                "round_trips": round(
+                    statistics.mean(result["round_trips"] for result in results), 2
+                ),
+                "recorded_bytes": round(
+                    statistics.mean(result["recorded_bytes"] for result in results)
+                ),
+                "bytes": round(statistics.mean(result["bytes"] for result in results)),
+                "recorded_cache_hits": sum(
+                    1 for result in results if result["recorded_cached"]
+                ),
+            }
+            if self.cache:
+                report[name]["cache_hits"] = sum(
+                    1 for result in results if result["cached"]
+                )
+        return report
+
+
+def regressions(results: Dict[str, dict], baseline: Dict[str, dict], tolerance):
+    found = []
+    for name, result in results.items():
+        before = baseline.get(name)
+        if not before:
+            continue
+        for key in COUNTS:
+            if result[key] > before[key]:
+                found.append(f"{name}: {key} {before[key]} -> {result[key]}")
+        for key in TIMES:
+            if result[key] > before[key] * (1 + tolerance):
+                found.append(f"{name}: {key} {before[key]:.2f} -> {result[key]:.2f}")
+    return found
+
+
+def main(args):
+    from tool_trace import read_trace
+
+    records = read_trace(args.trace)
+    if not records:
+        sys.exit(f"No tool calls in {args.trace}")
+    date_shift = 0
+    if not args.keep_dates:
+        date_shift = (date.today() - date.fromtimestamp(records[0]["ts"])).days
+
+    client, toolkit = create_toolkit(args)
+    try:
+        replay = TraceReplay(
+            toolkit,
+            records,
+            speed=args.speed,
+            date_shift=date_shift,
+            cache=args.cache,
+        )
+        wall = asyncio.run(replay.run())
+    finally:
+        close_database(client, args)
+
+    lateness = [result["lateness_ms"] for result in replay.results]
+    results = replay.report()
+    report = {
+        "trace": args.trace,
+        "tool_calls": len(replay.results),
+        "calls": len({record["call"] for record in records}),
+        "trace_seconds": round(records[-1]["ts"] - records[0]["ts"], 3),
+        "speed": args.speed,
+        "date_shift_days": date_shift,
+        "cache": args.cache,
+        "wall_seconds": round(wall, 3),
+        "lateness_p95_ms": round(percentile(lateness, 0.95), 3) if lateness else None,
+        "skipped": dict(replay.skipped),
+        "database": database_report(args),
+        "tools": results,
+    }
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=2)
+    print(json.dumps(report, indent=2))
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)["tools"]
+        found = regressions(results, baseline, args.tolerance)
+        for line in found:
+            print(f"Regression: {line}", file=sys.stderr)
+        if found:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("trace", help="JSON-lines trace written via TOOL_TRACE_PATH")
+    parser.add_argument(
+        "--speed",
+        type=float,
+        default=1.0,
+        help="replay this many times faster than recorded; 0 for back to back",
+    )
+    parser.add_argument(
+        "--keep-dates", action="store_true", help="don't move dates to today"
+    )
+    parser.add_argument(
+        "--cache", action="store_true", help="a ToolResultCache per call"
+    )
+    add_database_arguments(parser)
+    parser.add_argument("--output", help="write the results here as JSON")
+    parser.add_argument("--baseline", help="results of an earlier run to compare with")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.25,
+        help="allowed relative increase of the p95 latency over the baseline",
+    )
+    args = parser.parse_args()
+
+    # local_providers logs as it imports pipecat
+    from loguru import logger
+
+    logger.remove()
+    main(args)
@@ -0,0 +1,336 @@
+"""Latency and database round trips of the booking tools, under concurrency.
+
+The toolkit runs on a mongomock database (or a local mongod with `--mongo-uri`)
+seeded like a restaurant that has been open a while: `--history-days` of past
+days and `--days` ahead, each a collection of slots booked at an occupancy that
+cycles through `--occupancy` (weekday-like by default), for `--customers`
+repeat callers.
+
+Each tool in TOOLS is called `--calls` times with seeded random arguments at
+every `--concurrency` level, from that many threads at once, like the tool
+calls of concurrent calls sharing one database. Per tool and level it reports
+the p50/p95/max latency, throughput and database round trips per call.
+
+A round trip is one operation on the database or a collection (find, find_one,
+update_one, list_collection_names): the day collections hold fewer documents
+than a first cursor batch, so a find never needs a getMore. mongomock answers
+in microseconds; `--rtt-ms` adds that network latency to every round trip, so
+the latency of a tool against Atlas can be estimated from the same run.
+
+    python -m benchmarks.toolkit_bench --output toolkit.json
+    python -m benchmarks.toolkit_bench --baseline toolkit.json
+    python -m benchmarks.toolkit_bench --mongo-uri mongodb://localhost:27017
+
+With `--mongo-uri` the `--db-name` database (default toolkit_bench) is dropped
+and reseeded; never point it at the production database.
+"""
+
+import argparse
+import contextvars
+import json
+import random
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from typing import Callable, Dict, List, Optional
+
+# Compared with --baseline; any increase of a count is a regression
+COUNTS = ("round_trips",)
+TIMES = ("p95_ms",)
+# Database operations the toolkit uses, each one round trip
+OPERATIONS = {
+    "find",
+    "find_one",
+    "update_one",
+    "update_many",
+    "insert_one",
+    "insert_many",
+    "delete_one",
+    "delete_many",
+    "count_documents",
+    "list_collection_names",
+}
+# Busier towards the weekend, cycled from the first seeded day
+DEFAULT_OCCUPANCY = "0.3,0.25,0.35,0.5,0.8,0.95,0.7"
+
+# Round trips of the tool call running in this thread
+current_round_trips: contextvars.ContextVar[Optional[List[int]]] = (
+    contextvars.ContextVar("current_round_trips", default=None)
+)
+
+
+class RoundTripCounter:
+    """
+    Wraps a pymongo or mongomock database, or one of its collections, and
+    counts each operation against the current tool call, sleeping `rtt`
+    seconds per operation to stand in for the network.
+    """
+
+    def __init__(self, target, rtt: float = 0.0):
+        self._target = target
+        self._rtt = rtt
+
+    def __getitem__(self, name: str):
+        return RoundTripCounter(self._target[name], self._rtt)
+
+    def __getattr__(self, name: str):
+        attribute = getattr(self._target, name)
+        if name not in OPERATIONS:
+            return attribute
+
+        def operation(*args, **kwargs):
+            counter = current_round_trips.get()
+            if counter is not None:
+                counter[0] += 1
+            if self._rtt:
+                time.sleep(self._rtt)
+            return attribute(*args, **kwargs)
+
+        return operation
+
+
+def add_database_arguments(parser: argparse.ArgumentParser):
+    """Options of create_database and RoundTripCounter, shared with tool_trace_replay."""
+    parser.add_argument("--mongo-uri", help="local mongod instead of mongomock")
+    parser.add_argument("--db-name", default="toolkit_bench")
+    parser.add_argument("--history-days", type=int, default=180)
+    parser.add_argument("--days", type=int, default=180, help="seeded days ahead")
+    parser.add_argument(
+        "--occupancy",
+        default=DEFAULT_OCCUPANCY,
+        help="comma-separated share of booked slots per day, cycled",
+    )
+    parser.add_argument("--customers", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--rtt-ms", type=float, default=0, help="added latency per round trip"
+    )
+
+
+def database_report(args) -> dict:
+    return {
+        "backend": "mongod" if args.mongo_uri else "mongomock",
+        "history_days": args.history_days,
+        "days": args.days,
+        "occupancy": args.occupancy,
+        "customers": args.customers,
+        "rtt_ms": args.rtt_ms,
+    }
+
+
+def create_database(args):
+    """The seeded database and the client to close when done."""
+    from local_providers import seed_bookings
+
+    if args.mongo_uri:
+        from pymongo import MongoClient
+
+        client = MongoClient(args.mongo_uri)
+        client.drop_database(args.db_name)
+    else:
+        import mongomock
+
+        client = mongomock.MongoClient()
+    db = client[args.db_name]
+    seed_bookings(
+        db,
+        days=args.history_days + args.days,
+        start=date.today() - timedelta(days=args.history_days),
+        occupancy=[float(share) for share in args.occupancy.split(",")],
+        seed=args.seed,
+        customers=args.customers,
+    )
+    return client, db
+
+
+def future_date(rng: random.Random, days: int) -> date:
+    return date.today() + timedelta(days=rng.randrange(days))
+
+
+def find_customer_bookings(rng: random.Random, args) -> dict:
+    return {"customer_phone": f"+1555{rng.randrange(args.customers):07d}"}
+
+
+def check_availability_across_days(rng: random.Random, args) -> dict:
+    from restaurant_config import TIME_SLOTS
+
+    start = future_date(rng, args.days // 2)
+    return {
+        "start_date": start.isoformat(),
+        "end_date": (start + timedelta(days=rng.choice([6, 13, 29]))).isoformat(),
+        "time_slot": rng.choice(TIME_SLOTS),
+        "party_size": rng.randint(2, 6),
+    }
+
+
+def find_available_time_slots(rng: random.Random, args) -> dict:
+    return {
+        "date": future_date(rng, 60).isoformat(),
+        "party_size": rng.randint(2, 6),
+    }
+
+
+def book_table(rng: random.Random, args) -> dict:
+    from restaurant_config import TABLES, TIME_SLOTS
+
+    return {
+        "date": future_date(rng, 60).isoformat(),
+        "slot_id": f"{rng.choice(TIME_SLOTS).replace(':', '')}t{rng.choice(list(TABLES))}",
+        "customer_phone": f"+1555{rng.randrange(args.customers):07d}",
+        "party_size": 2,
+    }
+
+
+# Tool name -> arguments of a call
+TOOLS: Dict[str, Callable[[random.Random, argparse.Namespace], dict]] = {
+    "find_customer_bookings": find_customer_bookings,
+    "check_availability_across_days": check_availability_across_days,
+    "find_available_time_slots": find_available_time_slots,
+    "book_table": book_table,
+}
+
+
+def timed_call(function, arguments: dict) -> tuple:
+    """Seconds, round trips and result of one tool call."""
+    counter = [0]
+    current_round_trips.set(counter)
+    started = time.perf_counter()
+    result = function(**arguments)
+    elapsed = time.perf_counter() - started
+    current_round_trips.set(None)
+    return elapsed, counter[0], result
+
+
+def percentile(values: List[float], share: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(share * len(ordered)))]
+
+
+def run_tool(toolkit, name: str, concurrency: int, args) -> dict:
+    rng = random.Random(f"{args.seed}:{name}:{concurrency}")
+    calls = [TOOLS[name](rng, args) for _ in range(args.calls)]
+    function = getattr(toolkit, name)
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(
+            pool.map(lambda arguments: timed_call(function, arguments), calls)
+        )
+    wall = time.perf_counter() - started
+
+    latencies = [seconds * 1000 for seconds, _, _ in results]
+    round_trips = [count for _, count, _ in results]
+    return {
+        "calls": len(results),
+        "p50_ms": round(statistics.median(latencies), 3),
+        "p95_ms": round(percentile(latencies, 0.95), 3),
+        "max_ms": round(max(latencies), 3),
+        "calls_per_second": round(len(results) / wall, 1),
+        "round_trips": round(statistics.mean(round_trips), 2),
+        "max_round_trips": max(round_trips),
+    }
+
+
+def create_toolkit(args):
+    """A toolkit on the seeded database that counts its round trips, and the client."""
+    from restaurant_data import RestaurantBookingToolkit
+
+    client, db = create_database(args)
+    toolkit = RestaurantBookingToolkit(
+        args.mongo_uri or "", db_name=args.db_name, connect=False
+    )
+    toolkit.connect(client)
+    toolkit.db = RoundTripCounter(db, args.rtt_ms / 1000)
+    return client, toolkit
+
+
+def close_database(client, args):
+    if args.mongo_uri:
+        client.drop_database(args.db_name)
+    client.close()
+
+
+def benchmark(args) -> Dict[str, Dict[str, dict]]:
+    client, toolkit = create_toolkit(args)
+    results: Dict[str, Dict[str, dict]] = {}
+    try:
+        for name in args.tools or TOOLS:
+            results[name] = {}
+            for concurrency in args.concurrency:
+                result = run_tool(toolkit, name, concurrency, args)
+                results[name][str(concurrency)] = result
+                print(
+                    f"{name} x{concurrency}: p50 {result['p50_ms']} ms, "
+                    f"p95 {result['p95_ms']} ms, {result['round_trips']} round trips",
+                    file=sys.stderr,
+                )
+    finally:
+        close_database(client, args)
+    return results
+
+
+def regressions(results: Dict[str, dict], baseline: Dict[str, dict], tolerance):
+    found = []
+    for name, levels in results.items():
+        for concurrency, result in levels.items():
+            before = baseline.get(name, {}).get(concurrency)
+            if not before:
+                continue
+            label = f"{name} x{concurrency}"
+            for key in COUNTS:
+                if result[key] > before[key]:
+                    found.append(f"{label}: {key} {before[key]} -> {result[key]}")
+            for key in TIMES:
+                if result[key] > before[key] * (1 + tolerance):
+                    found.append(
+                        f"{label}: {key} {before[key]:.2f} -> {result[key]:.2f}"
+                    )
+    return found
+
+
+def main(args):
+    results = benchmark(args)
+    report = {
+        "database": database_report(args),
+        "tools": results,
+    }
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=2)
+    print(json.dumps(report, indent=2))
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)["tools"]
+        found = regressions(results, baseline, args.tolerance)
+        for line in found:
+            print(f"Regression: {line}", file=sys.stderr)
+        if found:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("tools", nargs="*", help="tools to run (default: all)")
+    add_database_arguments(parser)
+    parser.add_argument("--calls", type=int, default=200, help="per tool and level")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--output", help="write the results here as JSON")
+    parser.add_argument("--baseline", help="results of an earlier run to compare with")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.25,
+        help="allowed relative increase of the p95 latency over the baseline",
+    )
+    args = parser.parse_args()
+    unknown = set(args.tools) - set(TOOLS)
+    if unknown:
+        parser.error(f"unknown tools: {', '.join(sorted(unknown))}")
+
+    # local_providers logs as it imports pipecat
+    from loguru import logger
+
+    logger.remove()
+    main(args)
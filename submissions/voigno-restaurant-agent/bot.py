@@ -7,13 +7,14 @@
 import os
 import sys
 import asyncio
+import time
+import uuid
 from dotenv import load_dotenv
 from fastapi import WebSocket
 from loguru import logger
 import urllib
-from twilio.rest import Client
+from typing import Optional
 
-from pipecat.audio.vad.silero import SileroVADAnalyzer
 from pipecat.pipeline.pipeline import Pipeline
 from pipecat.pipeline.runner import PipelineRunner
 from pipecat.pipeline.task import PipelineParams, PipelineTask
@@ -25,26 +26,46 @@ from pipecat.processors.filters.stt_mute_filter import (
     STTMuteFilter,
     STTMuteStrategy,
 )
-from pipecat.services.deepgram import DeepgramSTTService
 from pipecat.transports.network.fastapi_websocket import (
     FastAPIWebsocketParams,
     FastAPIWebsocketTransport,
 )
-from audio_s3 import save_audio_to_s3
+from audio_s3 import StreamingS3Recorder, recording_key
+from recording_codecs import create_codec
+from upload_queue import RecordingUploadQueue
+from component_pool import CallSetupTimer, ComponentPool
+from connections import PreconnectedDeepgramSTTService, ProviderConnections
+from loop_watchdog import LoopWatchdog
+from frame_profiler import FrameProfiler
+from turn_latency import TurnLatencyObserver, TurnLatencyStats
 from agno.agent import Agent
 
-from agno.models.openai import OpenAIChat
-
 # from agno.models.groq import Groq
 from agent_response import AgentMessageAggregator
 from agnoagentservice import AgentLLM
-from restaurant_data import RestaurantBookingToolkit
+from audio_cache import CachedPhrasePlayer, PhraseAudioCache, cartesia_synthesizer
+from faq_cache import FAQResponder, FAQResponseCache, build_faq_intents
+from hedging import HedgingPolicy, TTFBWindow
+from history import ConversationHistory
+from routing import CAPABLE, FAST, ModelRouter
+from telephony import audio_path_from_env
+from tool_cache import ToolResultCache
+from tool_trace import ToolTraceFile
+from prompts import (
+    COMPILED_PROMPT,
+    DESCRIPTION,
+    FILLER_PHRASES,
+    GREETING,
+    STATIC_INSTRUCTIONS,
+    build_call_context,
+)
 
 load_dotenv(override=True)
 
 
 logger.remove(0)
 logger.add(sys.stderr, level="DEBUG")
+logger.info(f"Agent prompt tokens per section:\n{COMPILED_PROMPT.report()}")
 
 # Username and password for MongoDB
 username = "Your Username"
@@ -55,162 +76,228 @@ encoded_username = urllib.parse.quote_plus(username)
 encoded_password = urllib.parse.quote_plus(password)
 mdb_connection_string = f"mongodb+srv://{encoded_username}:{encoded_password}mongo uri"
 
+# VAD model, booking tools, MongoDB and OpenAI connections shared by the calls
+# of this container; app.py warms it on startup
+component_pool = ComponentPool(mongo_uri=mdb_connection_string)
+
+# Shared by all calls in this container; answers opening hours, seating and
+# group size questions without a round trip to the LLM
+faq_cache = FAQResponseCache(build_faq_intents())
+
+RECORDING_BUCKET = "careadhdaudio"
+RECORDING_FLUSH_SECONDS = 5
+# wav (16-bit PCM), ulaw, flac or opus; see recording_codecs.py
+RECORDING_CODEC = os.getenv("RECORDING_CODEC", "ulaw")
+# 2 records the caller on the left channel and the bot on the right
+RECORDING_CHANNELS = int(os.getenv("RECORDING_CHANNELS", "1"))
+# Audio that can't reach S3 yet waits here, in a subdirectory per container,
+# until upload_queue.upload_spilled retries it; on Modal a Volume (app.py)
+RECORDING_SPILL_DIR = os.getenv("RECORDING_SPILL_DIR", "/tmp/recording_spill")
+
+# Finishes recordings after the call has ended; started and drained by server.py,
+# which also gives it its spill directory (claim_recording_spill_dir)
+upload_queue = RecordingUploadQueue()
+
+# Opt-in: log the stack of whatever blocks the event loop for longer than
+# LOOP_WATCHDOG_THRESHOLD_MS; started by server.py, reported at /metrics
+loop_watchdog = (
+    LoopWatchdog(
+        threshold=float(os.getenv("LOOP_WATCHDOG_THRESHOLD_MS", "100")) / 1000
+    )
+    if os.getenv("LOOP_WATCHDOG") == "1"
+    else None
+)
+
+# Opt-in: queue wait and processing time per pipeline processor and frame type,
+# timing one frame in FRAME_PROFILE_SAMPLE; served at /profile
+frame_profiler = (
+    FrameProfiler(sample_every=int(os.getenv("FRAME_PROFILE_SAMPLE", "1")))
+    if os.getenv("FRAME_PROFILE") == "1"
+    else None
+)
+
+# Opt-in: append every tool call of every call (arguments, duration, result
+# size) to TOOL_TRACE_PATH, for benchmarks/tool_trace_replay.py
+tool_trace_file = (
+    ToolTraceFile(os.getenv("TOOL_TRACE_PATH"))
+    if os.getenv("TOOL_TRACE_PATH")
+    else None
+)
+
+# LLM time to first token across the calls of this container; the hedging
+# deadline of every call is derived from it
+llm_ttfb = TTFBWindow()
+
+# Per-turn voice-to-voice latency of recent calls, by stage; served at /metrics
+turn_latency = TurnLatencyStats()
+
+# Opt-in: run calls on local stand-ins for Deepgram, Cartesia, OpenAI and
+# MongoDB, e.g. for benchmarks (see local_providers.py)
+local_providers = None
+if os.getenv("LOCAL_PROVIDERS") == "1":
+    from local_providers import LocalProviders
+
+    local_providers = LocalProviders.from_env()
+
+CARTESIA_VOICE_ID = "156fb8d2-335b-4950-9cb3-a2d33befec77"
+# 8 kHz end to end unless TELEPHONY_AUDIO=0 (see telephony.py)
+AUDIO_PATH = audio_path_from_env()
+
+# Greeting and hold fillers are synthesized once per container (or read from
+# disk) so they play without a TTS round trip
+phrase_cache = PhraseAudioCache(
+    voice_id="local-tone" if local_providers else CARTESIA_VOICE_ID,
+    # The API key is read at synthesis time, after a snapshot restore
+    synthesize=(
+        local_providers.synthesize
+        if local_providers
+        else cartesia_synthesizer(None, CARTESIA_VOICE_ID)
+    ),
+    cache_dir=os.getenv("PHRASE_AUDIO_CACHE_DIR", "/tmp/phrase_audio"),
+)
+
+
+async def warm_phrase_cache():
+    await phrase_cache.warm([GREETING, *FILLER_PHRASES], AUDIO_PATH.out_sample_rate)
+
+
+def claim_recording_spill_dir():
+    """
+    Spill this container's recordings into a subdirectory of its own. Named
+    after a snapshot restore, as containers restored from the same snapshot
+    would otherwise share it.
+    """
+    upload_queue.spill_dir = os.path.join(RECORDING_SPILL_DIR, uuid.uuid4().hex)
+
 
 async def capture_phone_number_and_update_agent(call_sid: str, agent: Agent):
     """
-    Asynchronously capture phone number from Twilio and update agent instructions.
-    This runs as a non-blocking background task.
+    Asynchronously capture phone number from Twilio and update the agent's call context.
+    This runs as a non-blocking background task, only for calls whose TwiML didn't
+    pass the caller's number as a stream parameter.
     """
     try:
         logger.info(f"Starting phone number capture for call_sid: {call_sid}")
 
-        # Initialize Twilio client
+        # Initialize Twilio client; imported here since only this fallback uses it
+        from twilio.rest import Client
+
         twilio_client = Client(
             os.getenv("TWILIO_ACCOUNT_SID"), os.getenv("TWILIO_AUTH_TOKEN")
         )
 
-        # Fetch call details to get phone number
-        call = twilio_client.calls(call_sid).fetch()
+        # Fetch call details to get phone number; the client is synchronous,
+        # so keep the HTTPS round trip off the event loop
+        call = await asyncio.to_thread(twilio_client.calls(call_sid).fetch)
         phone_number = call._from  # This gets the caller's phone number
         print(phone_number)
 
         logger.info(f"Captured phone number: {phone_number} for call_sid: {call_sid}")
 
-        # Update agent instructions with the captured phone number
-        updated_instructions = f"""
-        You are a helpful restaurant booking assistant named "Jessicca". Your purpose is to help customers book tables, check availability, and manage their reservations at our restaurant.
-
-        TABLE CAPACITY & SEATING INFORMATION:
-        - Table A (Window table with city view): Capacity 4 people
-        - Table B (Central aisle table): Capacity 4 people
-        - Table C (Quiet corner table): Capacity 4 people
-        - Table D (Outdoor patio table): Capacity 6 people
-        - Table E (Table near the bar): Capacity 4 people
-
-        LARGE PARTY HANDLING ALGORITHM:
-        For parties larger than 4 people:
-        1. First check if Table D (patio) is available as it can seat up to 6 people
-        2. For parties of 5-6 people:
-           - Recommend Table D (patio) if available
-           - If Table D is unavailable, suggest booking at a different time or splitting the party
-        3. For parties of 7-10 people:
-           - Look for available tables that can be booked simultaneously:
-              * Priority 1: Book Table D (6 people) and one other table (A, B, C, or E for 4 people)
-              * Priority 2: Book multiple tables (A, B, C, or E) at the same time
-           - When recommending multiple tables, create separate bookings but link them with a common reference
-           - Be clear that tables cannot be physically combined, but will be booked for the same time
-        4. For parties larger than 10 people:
-           - Suggest booking our private dining room separately (requires special handling)
-           - Or offer to split the party across available tables if preferred
-
-
-
-        BOOKING PROCESS - IMPORTANT WORKFLOW:
-        When a customer asks to book a table, follow these steps in order:
-        1. First, ask for the date and time they want to book.
-        2. Ask for their party size if not provided.
-        3. Call find_available_tables() with only this date(always in yyyy-mm-dd format) and time(always in hh:mm format) to check availability.
-        4. Based on party size, apply the large party handling algorithm:
-           - For 1-4 people: Present standard table options based on availability
-           - For 5-6 people: Prioritize Table D (patio) or split the party if necessary
-           - For 7+ people: Suggest appropriate table combinations 
-        5. Ask for their preferred table location if they didn't specify.
-        6. Verify the party size doesn't exceed the capacity of selected table(s).
-        7. The customer's phone number is {phone_number}.
-        8. For standard bookings (single table):
-           - Create the slot_id using the format: [TIME_CODE]t[TABLE_ID]
-           - Example: For 7:00 PM and Table A, slot_id should be "1900tA"
-        9. For multi-table bookings (separate tables for one large party):
-           - Create a separate slot_id for each table being booked
-           - Book each table separately but reference the same party in notes
-           - Example: For a party of 10 split between Tables D and B, create "1900tD" and "1900tB"
-        10. Confirm all details with the customer before proceeding.
-        11. Call book_table() with date, slot_id(s), customer_phone ie {phone_number}, party_size, and any special requests.
-           - For multi-table bookings, make multiple sequential book_table() calls
-           - Add a note indicating which tables are part of the same large party (e.g., "Part of 10-person party")
-        12. Confirm the booking was successful and provide the booking reference(s).
-        13. If customer asks for finding his bookings use {phone_number} to start the search and return results.
-
-        CUSTOMER COMMUNICATION DURING TOOL CALLS:
-        When using any tool function, always:
-        1. Clearly tell customers that you're processing their request BEFORE making the tool call
-        2. Use phrases like "Let me check the availability for you, this will take just a moment..."
-        3. After the tool call, acknowledge that you've completed the check before giving results
-        4. Never leave the customer waiting without explanation
-        5. If a tool call will take time, set expectations: "I'm searching our system now, it will take a few seconds"
-        
-        SLOT ID CREATION - CRITICAL INSTRUCTIONS:
-        To create a proper slot_id:
-        - TIME FORMAT: Remove the colon from the 24-hour time format.
-          Examples: "9:00" → "900", "13:30" → "1330", "19:00" → "1900"
-        - TABLE ID: The letter identifier of the table based on location:
-          * Table A = Window table with city view
-          * Table B = Central aisle table
-          * Table C = Quiet corner table
-          * Table D = Outdoor patio table
-          * Table E = Table near the bar
-        - COMBINE WITH 't': Join the time code and table ID with a lowercase 't'.
-        - COMPLETE EXAMPLES:
-          * 9 AM, Window table (A) = "900tA"
-          * 1:30 PM, Central aisle table (B) = "1330tB"
-          * 7 PM, Window table (A) = "1900tA"
-          * 9 PM, Outdoor patio table (D) = "2100tD"
-        
-        Always follow these guidelines:
-        1. Keep responses conversational and natural, as they will be converted to speech.
-        2. Speak in complete sentences but keep them relatively short and easy to follow when heard.
-        3. Always verify key details by repeating them back to the user (date, time, party size, table location).
-        4. For dates, use conversational formats like "this Friday" or "May 15th" rather than "2025-05-15".
-        5. When presenting multiple options, limit to 3-4 choices to avoid overwhelming the listener.
-        6. Always confirm actions before executing them (especially bookings and cancellations).
-        7. If you don't understand a request, ask for clarification on the specific piece of information you need.
-        8. When providing table information, focus on location and ambiance more than technical details.
-        9. For time slots, use standard time format (like "7 PM" instead of "19:00").
-        10. Always end your responses with a follow-up question or a clear indication of what the user can do next.
-        11. Before every tool call, clearly inform the customer that you're checking the system. Use phrases like "I'll check our reservation system for you now" or "Let me look that up in our booking system, it'll just take a moment." Never leave them wondering why there's a pause in conversation.
-
-        When handling phone numbers:
-        - Confirm by reading back the number with proper pauses (e.g., "555-123-4567")
-        
-
-        When handling dates:
-        - Always clarify ambiguous dates (e.g., "Do you mean this Friday, May 24th?")
-        - For availability searches, suggest alternative dates if the requested one is full
-        - Default to the current day if no date is specified, but always confirm
-
-        LARGE GROUP COMMUNICATION:
-        When handling larger groups:
-        - Explain the table arrangement clearly (e.g., "For your party of 10, we can reserve our patio table for 6 people and our window table for the remaining 4 people")
-        - Mention that tables are separate but will be booked for the same time
-        - For very large parties, explain the private dining room option
-        - Be transparent about any limitations (e.g., "While we can accommodate your party of 10, you'll be seated at two separate tables")
-        - Suggest staggered arrival times if appropriate
-
-        Remember to be courteous and professional, but also warm and helpful. Use a friendly, conversational tone throughout the interaction.
-        """
-
-        # Update the agent's instructions
-        agent.instructions = updated_instructions
+        # Only the small per-call block changes; the static prompt prefix stays
+        # byte-identical so the provider's prompt cache keeps hitting.
+        agent.additional_context = build_call_context(phone_number)
 
         logger.info(
-            f"Successfully updated agent instructions with phone number: {phone_number}"
+            f"Successfully updated agent call context with phone number: {phone_number}"
         )
 
         return phone_number
 
     except Exception as e:
         logger.error(
-            f"Error capturing phone number or updating agent instructions: {e}"
+            f"Error capturing phone number or updating agent call context: {e}"
         )
         return None
 
 
-async def run_bot(websocket_client: WebSocket, call_sid: str, stream_sid: str):
+def open_provider_connections() -> ProviderConnections:
+    """Create the call's STT and TTS services and start connecting them."""
+    if local_providers:
+        connections = ProviderConnections(
+            stt=local_providers.stt(AUDIO_PATH.in_sample_rate),
+            tts=local_providers.tts(AUDIO_PATH.out_sample_rate),
+        )
+        connections.start()
+        return connections
+
+    stt = PreconnectedDeepgramSTTService(
+        api_key=os.getenv("DEEPGRAM_API_KEY"),
+        sample_rate=AUDIO_PATH.in_sample_rate,
+        audio_passthrough=True,
+    )
+    tts = CartesiaTTSService(
+        api_key=os.getenv("CARTESIA_API_KEY"),
+        voice_id=CARTESIA_VOICE_ID,
+        # Raw PCM at the output rate: in telephony mode that is 8 kHz, so the
+        # serializer only has to mu-law encode it for Twilio
+        sample_rate=AUDIO_PATH.out_sample_rate,
+        encoding="pcm_s16le",
+        # model="sonic-turbo",
+    )
+    connections = ProviderConnections(
+        stt=stt, tts=tts, http_client=component_pool.http_client
+    )
+    connections.start()
+    return connections
+
+
+def report_call_setup(seconds: float):
+    component_pool.record_setup(seconds)
+    logger.info(
+        f"Greeting audio {seconds * 1000:.0f} ms after accept "
+        f"(recent calls: {component_pool.setup_stats()})"
+    )
+
+
+def create_agent(
+    model,
+    *,
+    tools: list,
+    tool_cache: ToolResultCache,
+    phone_number: Optional[str] = None,
+) -> Agent:
+    """The booking agent of a call; benchmarks/conversation_bench.py uses it too."""
+    return Agent(
+        model=model,
+        tools=tools,
+        tool_hooks=[tool_cache],
+        # The current date lives in the per-call context instead; the
+        # second-resolution timestamp agno injects would break prompt caching.
+        add_datetime_to_instructions=False,
+        description=DESCRIPTION,
+        instructions=STATIC_INSTRUCTIONS,
+        additional_context=build_call_context(phone_number),
+        # History is replayed by AgentLLM through ConversationHistory, which
+        # keeps prompt size flat instead of re-sending 15 verbose exchanges
+        add_history_to_messages=False,
+        session_state={},
+        # user_id=phone_number,
+        show_tool_calls=True,
+        stream=True,
+        stream_intermediate_steps=True,
+    )
+
+
+async def run_bot(
+    websocket_client: WebSocket,
+    call_sid: str,
+    stream_sid: str,
+    phone_number: Optional[str] = None,
+    accepted_at: Optional[float] = None,
+    connections: Optional[ProviderConnections] = None,
+):
+    accepted_at = accepted_at or time.monotonic()
+    # app.py opens these as soon as the websocket is accepted
+    connections = connections or open_provider_connections()
+    stt, tts = connections.stt, connections.tts
     serializer = TwilioFrameSerializer(
         stream_sid=stream_sid,
         call_sid=call_sid,
         account_sid=os.getenv("TWILIO_ACCOUNT_SID", ""),
         auth_token=os.getenv("TWILIO_AUTH_TOKEN", ""),
+        # There is no Twilio call to hang up behind a local replay
+        params=TwilioFrameSerializer.InputParams(auto_hang_up=not local_providers),
     )
     transport = FastAPIWebsocketTransport(
         websocket=websocket_client,
@@ -219,183 +306,51 @@ async def run_bot(websocket_client: WebSocket, call_sid: str, stream_sid: str):
             audio_out_enabled=True,
             add_wav_header=False,
             vad_enabled=True,
-            vad_analyzer=SileroVADAnalyzer(),
+            vad_analyzer=(
+                local_providers.vad_analyzer()
+                if local_providers
+                else component_pool.vad_analyzer()
+            ),
             vad_audio_passthrough=True,
             serializer=serializer,
         ),
     )
 
-    agent = Agent(
-        model=OpenAIChat(
-            id="gpt-4o-mini",
-            api_key=os.getenv("OPENAI_API_KEY"),
-        ),
-        tools=[RestaurantBookingToolkit(mongo_uri=mdb_connection_string)],
-        add_datetime_to_instructions=True,
-        instructions="""
-        You are a helpful restaurant booking assistant named "Jessicca". Your purpose is to help customers book tables, check availability, and manage their reservations at our restaurant.
-
-        TABLE CAPACITY & SEATING INFORMATION:
-        - Table A (Window table with city view): Capacity 4 people
-        - Table B (Central aisle table): Capacity 4 people
-        - Table C (Quiet corner table): Capacity 4 people
-        - Table D (Outdoor patio table): Capacity 6 people
-        - Table E (Table near the bar): Capacity 4 people
-
-        LARGE PARTY HANDLING ALGORITHM:
-        For parties larger than 4 people:
-        1. First check if Table D (patio) is available as it can seat up to 6 people
-        2. For parties of 5-6 people:
-           - Recommend Table D (patio) if available
-           - If Table D is unavailable, suggest booking at a different time or splitting the party
-        3. For parties of 7-10 people:
-           - Look for available tables that can be booked simultaneously:
-              * Priority 1: Book Table D (6 people) and one other table (A, B, C, or E for 4 people)
-              * Priority 2: Book multiple tables (A, B, C, or E) at the same time
-           - When recommending multiple tables, create separate bookings but link them with a common reference
-           - Be clear that tables cannot be physically combined, but will be booked for the same time
-        4. For parties larger than 10 people:
-           - Suggest booking our private dining room separately (requires special handling)
-           - Or offer to split the party across available tables if preferred
-
-
-
-        BOOKING PROCESS - IMPORTANT WORKFLOW:
-        When a customer asks to book a table, follow these steps in order:
-        1. First, ask for the date and time they want to book.
-        2. Ask for their party size if not provided.
-        3. Call find_available_tables() with only this date(always in yyyy-mm-dd format) and time(always in hh:mm format) to check availability.
-        4. Based on party size, apply the large party handling algorithm:
-           - For 1-4 people: Present standard table options based on availability
-           - For 5-6 people: Prioritize Table D (patio) or split the party if necessary
-           - For 7+ people: Suggest appropriate table combinations 
-        5. Ask for their preferred table location if they didn't specify.
-        6. Verify the party size doesn't exceed the capacity of selected table(s).
-        7. users phone number will be captured automatically from the call.
-        8. For standard bookings (single table):
-           - Create the slot_id using the format: [TIME_CODE]t[TABLE_ID]
-           - Example: For 7:00 PM and Table A, slot_id should be "1900tA"
-        9. For multi-table bookings (separate tables for one large party):
-           - Create a separate slot_id for each table being booked
-           - Book each table separately but reference the same party in notes
-           - Example: For a party of 10 split between Tables D and B, create "1900tD" and "1900tB"
-        10. Confirm all details with the customer before proceeding.
-        11. Call book_table() with date, slot_id(s), customer_phone, party_size, and any special requests.
-           - For multi-table bookings, make multiple sequential book_table() calls
-           - Add a note indicating which tables are part of the same large party (e.g., "Part of 10-person party")
-        12. Confirm the booking was successful and provide the booking reference(s).
-        13. if customer asks for finding his bookings use the captured phone number to start the search and return results.
-
-        CUSTOMER COMMUNICATION DURING TOOL CALLS:
-        When using any tool function, always:
-        1. Clearly tell customers that you're processing their request BEFORE making the tool call
-        2. Use phrases like "Let me check the availability for you, this will take just a moment..."
-        3. After the tool call, acknowledge that you've completed the check before giving results
-        4. Never leave the customer waiting without explanation
-        5. If a tool call will take time, set expectations: "I'm searching our system now, it will take a few seconds"
-        
-        SLOT ID CREATION - CRITICAL INSTRUCTIONS:
-        To create a proper slot_id:
-        - TIME FORMAT: Remove the colon from the 24-hour time format.
-          Examples: "9:00" → "900", "13:30" → "1330", "19:00" → "1900"
-        - TABLE ID: The letter identifier of the table based on location:
-          * Table A = Window table with city view
-          * Table B = Central aisle table
-          * Table C = Quiet corner table
-          * Table D = Outdoor patio table
-          * Table E = Table near the bar
-        - COMBINE WITH 't': Join the time code and table ID with a lowercase 't'.
-        - COMPLETE EXAMPLES:
-          * 9 AM, Window table (A) = "900tA"
-          * 1:30 PM, Central aisle table (B) = "1330tB"
-          * 7 PM, Window table (A) = "1900tA"
-          * 9 PM, Outdoor patio table (D) = "2100tD"
-        
-        Always follow these guidelines:
-        1. Keep responses conversational and natural, as they will be converted to speech.
-        2. Speak in complete sentences but keep them relatively short and easy to follow when heard.
-        3. Always verify key details by repeating them back to the user (date, time, party size, table location).
-        4. For dates, use conversational formats like "this Friday" or "May 15th" rather than "2025-05-15".
-        5. When presenting multiple options, limit to 3-4 choices to avoid overwhelming the listener.
-        6. Always confirm actions before executing them (especially bookings and cancellations).
-        7. If you don't understand a request, ask for clarification on the specific piece of information you need.
-        8. When providing table information, focus on location and ambiance more than technical details.
-        9. For time slots, use standard time format (like "7 PM" instead of "19:00").
-        10. Always end your responses with a follow-up question or a clear indication of what the user can do next.
-        11. Before every tool call, clearly inform the customer that you're checking the system. Use phrases like "I'll check our reservation system for you now" or "Let me look that up in our booking system, it'll just take a moment." Never leave them wondering why there's a pause in conversation.
-
-        When handling phone numbers:
-        - Confirm by reading back the number with proper pauses (e.g., "555-123-4567")
-        
-
-        When handling dates:
-        - Always clarify ambiguous dates (e.g., "Do you mean this Friday, May 24th?")
-        - For availability searches, suggest alternative dates if the requested one is full
-        - Default to the current day if no date is specified, but always confirm
-
-        LARGE GROUP COMMUNICATION:
-        When handling larger groups:
-        - Explain the table arrangement clearly (e.g., "For your party of 10, we can reserve our patio table for 6 people and our window table for the remaining 4 people")
-        - Mention that tables are separate but will be booked for the same time
-        - For very large parties, explain the private dining room option
-        - Be transparent about any limitations (e.g., "While we can accommodate your party of 10, you'll be seated at two separate tables")
-        - Suggest staggered arrival times if appropriate
-
-        Remember to be courteous and professional, but also warm and helpful. Use a friendly, conversational tone throughout the interaction.
-        """,
-        description="""
-        A voice-based restaurant booking assistant that helps customers make, find, and modify reservations. It provides information about table options, checks availability across different dates and times, and manages the booking process in a conversational manner optimized for speech interaction. Specially equipped to handle large party reservations with a sophisticated table allocation algorithm.
-        """,
-        additional_context="""
-        Your output will be converted to audio, after hearing which the user answers. So formatting for text-based mediums like websites or books won't suffice. Keep it conversational and suitable for listening.
-
-        Some special considerations:
-        - Use verbal pacing cues: small pauses, transitions, and emphasis that work well in spoken language
-        - Avoid the use of special characters or markdown which won't translate to speech
-        - Don't use numbered or bulleted lists; instead, use natural spoken transitions like "first," "also," "finally," etc.
-        - Spell out unusual names or reference codes clearly, or use familiar words ("A as in Apple")
-        - For times and availability, group information into easily digestible chunks 
-        - When explaining table locations, use descriptive language that creates a mental image
-        - Use natural conversational acknowledgments when appropriate ("I see," "Got it," "I understand")
-
-        RESTAURANT TABLE INFORMATION:
-        Our restaurant has several distinct areas with specific table identifiers:
-        - Table A: Window tables with city views - great for romantic dinners or enjoying the cityscape (seats 4)
-        - Table B: Central aisle tables - lively atmosphere in the heart of the restaurant (seats 4)
-        - Table C: Quiet corner tables - perfect for private conversations or business meetings (seats 4)
-        - Table D: Outdoor patio tables - fresh air dining with ambient lighting in the evening (seats 6)
-        - Table E: Tables near the bar - energetic setting with easy access to drinks (seats 4)
-
-        PRIVATE DINING ROOM:
-        For very large parties (13+ people), we offer a private dining room that can accommodate up to 20 guests. This requires special booking and may have different availability than regular tables. The private dining room has custom menu options and can be configured for various events.
-
-        TABLE DESCRIPTION AND SLOT ID CONNECTION:
-        When describing tables to customers, always connect the description with the table letter, for example:
-        - "We have a window table available (that's Table A) with a beautiful city view"
-        - "There's a quiet corner table (Table C) that would be perfect for your party"
-        
-        The slot_id will use this same letter identifier:
-        - Window table with city view (A) → slot_id ends with "tA" (e.g., "1900tA")
-        - Central aisle table (B) → slot_id ends with "tB" (e.g., "1900tB")
-        - Quiet corner table (C) → slot_id ends with "tC" (e.g., "1900tC")
-        - Outdoor patio table (D) → slot_id ends with "tD" (e.g., "1900tD")
-        - Table near the bar (E) → slot_id ends with "tE" (e.g., "1900tE")
-
-        Our operating hours are from 9 AM to 9 PM daily. Special requests can be accommodated for parties with dietary restrictions or special occasions.
-
-        When interacting with customers, simulate natural conversational flow by reacting to their emotions, answering their follow-up questions, and keeping the context of the conversation in mind.
-        """,
-        add_history_to_messages=True,
-        session_state={},
-        # user_id=phone_number,
-        num_history_responses=15,
-        show_tool_calls=True,
-        stream=True,
-        stream_intermediate_steps=True,
+    # Read-only tool results are memoized for the rest of the call
+    tool_cache = ToolResultCache()
+    if local_providers:
+        capable_model = local_providers.model("gpt-4o-mini")
+    else:
+        capable_model = component_pool.openai_chat(
+            "gpt-4o-mini", api_key=os.getenv("OPENAI_API_KEY")
+        )
+    # Opt-in: send confirmations and other simple turns to a faster model
+    router = None
+    if os.getenv("FAST_MODEL_ID") and not local_providers:
+        router = ModelRouter(
+            models={
+                FAST: component_pool.openai_chat(
+                    os.getenv("FAST_MODEL_ID"), api_key=os.getenv("OPENAI_API_KEY")
+                ),
+                CAPABLE: capable_model,
+            }
+        )
+
+    agent = create_agent(
+        capable_model,
+        tools=component_pool.tools(),
+        tool_cache=tool_cache,
+        phone_number=phone_number,
     )
-    llm = AgentLLM(agent=agent)
-    stt = DeepgramSTTService(
-        api_key=os.getenv("DEEPGRAM_API_KEY"), audio_passthrough=True
+    history = ConversationHistory(max_verbatim_turns=3)
+    llm = AgentLLM(
+        agent=agent,
+        history=history,
+        tool_cache=tool_cache,
+        # Opt-in: send a backup request when the first token is late
+        hedging=HedgingPolicy(llm_ttfb) if os.getenv("LLM_HEDGING") == "1" else None,
+        router=router,
+        tool_trace=tool_trace_file.for_call(call_sid) if tool_trace_file else None,
     )
     stt_mute_processor = STTMuteFilter(
         config=STTMuteConfig(
@@ -406,33 +361,63 @@ async def run_bot(websocket_client: WebSocket, call_sid: str, stream_sid: str):
         ),
     )
 
-    tts = CartesiaTTSService(
-        api_key=os.getenv("CARTESIA_API_KEY"),
-        voice_id="156fb8d2-335b-4950-9cb3-a2d33befec77",
-        # model="sonic-turbo",
-    )
-
     message_aggregator = AgentMessageAggregator(aggregation_timeout=1.0)
-    audiobuffer = AudioBufferProcessor()
-
-    pipeline = Pipeline(
-        [
-            transport.input(),  # Websocket input from client
-            stt_mute_processor,
-            stt,  # Speech-To-Text
-            message_aggregator,
-            llm,  # LLM
-            tts,  # Text-To-Speech
-            transport.output(),  # Websocket output to client
-            audiobuffer,
-        ]
+    faq_responder = FAQResponder(faq_cache, history=history)
+    # Hand recorded audio over every few seconds; StreamingS3Recorder uploads
+    # it in parts so a long call is never held in memory in full
+    audiobuffer = AudioBufferProcessor(
+        num_channels=RECORDING_CHANNELS,
+        buffer_size=AUDIO_PATH.out_sample_rate * 2 * RECORDING_FLUSH_SECONDS,
+    )
+    codec = create_codec(
+        RECORDING_CODEC, AUDIO_PATH.out_sample_rate, RECORDING_CHANNELS
+    )
+    recorder = StreamingS3Recorder(
+        bucket_name=RECORDING_BUCKET,
+        key=recording_key(call_sid=call_sid, extension=codec.extension),
+        sample_rate=AUDIO_PATH.out_sample_rate,
+        num_channels=RECORDING_CHANNELS,
+        codec=codec,
+        spill_dir=upload_queue.spill_dir,
+    )
+    setup_timer = CallSetupTimer(accepted_at, on_first_audio=report_call_setup)
+    phrase_player = CachedPhrasePlayer(
+        phrase_cache, sample_rate=AUDIO_PATH.out_sample_rate, fillers=FILLER_PHRASES
     )
 
+    processors = [
+        transport.input(),  # Websocket input from client
+        stt_mute_processor,
+        stt,  # Speech-To-Text
+        message_aggregator,
+        faq_responder,  # Cached answers to frequent questions
+        llm,  # LLM
+        tts,  # Text-To-Speech
+        phrase_player,  # Cached greeting and hold phrases
+        transport.output(),  # Websocket output to client
+        setup_timer,
+        audiobuffer,
+    ]
+    if frame_profiler:
+        frame_profiler.instrument(processors)
+    pipeline = Pipeline(processors)
+
+    turn_observer = TurnLatencyObserver(
+        call_sid=call_sid,
+        vad=transport.input(),
+        stt=stt,
+        aggregator=message_aggregator,
+        responders=[llm, faq_responder],
+        tts=tts,
+        output=transport.output(),
+        on_turn=turn_latency.record,
+    )
     task = PipelineTask(
         pipeline,
+        observers=[turn_observer],
         params=PipelineParams(
-            # audio_in_sample_rate=8000,
-            # audio_out_sample_rate=8000,
+            audio_in_sample_rate=AUDIO_PATH.in_sample_rate,
+            audio_out_sample_rate=AUDIO_PATH.out_sample_rate,
             allow_interruptions=True,
         ),
     )
@@ -440,41 +425,47 @@ async def run_bot(websocket_client: WebSocket, call_sid: str, stream_sid: str):
     @audiobuffer.event_handler("on_audio_data")
     async def on_audio_data(buffer, audio, sample_rate, num_channels):
         try:
-            print("starting upload")
-            s3_url = await save_audio_to_s3(
-                audio=audio,
-                sample_rate=sample_rate,
-                num_channels=num_channels,
-                bucket_name="careadhdaudio",
-            )
-            logger.info(
-                f"Successfully saved {len(audio)} bytes of audio to S3.{s3_url}"
-            )
+            await recorder.write(audio)
 
         except Exception as e:
-            logger.error(f"Error saving audio to S3: {e}")
+            logger.error(f"Error streaming audio to S3: {e}")
 
     @transport.event_handler("on_client_connected")
     async def on_client_connected(transport, client):
         await audiobuffer.start_recording()
         print("Recording started")
+        logger.info(f"Streaming recording to {recorder.uri}")
 
-        # Start the phone number capture and agent update as a background task
-        asyncio.create_task(capture_phone_number_and_update_agent(call_sid, agent))
+        # The caller's number normally comes with the stream parameters; look it
+        # up through the Twilio API in the background only if it didn't
+        if phone_number:
+            logger.info(f"Caller phone number from stream parameters: {phone_number}")
+        else:
+            asyncio.create_task(capture_phone_number_and_update_agent(call_sid, agent))
 
-        await tts.say(
-            "Hi-I am Jessica.-How can I help with your reservations at Luciya restraunt."
-        )
+        if not await phrase_player.play(GREETING):
+            await tts.say(GREETING)
 
     @transport.event_handler("on_client_disconnected")
     async def on_client_disconnected(transport, client):
         await audiobuffer.stop_recording()
         await task.cancel()
+        # Closing and uploading the rest happens after the call, off this path
+        upload_queue.submit(recorder)
 
     # We use `handle_sigint=False` because `uvicorn` is controlling keyboard
     # interruptions. We use `force_gc=True` to force garbage collection after
     # the runner finishes running a task which could be useful for long running
     # applications with multiple clients connecting.
-    runner = PipelineRunner(handle_sigint=True, force_gc=True)
+    runner = PipelineRunner(handle_sigint=False, force_gc=True)
 
-    await runner.run(task)
+    # Start the pipeline on the pre-opened connections instead of racing them
+    await connections.wait()
+    if loop_watchdog:
+        # Blame stalls inside this call's processors on this call
+        loop_watchdog.track(call_sid, processors)
+    try:
+        await runner.run(task)
+    finally:
+        if loop_watchdog:
+            loop_watchdog.untrack(call_sid)
@@ -0,0 +1,176 @@
+import copy
+import statistics
+import time
+from collections import deque
+from typing import Callable, Dict, List, Optional
+
+import httpx
+from agno.models.openai import OpenAIChat
+from agno.tools.function import Function
+from loguru import logger
+from pipecat.audio.vad.silero import SileroVADAnalyzer
+from pipecat.audio.vad.vad_analyzer import VADAnalyzer, VADParams
+from pipecat.frames.frames import Frame, OutputAudioRawFrame
+from pipecat.processors.frame_processor import FrameDirection, FrameProcessor
+
+from restaurant_data import RestaurantBookingToolkit
+
+
+class PooledSileroVADAnalyzer(SileroVADAnalyzer):
+    """
+    Silero VAD that reuses an already loaded ONNX session.
+
+    Only the recurrent state is per call; the inference session is stateless and
+    safe to share, so creating one of these skips loading the model.
+    """
+
+    def __init__(self, model, *, params: VADParams = VADParams()):
+        VADAnalyzer.__init__(self, sample_rate=None, params=params)
+        self._model = copy.copy(model)
+        self._model.reset_states()
+        self._last_reset_time = 0
+
+
+class ComponentPool:
+    """
+    Components that are expensive to build and safe to share between the calls
+    of a container, built once by `warm`: `load` for the parts that can go into
+    a memory snapshot, `connect` for the network clients.
+
+    - The Silero VAD model; each call gets a PooledSileroVADAnalyzer.
+    - The booking toolkit with its MongoClient (and connection pool), and its
+      tool functions with their JSON schemas already parsed from the docstrings.
+      Each call gets shallow copies, since agno sets per-agent hooks on them.
+    - An HTTP client for OpenAI. Without one, agno's OpenAIChat opens a new
+      client, and a new TLS connection, for every request.
+
+    It also keeps the time from websocket accept to the first greeting audio of
+    recent calls (see CallSetupTimer).
+    """
+
+    def __init__(self, *, mongo_uri: str, window: int = 100):
+        self._mongo_uri = mongo_uri
+        self._vad_model = None
+        self._toolkit: Optional[RestaurantBookingToolkit] = None
+        self._functions: List[Function] = []
+        self._http_client = None
+        self._setup_times: deque[float] = deque(maxlen=window)
+
+    @property
+    def loaded(self) -> bool:
+        return self._toolkit is not None
+
+    @property
+    def warmed(self) -> bool:
+        return self._http_client is not None
+
+    def load(self):
+        """
+        Build what needs no network and no secrets: the VAD model and the tool
+        schemas. Safe to run before a memory snapshot is taken.
+        """
+        if self.loaded:
+            return
+        started = time.perf_counter()
+
+        self._vad_model = SileroVADAnalyzer()._model
+
+        toolkit = RestaurantBookingToolkit(mongo_uri=self._mongo_uri, connect=False)
+        for function in toolkit.functions.values():
+            function.process_entrypoint()
+            function.skip_entrypoint_processing = True
+        self._functions = list(toolkit.functions.values())
+        self._toolkit = toolkit
+        # Only imported here: its import time belongs in the snapshot, the
+        # client itself is created by connect()
+        import pymongo  # noqa: F401
+        logger.info(
+            f"Component pool loaded in {time.perf_counter() - started:.2f}s "
+            f"({len(self._functions)} tools)"
+        )
+
+    def connect(self, mongo_uri: Optional[str] = None, mongo_client=None):
+        """
+        Create the network clients; run after a snapshot is restored.
+
+        Args:
+            mongo_uri: Replaces the URI given at construction, e.g. one read from
+                a secret only after the restore
+            mongo_client: Client for the toolkit instead of one for the URI
+                (see local_providers.py)
+        """
+        self.load()
+        if self.warmed:
+            return
+        if mongo_uri:
+            self._toolkit.mongo_uri = mongo_uri
+        self._toolkit.connect(client=mongo_client)
+        # Idle connections are kept for a minute (httpx's default is 5 s), so
+        # the pauses between turns and between calls don't cost a new handshake
+        self._http_client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=100, max_keepalive_connections=20, keepalive_expiry=60
+            )
+        )
+
+    def warm(self):
+        """Load and connect; blocking, call it before the first call."""
+        self.load()
+        self.connect()
+
+    @property
+    def http_client(self) -> httpx.AsyncClient:
+        self.warm()
+        return self._http_client
+
+    def vad_analyzer(self, params: VADParams = VADParams()) -> SileroVADAnalyzer:
+        self.load()
+        return PooledSileroVADAnalyzer(self._vad_model, params=params)
+
+    def tools(self) -> List[Function]:
+        """Per-call copies of the booking tools."""
+        self.warm()
+        return [function.model_copy() for function in self._functions]
+
+    def openai_chat(self, model_id: str, **kwargs) -> OpenAIChat:
+        """An OpenAIChat model sharing the pool's HTTP connections."""
+        self.warm()
+        return OpenAIChat(id=model_id, http_client=self._http_client, **kwargs)
+
+    def record_setup(self, seconds: float):
+        self._setup_times.append(seconds)
+
+    def setup_stats(self) -> Dict[str, float]:
+        """Accept-to-greeting time of recent calls in milliseconds."""
+        if not self._setup_times:
+            return {}
+        ordered = sorted(self._setup_times)
+        return {
+            "calls": len(ordered),
+            "p50_ms": round(statistics.median(ordered) * 1000),
+            "p90_ms": round(
+                ordered[min(len(ordered) - 1, int(0.9 * len(ordered)))] * 1000
+            ),
+            "max_ms": round(ordered[-1] * 1000),
+        }
+
+
+class CallSetupTimer(FrameProcessor):
+    """
+    Reports the time from `started_at` (the websocket accept, time.monotonic())
+    to the first audio the output transport sends. Place it after
+    transport.output(), which passes each audio chunk on as it sends it.
+    """
+
+    def __init__(self, started_at: float, on_first_audio: Callable[[float], None]):
+        super().__init__()
+        self._started_at = started_at
+        self._on_first_audio = on_first_audio
+        self._reported = False
+
+    async def process_frame(self, frame: Frame, direction: FrameDirection):
+        await super().process_frame(frame, direction)
+        if not self._reported and isinstance(frame, OutputAudioRawFrame):
+            self._reported = True
+            self._on_first_audio(time.monotonic() - self._started_at)
+        await self.push_frame(frame, direction)
@@ -0,0 +1,153 @@
+import asyncio
+import time
+from typing import Dict, Optional
+
+import httpx
+from loguru import logger
+from pipecat.services.cartesia import CartesiaTTSService
+from pipecat.services.deepgram import DeepgramSTTService
+
+OPENAI_BASE_URL = "https://api.openai.com/v1"
+
+
+class PreconnectedDeepgramSTTService(DeepgramSTTService):
+    """
+    DeepgramSTTService that can open its websocket before the pipeline starts.
+
+    `preconnect` needs the sample rate up front (pass `sample_rate`). When the
+    pipeline starts, the open connection is used instead of a new one; later
+    reconnects after errors work as usual.
+
+    Relies on DeepgramSTTService internals (`_connect`, `_settings`,
+    `_init_sample_rate`, `_connection`) as of pipecat-ai 0.0.67, the version
+    requirements.txt pins; check them before upgrading pipecat.
+    """
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self._preconnected = False
+
+    async def preconnect(self):
+        self._settings["sample_rate"] = self._init_sample_rate
+        await super()._connect()
+        if not await self._connection.is_connected():
+            raise ConnectionError("websocket did not open")
+        self._preconnected = True
+
+    async def _connect(self):
+        if self._preconnected:
+            self._preconnected = False
+            return
+        await super()._connect()
+
+
+class ProviderConnections:
+    """
+    Opens a call's provider connections in parallel as soon as the websocket is
+    accepted, while the Twilio `start` message is still on its way.
+
+    - Deepgram: the STT websocket (PreconnectedDeepgramSTTService).
+    - Cartesia: the TTS websocket; CartesiaTTSService keeps a websocket that is
+      already open when the pipeline starts.
+    - OpenAI: a TLS connection in the container's shared HTTP client (see
+      ComponentPool), so the first LLM request of the call skips the handshake.
+      Connections stay in that pool between calls.
+
+    `connect_times` holds the seconds each provider took to connect.
+
+    Opening and closing the websockets early relies on pipecat internals as of
+    pipecat-ai 0.0.67, the version requirements.txt pins: the Deepgram ones
+    of PreconnectedDeepgramSTTService and CartesiaTTSService's
+    `_connect_websocket`, `_disconnect_websocket` and `_websocket`.
+
+    Args:
+        stt: Speech-to-text service of the call
+        tts: Text-to-speech service of the call
+        http_client: Shared HTTP client used for OpenAI requests
+        openai_base_url: Base URL of the OpenAI API
+    """
+
+    def __init__(
+        self,
+        *,
+        stt: PreconnectedDeepgramSTTService,
+        tts: CartesiaTTSService,
+        http_client: Optional[httpx.AsyncClient] = None,
+        openai_base_url: str = OPENAI_BASE_URL,
+    ):
+        self.stt = stt
+        self.tts = tts
+        self._http_client = http_client
+        self._openai_base_url = openai_base_url
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self.connect_times: Dict[str, float] = {}
+
+    def start(self):
+        """Start connecting to every provider without waiting."""
+        if self._tasks:
+            return
+        connectors = {
+            "deepgram": self.stt.preconnect,
+            "cartesia": self._connect_cartesia,
+        }
+        if self._http_client:
+            connectors["openai"] = self._warm_openai
+        self._tasks = {
+            name: asyncio.create_task(self._timed(name, connect))
+            for name, connect in connectors.items()
+        }
+
+    async def wait(self, timeout: float = 3.0) -> Dict[str, float]:
+        """
+        Wait for the connections to open, before the pipeline starts.
+
+        Connections still pending after `timeout` are cancelled so the services
+        connect the usual way when the pipeline starts instead of opening a second
+        websocket next to the pending one.
+        """
+        if not self._tasks:
+            return self.connect_times
+        done, pending = await asyncio.wait(self._tasks.values(), timeout=timeout)
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+            late = [name for name, task in self._tasks.items() if task in pending]
+            logger.warning(
+                f"Provider connections still pending after {timeout}s: {late}"
+            )
+        logger.info(
+            "Provider connect times: "
+            + ", ".join(f"{n} {t * 1000:.0f} ms" for n, t in self.connect_times.items())
+        )
+        return self.connect_times
+
+    async def close(self):
+        """Close the connections of a call whose pipeline never started."""
+        for task in self._tasks.values():
+            task.cancel()
+        await asyncio.gather(*self._tasks.values(), return_exceptions=True)
+        try:
+            if getattr(self.stt, "_connection", None):
+                await self.stt._disconnect()
+            await self.tts._disconnect_websocket()
+        except Exception as e:
+            logger.warning(f"Error closing provider connections: {e}")
+
+    async def _timed(self, name: str, connect):
+        started = time.monotonic()
+        try:
+            await connect()
+            self.connect_times[name] = time.monotonic() - started
+        except Exception as e:
+            logger.warning(f"Could not pre-connect to {name}: {e}")
+
+    async def _connect_cartesia(self):
+        # CartesiaTTSService logs connection errors itself and leaves no websocket
+        await self.tts._connect_websocket()
+        if not self.tts._websocket:
+            raise ConnectionError("websocket did not open")
+
+    async def _warm_openai(self):
+        # Any response leaves a TLS connection in the client's keep-alive pool
+        await self._http_client.head(f"{self._openai_base_url}/models")
@@ -0,0 +1,341 @@
+import hashlib
+import re
+from collections import Counter, OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+from loguru import logger
+from pipecat.frames.frames import (
+    Frame,
+    LLMFullResponseEndFrame,
+    LLMFullResponseStartFrame,
+    LLMMessagesFrame,
+    LLMTextFrame,
+    MetricsFrame,
+)
+from pipecat.metrics.metrics import MetricsData
+from pipecat.processors.frame_processor import FrameDirection, FrameProcessor
+
+from history import ConversationHistory, message_text
+from prompts import STATIC_INSTRUCTIONS, spoken_time
+from restaurant_config import PRIVATE_DINING_CAPACITY, TABLES, TIME_SLOTS
+
+NUMBER_WORDS = set("""
+    one two three four five six seven eight nine ten eleven twelve thirteen fourteen
+    fifteen sixteen seventeen eighteen nineteen twenty thirty forty fifty
+    """.split())
+
+# Words that carry no intent, dropped before matching
+STOP_WORDS = set("""
+    a an the is are am be do does did you your you're we i i'm us our it it's
+    can could would will please um uh hi hello hey there just tell me what what's
+    whats when where how which so and or of to for in on at with any some like
+    know want wanted was wondering okay ok yes yeah well also
+    """.split())
+
+# Utterances mentioning any of these need the agent (and usually a tool call),
+# even if the rest of the sentence looks like an FAQ. Numbers count too: "at 7",
+# "730" and "for 4" are times and party sizes of an availability request.
+TRANSACTIONAL_WORDS = set("""
+    book booking bookings booked reserve reserved reservation reservations cancel
+    change modify move reschedule my mine name phone number tonight today tomorrow
+    weekend monday tuesday wednesday thursday friday saturday sunday january
+    february march april may june july august september october november december
+    pm o'clock oclock available availability free next
+    """.split())
+
+WORD_RE = re.compile(r"[a-z']+|\d+")
+
+
+@dataclass
+class FAQIntent:
+    """A frequent question with a fixed spoken answer."""
+
+    name: str
+    examples: List[str]
+    answer: str
+
+
+def build_faq_intents(
+    tables: Dict[str, Dict[str, Any]] = TABLES, time_slots: List[str] = TIME_SLOTS
+) -> List[FAQIntent]:
+    """Build the FAQ intents from the same table metadata as the agent prompt."""
+    sizes = Counter(table["size"] for table in tables.values())
+    standard = sizes.most_common(1)[0][0]
+    largest = max(sizes)
+    locations = [
+        f"the {table['location']} table {table_id}"
+        for table_id, table in tables.items()
+    ]
+    if len(locations) > 1:
+        locations[-1] = f"and {locations[-1]}"
+
+    intents = [
+        FAQIntent(
+            name="opening_hours",
+            examples=[
+                "what are your opening hours",
+                "what are your hours",
+                "what time do you open",
+                "what time do you close",
+                "when are you open",
+                "how late are you open",
+                "are you open every day",
+            ],
+            answer=(
+                f"We're open every day, with tables from {spoken_time(time_slots[0])} "
+                f"until {spoken_time(time_slots[-1])}. Would you like me to book one for you?"
+            ),
+        ),
+        FAQIntent(
+            name="seating_options",
+            examples=[
+                "what tables do you have",
+                "what seating options do you have",
+                "what kind of tables are there",
+                "where can we sit",
+            ],
+            answer=(
+                f"We have {', '.join(locations)}. Most seat {standard}"
+                + (f", and the largest seats {largest}" if largest > standard else "")
+                + ". Which would you prefer?"
+            ),
+        ),
+        FAQIntent(
+            name="large_groups",
+            examples=[
+                "how many people can you seat",
+                "do you take large groups",
+                "what is your biggest table",
+                "do you have a private dining room",
+            ],
+            answer=(
+                f"Our largest table seats {largest}, and for bigger groups we can book "
+                f"several tables at the same time. We also have a private dining room for "
+                f"up to {PRIVATE_DINING_CAPACITY} guests, which our staff arrange separately. "
+                "How many people are you expecting?"
+            ),
+        ),
+    ]
+
+    outdoor = [
+        (table_id, table)
+        for table_id, table in tables.items()
+        if table["location"] in ("patio", "terrace", "garden", "outdoor")
+    ]
+    if outdoor:
+        table_id, table = outdoor[0]
+        intents.append(
+            FAQIntent(
+                name="outdoor_seating",
+                examples=[
+                    "do you have outdoor seating",
+                    "is there outdoor seating",
+                    "do you have a patio",
+                    "where is the patio",
+                    "can we sit outside",
+                    "do you have tables outside",
+                ],
+                answer=(
+                    f"Yes, Table {table_id} is our {table['description'].lower()}, "
+                    f"it seats {table['size']}. "
+                    "Would you like me to check if it's free?"
+                ),
+            )
+        )
+    return intents
+
+
+def normalize_utterance(text: str) -> List[str]:
+    """Lowercase and drop filler words."""
+    return [word for word in WORD_RE.findall(text.lower()) if word not in STOP_WORDS]
+
+
+def is_transactional(text: str) -> bool:
+    """Whether the utterance mentions a booking, a date, a time or a number."""
+    return any(
+        word.isdigit() or word in NUMBER_WORDS or word in TRANSACTIONAL_WORDS
+        for word in WORD_RE.findall(text.lower())
+    )
+
+
+def config_version(prompt: str, intents: List[FAQIntent]) -> str:
+    """Short hash of everything a cached answer depends on."""
+    digest = hashlib.sha256(prompt.encode())
+    for intent in intents:
+        digest.update(f"\0{intent.name}\0{intent.answer}".encode())
+    return digest.hexdigest()[:12]
+
+
+class FAQCacheMetricsData(MetricsData):
+    intent: Optional[str] = None
+    hit: bool
+    hits: int
+    misses: int
+
+
+class FAQResponseCache:
+    """
+    Answers frequent, non-transactional questions without calling the LLM.
+
+    Utterances are normalized locally and matched against each intent's example
+    phrasings by token overlap; anything mentioning a booking, a date, a time or
+    any number is left to the agent. Matched utterances are kept in a bounded LRU
+    so repeated phrasings skip the matcher. The cache is tied to a config version
+    (a hash of the prompt and the answers) and is emptied when `update` brings a
+    new one.
+
+    One cache can be shared by all calls of a container.
+    """
+
+    def __init__(
+        self,
+        intents: List[FAQIntent],
+        version: Optional[str] = None,
+        max_entries: int = 512,
+        threshold: float = 0.6,
+    ):
+        self._max_entries = max_entries
+        self._threshold = threshold
+        self._entries: OrderedDict[str, FAQIntent] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self._set_intents(intents, version)
+
+    @property
+    def version(self) -> str:
+        return self._version
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def stats(self) -> dict:
+        return {
+            "version": self._version,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hit_rate, 3),
+            "entries": len(self._entries),
+        }
+
+    def update(self, intents: List[FAQIntent], version: Optional[str] = None):
+        """Swap in new intents, dropping cached answers if the version changed."""
+        previous = self._version
+        self._set_intents(intents, version)
+        if self._version != previous:
+            logger.info(
+                f"FAQ config changed ({previous} -> {self._version}), dropping {len(self._entries)} cached answer(s)"
+            )
+            self._entries.clear()
+
+    def _set_intents(self, intents: List[FAQIntent], version: Optional[str]):
+        self._intents = intents
+        self._version = version or config_version(STATIC_INSTRUCTIONS, intents)
+        self._examples = [
+            (intent, set(normalize_utterance(example)))
+            for intent in intents
+            for example in intent.examples
+        ]
+
+    def lookup(self, text: str) -> Optional[FAQIntent]:
+        if is_transactional(text):
+            self.misses += 1
+            return None
+
+        tokens = normalize_utterance(text)
+        key = " ".join(tokens)
+        intent = self._entries.get(key)
+        if intent is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return intent
+
+        intent = self._match(tokens)
+        if intent is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self._entries[key] = intent
+        if len(self._entries) > self._max_entries:
+            self._entries.popitem(last=False)
+        return intent
+
+    def _match(self, tokens: List[str]) -> Optional[FAQIntent]:
+        words = set(tokens)
+        if not words:
+            return None
+
+        best, best_score = None, 0.0
+        for intent, example in self._examples:
+            score = len(words & example) / len(words | example)
+            if score > best_score:
+                best, best_score = intent, score
+        return best if best_score >= self._threshold else None
+
+
+class FAQResponder(FrameProcessor):
+    """
+    Answers cached FAQ intents in place of AgentLLM.
+
+    Place between the user message aggregator and AgentLLM. On a hit the cached
+    answer is pushed as a complete LLM response and the LLMMessagesFrame is
+    consumed; on a miss it is passed on to the agent. The exchange is recorded in
+    the agent's ConversationHistory so follow-up turns have the context.
+    """
+
+    def __init__(
+        self,
+        cache: FAQResponseCache,
+        history: Optional[ConversationHistory] = None,
+        **kwargs,
+    ):
+        super().__init__(**kwargs)
+        self._cache = cache
+        self._history = history
+
+    def can_generate_metrics(self) -> bool:
+        return True
+
+    async def process_frame(self, frame: Frame, direction: FrameDirection):
+        await super().process_frame(frame, direction)
+
+        if not isinstance(frame, LLMMessagesFrame):
+            await self.push_frame(frame, direction)
+            return
+
+        user_text = " ".join(message_text(m) for m in frame.messages)
+        intent = self._cache.lookup(user_text)
+        await self._report_usage(intent)
+        if intent is None:
+            await self.push_frame(frame, direction)
+            return
+
+        logger.debug(f"{self} Answering '{user_text}' from FAQ intent {intent.name}")
+        if self._history:
+            self._history.start_turn(user_text)
+            self._history.add_assistant_text(intent.answer)
+            self._history.end_turn()
+
+        await self.push_frame(LLMFullResponseStartFrame())
+        await self.push_frame(LLMTextFrame(intent.answer))
+        await self.push_frame(LLMFullResponseEndFrame())
+
+    async def _report_usage(self, intent: Optional[FAQIntent]):
+        if not self.metrics_enabled:
+            return
+        await self.push_frame(
+            MetricsFrame(
+                data=[
+                    FAQCacheMetricsData(
+                        processor=self.name,
+                        intent=intent.name if intent else None,
+                        hit=intent is not None,
+                        hits=self._cache.hits,
+                        misses=self._cache.misses,
+                    )
+                ]
+            )
+        )
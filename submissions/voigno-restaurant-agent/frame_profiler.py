@@ -0,0 +1,158 @@
+import json
+import time
+from dataclasses import dataclass
+from typing import Dict, Iterable, Optional, Tuple
+
+from loguru import logger
+from pipecat.frames.frames import Frame, SystemFrame
+from pipecat.processors.frame_processor import FrameDirection, FrameProcessor
+
+# FrameProcessor's private input queue, as of the pipecat-ai requirements.txt pins
+INPUT_QUEUE_ATTRIBUTE = "_FrameProcessor__input_queue"
+
+
+@dataclass
+class FrameTypeStats:
+    count: int = 0
+    sampled: int = 0
+    wait_total: float = 0.0
+    wait_max: float = 0.0
+    process_total: float = 0.0
+    process_max: float = 0.0
+
+    def add(self, wait: Optional[float], process: float):
+        self.sampled += 1
+        self.process_total += process
+        self.process_max = max(self.process_max, process)
+        if wait is not None:
+            self.wait_total += wait
+            self.wait_max = max(self.wait_max, wait)
+
+    def to_dict(self) -> dict:
+        sampled = self.sampled or 1
+        return {
+            "count": self.count,
+            "sampled": self.sampled,
+            "wait_avg_ms": round(self.wait_total / sampled * 1000, 3),
+            "wait_max_ms": round(self.wait_max * 1000, 3),
+            "process_avg_ms": round(self.process_total / sampled * 1000, 3),
+            "process_max_ms": round(self.process_max * 1000, 3),
+        }
+
+
+class FrameProfiler:
+    """
+    Shows where frames pile up in the call pipelines of a container.
+
+    `instrument` wraps `queue_frame` and `process_frame` of each processor of a
+    call. Per processor class and frame type it counts every frame, and for one
+    in `sample_every` frames it measures:
+
+    - wait: time in the processor's input queue, from `queue_frame` until its
+      input task starts processing the frame (0 for system frames, which skip
+      the queue)
+    - process: time spent in `process_frame`. Frames are pushed on through a
+      queue, so this excludes downstream processors, except for system frames,
+      which downstream processors handle inline.
+
+    The deepest input queue seen on a sampled frame is kept per processor.
+    Stats add up over all calls until `reset`.
+
+    Written against pipecat-ai 0.0.67 (pinned in requirements.txt): the queue
+    depth is read from FrameProcessor's private input queue. If a pipecat
+    upgrade renames it, a warning is logged once and the depth is left out;
+    the timings only use the public `queue_frame` and `process_frame`.
+
+    Args:
+        sample_every: Time one frame in this many (1 times every frame)
+    """
+
+    def __init__(self, sample_every: int = 1):
+        self.sample_every = max(1, sample_every)
+        self._stats: Dict[Tuple[str, str], FrameTypeStats] = {}
+        self._queue_depth: Dict[str, int] = {}
+        self._started = time.time()
+        self._warned_no_queue = False
+
+    def instrument(self, processors: Iterable[FrameProcessor]):
+        for processor in processors:
+            self._wrap(processor)
+
+    def reset(self):
+        self._stats = {}
+        self._queue_depth = {}
+        self._started = time.time()
+
+    def stats(self) -> dict:
+        processors: Dict[str, dict] = {}
+        for (processor, frame_type), stats in sorted(self._stats.items()):
+            entry = processors.setdefault(
+                processor,
+                {"max_queue_depth": self._queue_depth.get(processor, 0), "frames": {}},
+            )
+            entry["frames"][frame_type] = stats.to_dict()
+        return {
+            "since": self._started,
+            "sample_every": self.sample_every,
+            "processors": processors,
+        }
+
+    def dump(self, path: str):
+        with open(path, "w") as file:
+            json.dump(self.stats(), file, indent=2)
+        logger.info(f"Frame profile written to {path}")
+
+    def _wrap(self, processor: FrameProcessor):
+        key = type(processor).__name__
+        queue_frame = processor.queue_frame
+        process_frame = processor.process_frame
+        # Enqueue time of the sampled frames waiting in the input queue
+        queued: Dict[int, float] = {}
+        seen = 0
+
+        async def profiled_queue_frame(
+            frame: Frame, direction: FrameDirection = FrameDirection.DOWNSTREAM, *args
+        ):
+            nonlocal seen
+            seen += 1
+            if seen % self.sample_every == 0:
+                if len(queued) > 1000:
+                    # Frames dropped from the queue by an interruption
+                    queued.clear()
+                queued[frame.id] = time.perf_counter()
+                if not isinstance(frame, SystemFrame):
+                    self._record_queue_depth(processor, key)
+            await queue_frame(frame, direction, *args)
+
+        async def profiled_process_frame(frame: Frame, direction: FrameDirection):
+            stats = self._stats.get((key, type(frame).__name__))
+            if stats is None:
+                stats = self._stats[(key, type(frame).__name__)] = FrameTypeStats()
+            stats.count += 1
+            enqueued = queued.pop(frame.id, None)
+            if enqueued is None:
+                await process_frame(frame, direction)
+                return
+            started = time.perf_counter()
+            try:
+                await process_frame(frame, direction)
+            finally:
+                stats.add(started - enqueued, time.perf_counter() - started)
+
+        processor.queue_frame = profiled_queue_frame
+        processor.process_frame = profiled_process_frame
+
+    def _record_queue_depth(self, processor: FrameProcessor, key: str):
+        # Created by the StartFrame, which comes before any queued frame
+        queue = getattr(processor, INPUT_QUEUE_ATTRIBUTE, None)
+        if queue is None:
+            if not self._warned_no_queue:
+                self._warned_no_queue = True
+                logger.warning(
+                    f"{key} has no {INPUT_QUEUE_ATTRIBUTE}, not profiling queue "
+                    "depths; check frame_profiler.py against this pipecat version"
+                )
+            return
+        depth = queue.qsize() + 1
+        if depth > self._queue_depth.get(key, 0):
+            self._queue_depth[key] = depth
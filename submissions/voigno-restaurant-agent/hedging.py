@@ -0,0 +1,205 @@
+import asyncio
+from collections import deque
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional
+
+from loguru import logger
+
+_DONE = object()
+
+
+class TTFBWindow:
+    """
+    Recent LLM time-to-first-token of a container, and the hedging deadline
+    derived from it.
+
+    The deadline is the given percentile (p90 by default) of the last `window`
+    samples, clamped to [min_deadline, max_deadline]. Until enough samples are
+    in, initial_deadline is used. Share one window between the calls of a
+    container: a single call has too few turns for a meaningful percentile.
+    """
+
+    def __init__(
+        self,
+        *,
+        percentile: float = 0.9,
+        initial_deadline: float = 1.5,
+        min_deadline: float = 0.3,
+        max_deadline: float = 4.0,
+        min_samples: int = 5,
+        window: int = 50,
+    ):
+        self._percentile = percentile
+        self._initial_deadline = initial_deadline
+        self._min_deadline = min_deadline
+        self._max_deadline = max_deadline
+        self._min_samples = min_samples
+        self._samples: deque[float] = deque(maxlen=window)
+
+    def deadline(self) -> float:
+        if len(self._samples) < self._min_samples:
+            return self._initial_deadline
+        ordered = sorted(self._samples)
+        index = min(len(ordered) - 1, int(self._percentile * len(ordered)))
+        return min(self._max_deadline, max(self._min_deadline, ordered[index]))
+
+    def record(self, seconds: float):
+        self._samples.append(seconds)
+
+
+class HedgingPolicy:
+    """
+    Decides when a slow LLM request of one call gets a backup request.
+
+    The deadline comes from `ttfb`, which is meant to be shared by all calls of
+    the container (a window of its own if not given). One policy is meant per
+    call session, so max_hedges_per_session caps the extra requests a single
+    call can cause.
+    """
+
+    def __init__(
+        self,
+        ttfb: Optional[TTFBWindow] = None,
+        *,
+        max_hedges_per_session: int = 3,
+    ):
+        self._ttfb = ttfb or TTFBWindow()
+        self._max_hedges = max_hedges_per_session
+        self.hedges_sent = 0
+        self.hedges_won = 0
+
+    def deadline(self) -> float:
+        return self._ttfb.deadline()
+
+    def record_ttfb(self, seconds: float):
+        self._ttfb.record(seconds)
+
+    def can_hedge(self) -> bool:
+        return self.hedges_sent < self._max_hedges
+
+
+class HedgedStream:
+    """
+    Stream the response of whichever of two identical requests produces a first
+    token first.
+
+    The primary request starts immediately. If it has not produced a first token
+    (as decided by `is_first_token`) within the policy deadline, the backup request
+    is started. Events that precede the first token are buffered per request, and a
+    request is paused right after its first token until it is picked as the winner,
+    so a loser never gets to run tools. The loser is cancelled.
+
+    `winner` holds 0 (primary) or 1 (backup) once decided.
+    """
+
+    def __init__(
+        self,
+        start_primary: Callable[[], Awaitable[AsyncIterator[Any]]],
+        start_backup: Callable[[], Awaitable[AsyncIterator[Any]]],
+        policy: HedgingPolicy,
+        is_first_token: Callable[[Any], bool],
+    ):
+        self._starters = [start_primary, start_backup]
+        self._policy = policy
+        self._is_first_token = is_first_token
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._tasks: Dict[int, asyncio.Task] = {}
+        self._proceed: Dict[int, asyncio.Event] = {}
+        self._started_at: Dict[int, float] = {}
+        self.winner: Optional[int] = None
+
+    def __aiter__(self):
+        return self._run()
+
+    def _start(self, index: int):
+        self._proceed[index] = asyncio.Event()
+        self._started_at[index] = asyncio.get_running_loop().time()
+        self._tasks[index] = asyncio.create_task(self._pump(index))
+
+    async def _pump(self, index: int):
+        first_token_seen = False
+        try:
+            iterator = await self._starters[index]()
+            async for item in iterator:
+                await self._queue.put((index, item))
+                if not first_token_seen and self._is_first_token(item):
+                    first_token_seen = True
+                    await self._proceed[index].wait()
+            await self._queue.put((index, _DONE))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            await self._queue.put((index, e))
+
+    def _pick_winner(self, index: int):
+        loop = asyncio.get_running_loop()
+        self.winner = index
+        # What the caller waited, from the primary's start even if the backup
+        # won; the backup's own TTFB would pull the deadline down
+        self._policy.record_ttfb(loop.time() - self._started_at[0])
+        if index == 1:
+            self._policy.hedges_won += 1
+        self._proceed[index].set()
+        for other, task in self._tasks.items():
+            if other != index:
+                task.cancel()
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        buffers = {0: [], 1: []}
+        finished = set()
+        self._start(0)
+        try:
+            while True:
+                timeout = None
+                if (
+                    self.winner is None
+                    and len(self._tasks) == 1
+                    and self._policy.can_hedge()
+                ):
+                    timeout = max(
+                        0.0,
+                        self._started_at[0] + self._policy.deadline() - loop.time(),
+                    )
+
+                try:
+                    index, item = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    self._policy.hedges_sent += 1
+                    logger.debug(
+                        f"No first token after {self._policy.deadline():.2f}s, sending hedged request"
+                    )
+                    self._start(1)
+                    continue
+
+                if self.winner is not None and index != self.winner:
+                    continue
+
+                if item is _DONE or isinstance(item, Exception):
+                    finished.add(index)
+                    if self.winner is None:
+                        # A request that fails before its first token is only
+                        # fatal if there is nothing else left to wait for
+                        still_running = set(self._tasks) - finished
+                        if isinstance(item, Exception) and still_running:
+                            logger.warning(f"Hedged request {index} failed: {item}")
+                            continue
+                        self._pick_winner(index)
+                        for buffered in buffers[index]:
+                            yield buffered
+                    if isinstance(item, Exception):
+                        raise item
+                    return
+
+                if self.winner is None:
+                    buffers[index].append(item)
+                    if self._is_first_token(item):
+                        self._pick_winner(index)
+                        for buffered in buffers[index]:
+                            yield buffered
+                        buffers = {0: [], 1: []}
+                    continue
+
+                yield item
+        finally:
+            for task in self._tasks.values():
+                task.cancel()
@@ -0,0 +1,169 @@
+import re
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from loguru import logger
+
+BOOKING_REFERENCE_RE = re.compile(r"Booking reference: (\w+)")
+CANCELLED_RE = re.compile(r"Successfully cancelled booking for (\w+)")
+# HHMM (H:MM before 10) and table of a slot, e.g. 1900tA or 900tB
+SLOT_ID_RE = re.compile(r"^(\d{1,2})(\d{2})t(\w+)$")
+
+
+@dataclass
+class BookingSlots:
+    """Facts collected from tool calls over the whole call."""
+
+    date: Optional[str] = None
+    time: Optional[str] = None
+    party_size: Optional[int] = None
+    table: Optional[str] = None
+    booking_refs: List[str] = field(default_factory=list)
+    cancelled_refs: List[str] = field(default_factory=list)
+
+    def update_from_tool_call(self, name: str, arguments: Dict[str, Any], result: str):
+        self.date = (
+            arguments.get("date")
+            or arguments.get("specific_date")
+            # check_availability_across_days: where the caller's range begins
+            or arguments.get("start_date")
+            or self.date
+        )
+        self.time = arguments.get("time_slot") or self.time
+        self.party_size = arguments.get("party_size") or self.party_size
+        if arguments.get("location"):
+            self.table = arguments["location"]
+
+        if name == "book_table":
+            # The slot being booked carries the time and table
+            match = SLOT_ID_RE.match(str(arguments.get("slot_id") or ""))
+            if match:
+                hours, minutes, self.table = match.groups()
+                self.time = f"{int(hours)}:{minutes}"
+            match = BOOKING_REFERENCE_RE.search(result or "")
+            if match and match.group(1) not in self.booking_refs:
+                self.booking_refs.append(match.group(1))
+                self.table = match.group(1).split("t")[-1]
+        elif name == "cancel_booking":
+            match = CANCELLED_RE.search(result or "")
+            if match:
+                ref = match.group(1)
+                if ref in self.booking_refs:
+                    self.booking_refs.remove(ref)
+                self.cancelled_refs.append(ref)
+
+    def describe(self) -> str:
+        parts = []
+        if self.date:
+            parts.append(f"date {self.date}")
+        if self.time:
+            parts.append(f"time {self.time}")
+        if self.party_size:
+            parts.append(f"party of {self.party_size}")
+        if self.table:
+            parts.append(f"table {self.table}")
+        if self.booking_refs:
+            parts.append(f"booked {', '.join(self.booking_refs)}")
+        if self.cancelled_refs:
+            parts.append(f"cancelled {', '.join(self.cancelled_refs)}")
+        return "; ".join(parts)
+
+
+@dataclass
+class Turn:
+    user: str
+    assistant: str = ""
+
+
+class ConversationHistory:
+    """
+    Bounded conversation history for AgentLLM.
+
+    The last `max_verbatim_turns` exchanges are replayed word for word. Older ones
+    are folded into a compact running summary of booking slots (date, time, party
+    size, table, booking references), and tool outputs are never carried past the
+    turn that produced them, so the prompt stays roughly the same size no matter
+    how long the call runs.
+
+    When used, the Agent must be created with add_history_to_messages=False so the
+    agent does not replay its own full history as well.
+    """
+
+    def __init__(self, max_verbatim_turns: int = 3):
+        self._max_verbatim_turns = max_verbatim_turns
+        self._turns: deque[Turn] = deque()
+        self._folded_turns = 0
+        self._slots = BookingSlots()
+        self._current: Optional[Turn] = None
+
+    @property
+    def slots(self) -> BookingSlots:
+        return self._slots
+
+    def start_turn(self, user_text: str):
+        """Begin a new exchange, committing any turn left open by an interruption."""
+        if self._current is not None:
+            self.end_turn()
+        self._current = Turn(user=user_text)
+
+    def add_assistant_text(self, text: str):
+        if self._current is not None:
+            self._current.assistant += text
+
+    def record_tool_call(self, name: str, arguments: Dict[str, Any], result: str):
+        self._slots.update_from_tool_call(name, arguments or {}, result)
+
+    def end_turn(self):
+        if self._current is None:
+            return
+        self._turns.append(self._current)
+        self._current = None
+        while len(self._turns) > self._max_verbatim_turns:
+            self._turns.popleft()
+            self._folded_turns += 1
+
+    def summary(self) -> Optional[str]:
+        slots = self._slots.describe()
+        if not self._folded_turns and not slots:
+            return None
+        summary = "CONVERSATION SUMMARY:"
+        if self._folded_turns:
+            summary += f" {self._folded_turns} earlier exchange(s) omitted."
+        if slots:
+            summary += f" Known so far: {slots}."
+        return summary
+
+    def build_messages(self, messages: List[Any]) -> List[Any]:
+        """Prefix the incoming user messages with the summary and recent turns."""
+        history: List[Dict[str, Any]] = []
+        summary = self.summary()
+        if summary:
+            history.append({"role": "system", "content": summary})
+        for turn in self._turns:
+            history.append({"role": "user", "content": turn.user})
+            if turn.assistant:
+                history.append({"role": "assistant", "content": turn.assistant})
+
+        logger.debug(
+            f"History: {len(self._turns)} verbatim turn(s), {self._folded_turns} folded"
+        )
+        return history + list(messages)
+
+
+def message_text(message: Any) -> str:
+    """Extract the plain text of an OpenAI-style message dict or Agno Message."""
+    content = (
+        message.get("content")
+        if isinstance(message, dict)
+        else getattr(message, "content", None)
+    )
+    if isinstance(content, str):
+        return content
+    if isinstance(content, list):
+        return " ".join(
+            part.get("text", "")
+            for part in content
+            if isinstance(part, dict) and part.get("type") == "text"
+        )
+    return ""
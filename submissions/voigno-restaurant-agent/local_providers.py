@@ -0,0 +1,395 @@
+"""Local stand-ins for Deepgram, Cartesia, OpenAI and MongoDB Atlas.
+
+With LOCAL_PROVIDERS=1, bot.py builds its calls from `LocalProviders` instead of
+the real services, so a call runs on a laptop without network access or keys:
+
+- ScriptedSTTService: emits the next scripted transcript shortly after the
+  caller's audio goes quiet, like Deepgram's endpointing
+- EnergyVADAnalyzer: deterministic level-based VAD instead of Silero
+- StubModel (stub_model.py): replies and tool calls from the script
+- ToneTTSService: a sine tone about as long as the text would take to speak
+- mongomock with seeded booking slots for the toolkit
+
+The providers' latencies are configurable, so the pipeline can be benchmarked
+deterministically (see benchmarks/replay.py). A script is a JSON object:
+
+    {
+        "transcripts": ["I'd like a table for two tomorrow at seven", ...],
+        "model": [
+            {"tool_calls": [{"name": "find_available_tables",
+                             "arguments": {"date": "{today+1}", "time_slot": "19:00",
+                                           "location": "window"}}]},
+            "Table A by the window is free at seven. Shall I book it?",
+            ...
+        ]
+    }
+
+Each model step is a reply text, or a dict with "text" and/or "tool_calls";
+"{today}" and "{today+N}" in it are replaced with dates (YYYY-MM-DD). Give tool
+calls every argument: agno passes omitted optional ones as null, which the
+toolkit's type validation rejects.
+"""
+
+import asyncio
+import json
+import math
+import os
+import random
+import re
+from datetime import date, timedelta
+from typing import Any, AsyncGenerator, Dict, List, Optional, Union
+
+import numpy as np
+from loguru import logger
+from pipecat.audio.vad.vad_analyzer import VADAnalyzer, VADParams
+from pipecat.frames.frames import (
+    Frame,
+    TranscriptionFrame,
+    TTSAudioRawFrame,
+    TTSStartedFrame,
+    TTSStoppedFrame,
+)
+from pipecat.services.stt_service import STTService
+from pipecat.services.tts_service import TTSService
+from pipecat.utils.time import time_now_iso8601
+
+from restaurant_config import TABLES, TIME_SLOTS
+from stub_model import StubModel, StubReply, scripted_replies
+
+# Rough speaking rate of the TTS voice
+SECONDS_PER_CHARACTER = 0.06
+
+
+def fill_dates(value: Any, today: Optional[date] = None) -> Any:
+    """Replace "{today}" and "{today+N}" in strings, lists and dicts with dates."""
+    today = today or date.today()
+    if isinstance(value, str):
+        return re.sub(
+            r"\{today(?:\+(\d+))?\}",
+            lambda m: (today + timedelta(days=int(m.group(1) or 0))).isoformat(),
+            value,
+        )
+    if isinstance(value, list):
+        return [fill_dates(item, today) for item in value]
+    if isinstance(value, dict):
+        return {key: fill_dates(item, today) for key, item in value.items()}
+    return value
+
+
+def template_dates(value: Any, today: Optional[date] = None) -> Any:
+    """The inverse of fill_dates: replace dates from today on with "{today+N}"."""
+    today = today or date.today()
+
+    def template(match: re.Match) -> str:
+        try:
+            days = (date.fromisoformat(match.group(0)) - today).days
+        except ValueError:
+            return match.group(0)
+        if days < 0:
+            return match.group(0)
+        return "{today}" if days == 0 else f"{{today+{days}}}"
+
+    if isinstance(value, str):
+        return re.sub(r"\d{4}-\d{2}-\d{2}", template, value)
+    if isinstance(value, list):
+        return [template_dates(item, today) for item in value]
+    if isinstance(value, dict):
+        return {key: template_dates(item, today) for key, item in value.items()}
+    return value
+
+
+def script_replies(script: Dict[str, Any]) -> List[StubReply]:
+    """The model steps of a script as stub model replies, with dates filled in."""
+    return [
+        StubReply(
+            text=step.get("text", ""),
+            tool_calls=[
+                (call["name"], call.get("arguments", {}))
+                for call in step.get("tool_calls", [])
+            ],
+        )
+        for step in (
+            {"text": step} if isinstance(step, str) else step
+            for step in fill_dates(script.get("model", []))
+        )
+    ]
+
+
+def pcm_level(audio: bytes) -> float:
+    """RMS of 16-bit PCM audio as a fraction of full scale."""
+    samples = np.frombuffer(audio, dtype=np.int16)
+    if not samples.size:
+        return 0.0
+    return float(np.sqrt(np.mean(samples.astype(np.float32) ** 2)) / 32768)
+
+
+def tone(seconds: float, sample_rate: int, frequency: float = 220.0) -> bytes:
+    """A sine tone with a syllable-like 4 Hz envelope, as 16-bit PCM."""
+    t = np.arange(int(seconds * sample_rate)) / sample_rate
+    envelope = 0.6 + 0.4 * np.sin(2 * math.pi * 4 * t)
+    samples = 0.3 * envelope * np.sin(2 * math.pi * frequency * t)
+    return (samples * 32767).astype(np.int16).tobytes()
+
+
+def seed_bookings(
+    db,
+    *,
+    days: int = 14,
+    start: Optional[date] = None,
+    occupancy: Union[float, List[float]] = 0.3,
+    seed: int = 0,
+    customers: int = 0,
+) -> int:
+    """
+    Create a day collection per date in `db`, laid out like the dashboard's
+    initialize_collection_for_date, with a share of the slots booked.
+
+    Args:
+        days: Number of days, starting at `start` (default today)
+        occupancy: Share of booked slots, or one share per day (cycled)
+        seed: Seed for the booked slots and phone numbers
+        customers: Book for this many repeat callers, +15550000000 up; 0 gives
+            every booking a random phone number
+
+    Returns:
+        Number of slot documents inserted
+    """
+    rng = random.Random(seed)
+    start = start or date.today()
+    shares = occupancy if isinstance(occupancy, list) else [occupancy]
+    inserted = 0
+    for offset in range(days):
+        day = start + timedelta(days=offset)
+        share = shares[offset % len(shares)]
+        documents = []
+        for time_slot in TIME_SLOTS:
+            for table_id, table in TABLES.items():
+                booked = rng.random() < share
+                documents.append(
+                    {
+                        "slot_id": f"{time_slot.replace(':', '')}t{table_id}",
+                        "time": time_slot,
+                        "table": table_id,
+                        "table_size": table["size"],
+                        "table_location": table["location"],
+                        "table_description": table["description"],
+                        "available": not booked,
+                        "customer_phone": (
+                            f"+1555{rng.randrange(customers or 10**7):07d}"
+                            if booked
+                            else None
+                        ),
+                        "party_size": rng.randint(1, table["size"]) if booked else None,
+                        "special_requests": None,
+                    }
+                )
+        collection = db[day.strftime("%Y%m%d")]
+        collection.delete_many({})
+        collection.insert_many(documents)
+        inserted += len(documents)
+    return inserted
+
+
+class EnergyVADAnalyzer(VADAnalyzer):
+    """VAD that counts any 20 ms window above `threshold` RMS as speech."""
+
+    def __init__(self, *, threshold: float = 0.02, params: VADParams = VADParams()):
+        super().__init__(sample_rate=None, params=params)
+        self._threshold = threshold
+
+    def num_frames_required(self) -> int:
+        return int(self.sample_rate * 0.02)
+
+    def voice_confidence(self, buffer) -> float:
+        return 1.0 if pcm_level(buffer) >= self._threshold else 0.0
+
+
+class ScriptedSTTService(STTService):
+    """
+    Speech-to-text stand-in. It follows the level of the caller's audio and,
+    `latency` seconds after an utterance ends (`endpointing` seconds of quiet),
+    emits the next scripted transcript as a final TranscriptionFrame. Once the
+    script runs out it repeats the last transcript.
+
+    It also has the connection methods ProviderConnections uses.
+    """
+
+    def __init__(
+        self,
+        *,
+        transcripts: List[str],
+        latency: float = 0.15,
+        endpointing: float = 0.2,
+        connect_latency: float = 0.05,
+        threshold: float = 0.02,
+        **kwargs,
+    ):
+        super().__init__(**kwargs)
+        self._transcripts = list(transcripts) or ["Hello"]
+        self._latency = latency
+        self._endpointing = endpointing
+        self._connect_latency = connect_latency
+        self._threshold = threshold
+        self._transcript_index = 0
+        self._speaking = False
+        self._quiet = 0.0
+
+    async def preconnect(self):
+        await asyncio.sleep(self._connect_latency)
+
+    async def run_stt(self, audio: bytes) -> AsyncGenerator[Frame, None]:
+        if pcm_level(audio) >= self._threshold:
+            self._speaking = True
+            self._quiet = 0.0
+        elif self._speaking:
+            self._quiet += len(audio) / 2 / self.sample_rate
+            if self._quiet >= self._endpointing:
+                self._speaking = False
+                text = self._transcripts[
+                    min(self._transcript_index, len(self._transcripts) - 1)
+                ]
+                self._transcript_index += 1
+                self.create_task(self._transcribe(text))
+        yield None
+
+    async def _transcribe(self, text: str):
+        await asyncio.sleep(self._latency)
+        logger.debug(f"{self}: scripted transcript [{text}]")
+        await self.push_frame(TranscriptionFrame(text, "", time_now_iso8601()))
+
+
+class ToneTTSService(TTSService):
+    """
+    Text-to-speech stand-in: after `latency` seconds it streams a tone as long
+    as the text would take to say, in `chunk_seconds` chunks.
+
+    It also has the websocket methods ProviderConnections uses on
+    CartesiaTTSService.
+    """
+
+    def __init__(
+        self,
+        *,
+        latency: float = 0.12,
+        chunk_seconds: float = 0.1,
+        connect_latency: float = 0.05,
+        **kwargs,
+    ):
+        super().__init__(**kwargs)
+        self._latency = latency
+        self._chunk_seconds = chunk_seconds
+        self._connect_latency = connect_latency
+        self._websocket = None
+
+    def can_generate_metrics(self) -> bool:
+        return True
+
+    async def _connect_websocket(self):
+        await asyncio.sleep(self._connect_latency)
+        self._websocket = True
+
+    async def _disconnect_websocket(self):
+        self._websocket = None
+
+    async def run_tts(self, text: str) -> AsyncGenerator[Frame, None]:
+        logger.debug(f"{self}: Generating TTS [{text}]")
+        await self.start_ttfb_metrics()
+        await asyncio.sleep(self._latency)
+        await self.stop_ttfb_metrics()
+        audio = tone(len(text) * SECONDS_PER_CHARACTER, self.sample_rate, 330.0)
+        chunk = int(self._chunk_seconds * self.sample_rate) * 2
+        yield TTSStartedFrame()
+        for i in range(0, len(audio), chunk):
+            yield TTSAudioRawFrame(audio[i : i + chunk], self.sample_rate, 1)
+        yield TTSStoppedFrame()
+
+
+class LocalProviders:
+    """
+    Builds the stand-ins for a call. Latencies are in seconds; the MongoDB
+    stand-in is one mongomock client per container, seeded with `seed_days`
+    days of slots.
+
+    Args:
+        script: Transcripts and model steps (see the module docstring)
+        stt_latency: Utterance end to final transcript
+        llm_latency: Request to first token, per model request
+        tts_latency: Text to first audio
+        connect_latency: Time to open the STT and TTS connections
+        seed_days: Days of booking slots in the MongoDB stand-in
+    """
+
+    def __init__(
+        self,
+        script: Optional[Dict[str, Any]] = None,
+        *,
+        stt_latency: float = 0.15,
+        llm_latency: float = 0.3,
+        tts_latency: float = 0.12,
+        connect_latency: float = 0.05,
+        seed_days: int = 14,
+    ):
+        self.script = script or {}
+        self.stt_latency = stt_latency
+        self.llm_latency = llm_latency
+        self.tts_latency = tts_latency
+        self.connect_latency = connect_latency
+        self.seed_days = seed_days
+        self._mongo_client = None
+
+    @classmethod
+    def from_env(cls) -> "LocalProviders":
+        """
+        Configured by LOCAL_PROVIDERS_SCRIPT (path of a script JSON file) and
+        LOCAL_STT_LATENCY_MS, LOCAL_LLM_LATENCY_MS, LOCAL_TTS_LATENCY_MS.
+        """
+        script = None
+        if os.getenv("LOCAL_PROVIDERS_SCRIPT"):
+            with open(os.getenv("LOCAL_PROVIDERS_SCRIPT")) as file:
+                script = json.load(file)
+        latencies = {}
+        for name in ("stt", "llm", "tts"):
+            value = os.getenv(f"LOCAL_{name.upper()}_LATENCY_MS")
+            if value:
+                latencies[f"{name}_latency"] = float(value) / 1000
+        return cls(script, **latencies)
+
+    def stt(self, sample_rate: int) -> ScriptedSTTService:
+        return ScriptedSTTService(
+            transcripts=self.script.get("transcripts", []),
+            latency=self.stt_latency,
+            connect_latency=self.connect_latency,
+            sample_rate=sample_rate,
+            audio_passthrough=True,
+        )
+
+    def tts(self, sample_rate: int) -> ToneTTSService:
+        return ToneTTSService(
+            latency=self.tts_latency,
+            connect_latency=self.connect_latency,
+            sample_rate=sample_rate,
+        )
+
+    def model(self, model_id: str = "gpt-4o-mini") -> StubModel:
+        return StubModel(
+            id=model_id,
+            script=scripted_replies(script_replies(self.script)),
+            ttfb=lambda: self.llm_latency,
+            chunk_delay=0.02,
+        )
+
+    def vad_analyzer(self) -> EnergyVADAnalyzer:
+        return EnergyVADAnalyzer()
+
+    async def synthesize(self, text: str, sample_rate: int, encoding: str) -> bytes:
+        """Phrase synthesizer for PhraseAudioCache."""
+        await asyncio.sleep(self.tts_latency)
+        return tone(len(text) * SECONDS_PER_CHARACTER, sample_rate, 330.0)
+
+    def mongo_client(self):
+        if self._mongo_client is None:
+            import mongomock
+
+            self._mongo_client = mongomock.MongoClient()
+            seed_bookings(self._mongo_client["restaurant_booking"], days=self.seed_days)
+        return self._mongo_client
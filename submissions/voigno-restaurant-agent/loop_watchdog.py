@@ -0,0 +1,152 @@
+import asyncio
+import bisect
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from typing import Dict, Iterable, Optional
+
+from loguru import logger
+from pipecat.processors.frame_processor import FrameProcessor
+
+# Upper bounds of the lag histogram buckets in milliseconds; the last bucket
+# counts everything above
+LAG_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+
+
+class LoopWatchdog:
+    """
+    Finds what blocks the event loop: synchronous I/O, heavy encoding, anything
+    that keeps every other call's audio waiting.
+
+    A heartbeat task wakes up every `interval` seconds and records how late it
+    ran in a histogram. A watchdog thread checks the heartbeat; once it is
+    `threshold` seconds overdue, the thread takes the stack of the event loop
+    thread while it is still blocked. The report names the innermost
+    FrameProcessor on that stack and the call it belongs to (see `track`), and
+    is logged with the stall's total duration once the loop is free again: the
+    time from the last heartbeat to the next one, less `interval`, as measured
+    by the thread (a heartbeat's own lag misses a stall that starts before it
+    goes to sleep).
+
+    Args:
+        threshold: Seconds the loop has to be blocked for a stack capture
+        interval: Seconds between heartbeats
+        max_reports: Stall reports kept for `stats`
+        stack_depth: Innermost frames kept per report
+    """
+
+    def __init__(
+        self,
+        threshold: float = 0.1,
+        interval: float = 0.02,
+        max_reports: int = 20,
+        stack_depth: int = 12,
+    ):
+        self.threshold = threshold
+        self.interval = interval
+        self.stack_depth = stack_depth
+        self._histogram = [0] * (len(LAG_BUCKETS_MS) + 1)
+        self._max_lag = 0.0
+        self._reports: deque[dict] = deque(maxlen=max_reports)
+        self._processor_calls: Dict[str, str] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread_id: Optional[int] = None
+        self._beat = time.monotonic()
+        self._heartbeat: Optional[asyncio.Task] = None
+        self._stopped = threading.Event()
+
+    def start(self):
+        if self._heartbeat:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._beat = time.monotonic()
+        self._stopped.clear()
+        self._heartbeat = asyncio.create_task(self._run_heartbeat())
+        threading.Thread(target=self._watch, name="loop-watchdog", daemon=True).start()
+        logger.info(f"Loop watchdog started, capturing stalls over {self.threshold}s")
+
+    async def stop(self):
+        self._stopped.set()
+        if self._heartbeat:
+            self._heartbeat.cancel()
+            self._heartbeat = None
+
+    def track(self, call_sid: str, processors: Iterable[FrameProcessor]):
+        """Attribute stalls inside these processors to a call."""
+        for processor in processors:
+            self._processor_calls[processor.name] = call_sid
+
+    def untrack(self, call_sid: str):
+        self._processor_calls = {
+            name: sid for name, sid in self._processor_calls.items() if sid != call_sid
+        }
+
+    def stats(self) -> dict:
+        labels = [f"<={b}ms" for b in LAG_BUCKETS_MS] + [f">{LAG_BUCKETS_MS[-1]}ms"]
+        return {
+            "lag_histogram": dict(zip(labels, self._histogram)),
+            "max_lag_ms": round(self._max_lag * 1000, 1),
+            "stalls": list(self._reports),
+        }
+
+    async def _run_heartbeat(self):
+        while True:
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            self._beat = now
+            self._record_lag(max(0.0, now - expected))
+
+    def _record_lag(self, lag: float):
+        index = bisect.bisect_left(LAG_BUCKETS_MS, lag * 1000)
+        self._histogram[index] += 1
+        self._max_lag = max(self._max_lag, lag)
+
+    def _watch(self):
+        while not self._stopped.wait(self.interval):
+            overdue = time.monotonic() - self._beat - self.interval
+            if overdue < self.threshold:
+                continue
+            beat = self._beat
+            report = self._capture()
+            # One capture per stall: wait for the next heartbeat
+            while self._beat == beat and not self._stopped.wait(self.interval):
+                pass
+            end = self._beat
+            if end == beat:
+                # Stopped while the loop is still blocked
+                end = time.monotonic()
+            report["blocked_ms"] = round(
+                max(overdue, end - beat - self.interval) * 1000
+            )
+            self._reports.append(report)
+            logger.warning(
+                f"Event loop blocked for {report['blocked_ms']} ms in "
+                f"{report['processor'] or report['task']} "
+                f"(call {report['call_sid']}):\n" + "\n".join(report["stack"])
+            )
+
+    def _capture(self) -> dict:
+        frame = sys._current_frames().get(self._loop_thread_id)
+        processor = None
+        walker = frame
+        while walker is not None and processor is None:
+            candidate = walker.f_locals.get("self")
+            if isinstance(candidate, FrameProcessor):
+                processor = candidate.name
+            walker = walker.f_back
+
+        task = asyncio.current_task(self._loop) if self._loop else None
+        stack = traceback.format_list(
+            traceback.extract_stack(frame)[-self.stack_depth :] if frame else []
+        )
+        return {
+            "at": time.time(),
+            "processor": processor,
+            "call_sid": self._processor_calls.get(processor),
+            "task": task.get_name() if task else None,
+            "stack": [line.rstrip() for line in stack],
+        }
@@ -0,0 +1,241 @@
+"""Prompt text for the restaurant booking agent.
+
+The system prompt is laid out as an immutable prefix (persona, table information,
+slot rules) followed by a small per-call block (caller number, date). Keeping the
+prefix byte-identical across calls and turns lets the provider's prompt cache hit;
+only the short suffix changes.
+
+The table, slot and large-party sections are generated from the same table
+metadata the booking collections are seeded from, so each fact is stated once
+and a layout change only needs an edit in restaurant_config.py.
+"""
+
+import os
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from loguru import logger
+
+from restaurant_config import PRIVATE_DINING_CAPACITY, TABLES, TIME_SLOTS
+
+# Upper bound for the static prompt prefix, in tokens
+PROMPT_TOKEN_BUDGET = int(os.getenv("PROMPT_TOKEN_BUDGET", "1500"))
+
+DESCRIPTION = """\
+A voice-based restaurant booking assistant that helps customers make, find, and modify reservations at Luciya Restaurant."""
+
+PERSONA = """\
+You are "Jessica", the phone booking assistant of Luciya Restaurant. You help callers book tables, check availability, and find or cancel their reservations. Be warm, courteous and professional."""
+
+VOICE_STYLE = """\
+VOICE STYLE:
+Your replies are converted to speech.
+- Keep sentences short and conversational; no markdown, lists or special characters.
+- Say times as "7 PM" and dates as "this Friday" or "May 15th", never "19:00" or "2025-05-15".
+- Offer at most 3 options at a time and end with a question or a clear next step.
+- Read reference codes and phone numbers back slowly, e.g. "555-123-4567"."""
+
+BOOKING_WORKFLOW = """\
+BOOKING WORKFLOW:
+1. Get the date, time and party size; clarify ambiguous dates and default to today only after confirming.
+2. Call find_available_tables with date as YYYY-MM-DD and time as HH:MM.
+3. Offer suitable tables, applying the large party rules, and ask for a location preference.
+4. Repeat date, time, party size and table back and get a yes before booking or cancelling.
+5. Call book_table with the date, slot_id, the customer_phone from CALL CONTEXT, party_size and any special requests. For several tables make one call per table and note the shared party in special_requests.
+6. Give the booking reference. If the slot is full, suggest nearby times or dates.
+To look up or cancel bookings, call find_customer_bookings with the phone number from CALL CONTEXT."""
+
+TOOL_CALLS = """\
+TOOL CALLS:
+Call tools straight away without announcing them; a short hold message such as "Let me check that for you" is played to the caller automatically."""
+
+# Fixed phrases played from pre-synthesized audio (see audio_cache.py)
+GREETING = "Hi-I am Jessica.-How can I help with your reservations at Luciya restraunt."
+FILLER_PHRASES = [
+    "Let me check that for you.",
+    "One moment please.",
+    "Just a second while I look that up.",
+]
+
+
+def count_tokens(text: str) -> int:
+    """Count tokens with tiktoken when available, else estimate at ~4 chars per token"""
+    encoding = _get_encoding()
+    if encoding is None:
+        return max(1, len(text) // 4)
+    return len(encoding.encode(text))
+
+
+_encoding = None
+_encoding_loaded = False
+
+
+def _get_encoding():
+    global _encoding, _encoding_loaded
+
+    if not _encoding_loaded:
+        _encoding_loaded = True
+        try:
+            import tiktoken
+
+            _encoding = tiktoken.get_encoding("o200k_base")
+        except Exception:
+            logger.debug("tiktoken not available, estimating prompt tokens")
+    return _encoding
+
+
+def spoken_time(time_slot: str) -> str:
+    return datetime.strptime(time_slot, "%H:%M").strftime("%I %p").lstrip("0")
+
+
+def _slot_id(time_slot: str, table_id: str) -> str:
+    return f"{time_slot.replace(':', '')}t{table_id}"
+
+
+def build_tables_section(tables: Dict[str, Dict[str, Any]]) -> str:
+    lines = ["TABLES (letter, description, seats):"]
+    for table_id, table in tables.items():
+        line = f"- {table_id}: {table['description']}, seats {table['size']}"
+        if table.get("ambiance"):
+            line += f"; {table['ambiance']}"
+        lines.append(line)
+    lines.append(
+        'Name the letter when describing a table, e.g. "the window table, Table A".'
+    )
+    return "\n".join(lines)
+
+
+def build_slot_section(tables: Dict[str, Dict[str, Any]], time_slots: List[str]) -> str:
+    table_ids = list(tables)
+    first, last = time_slots[0], time_slots[-1]
+    middle = time_slots[len(time_slots) // 2]
+    examples = ", ".join(
+        f"{spoken_time(t)} table {tid} = {_slot_id(t, tid)}"
+        for t, tid in (
+            (first, table_ids[0]),
+            (middle, table_ids[1 % len(table_ids)]),
+            (last, table_ids[-1]),
+        )
+    )
+    return (
+        "SLOTS:\n"
+        f"Bookable times are on the hour from {spoken_time(first)} to {spoken_time(last)} daily.\n"
+        "slot_id = 24-hour time without the colon + lowercase t + table letter.\n"
+        f"Examples: {examples}."
+    )
+
+
+def build_large_party_section(tables: Dict[str, Dict[str, Any]]) -> Optional[str]:
+    sizes = Counter(table["size"] for table in tables.values())
+    standard = sizes.most_common(1)[0][0]
+    largest = max(sizes)
+    if largest <= standard:
+        return None
+
+    big_tables = " or ".join(
+        f"Table {tid} ({table['location']})"
+        for tid, table in tables.items()
+        if table["size"] == largest
+    )
+    combined = largest + standard
+    return (
+        "LARGE PARTIES:\n"
+        f"- {standard + 1} to {largest} people: only {big_tables} fits; if it is taken, suggest another time or splitting the party.\n"
+        f"- {largest + 1} to {combined} people: book {big_tables} plus one more table at the same time, otherwise several {standard}-seat tables. Tables are separate, not joined.\n"
+        f"- More than {combined} people: offer the private dining room (up to {PRIVATE_DINING_CAPACITY} guests, booked separately by staff) or splitting across tables."
+    )
+
+
+@dataclass
+class PromptSection:
+    name: str
+    text: str
+    required: bool = True
+
+
+@dataclass
+class CompiledPrompt:
+    sections: List[PromptSection]
+    token_counts: Dict[str, int] = field(default_factory=dict)
+    dropped: List[str] = field(default_factory=list)
+
+    @property
+    def text(self) -> str:
+        return "\n\n".join(section.text for section in self.sections)
+
+    @property
+    def total_tokens(self) -> int:
+        return sum(self.token_counts.values())
+
+    def report(self) -> str:
+        lines = [f"{name}: {tokens}" for name, tokens in self.token_counts.items()]
+        lines.append(f"total: {self.total_tokens}")
+        if self.dropped:
+            lines.append(f"dropped to fit budget: {', '.join(self.dropped)}")
+        return "\n".join(lines)
+
+
+def compile_prompt(
+    tables: Dict[str, Dict[str, Any]] = TABLES,
+    time_slots: List[str] = TIME_SLOTS,
+    token_budget: int = PROMPT_TOKEN_BUDGET,
+) -> CompiledPrompt:
+    """Build the static prompt prefix from table metadata and enforce the token budget.
+
+    Optional sections are dropped from the end until the prompt fits; a ValueError
+    is raised if the required sections alone exceed the budget.
+    """
+    sections = [
+        PromptSection("persona", PERSONA),
+        PromptSection("tables", build_tables_section(tables)),
+        PromptSection("slots", build_slot_section(tables, time_slots)),
+        PromptSection("booking_workflow", BOOKING_WORKFLOW),
+    ]
+    large_parties = build_large_party_section(tables)
+    if large_parties:
+        sections.append(PromptSection("large_parties", large_parties))
+    sections.append(PromptSection("voice_style", VOICE_STYLE, required=False))
+    sections.append(PromptSection("tool_calls", TOOL_CALLS, required=False))
+
+    compiled = CompiledPrompt(
+        sections=sections,
+        token_counts={section.name: count_tokens(section.text) for section in sections},
+    )
+
+    for section in reversed(list(compiled.sections)):
+        if compiled.total_tokens <= token_budget:
+            break
+        if not section.required:
+            compiled.sections.remove(section)
+            compiled.token_counts.pop(section.name)
+            compiled.dropped.append(section.name)
+
+    if compiled.total_tokens > token_budget:
+        raise ValueError(
+            f"Prompt needs {compiled.total_tokens} tokens, over the budget of {token_budget}:\n{compiled.report()}"
+        )
+    return compiled
+
+
+COMPILED_PROMPT = compile_prompt()
+STATIC_INSTRUCTIONS = COMPILED_PROMPT.text
+
+CALL_CONTEXT_TEMPLATE = """\
+CALL CONTEXT:
+- Today is {today}.
+- The customer's phone number is {phone_number}."""
+
+UNKNOWN_PHONE_NUMBER = "not known yet, ask the customer for it if you need it"
+
+
+def build_call_context(
+    phone_number: Optional[str] = None, now: Optional[datetime] = None
+) -> str:
+    """Build the per-call dynamic block appended after the static prompt prefix"""
+    now = now or datetime.now()
+    return CALL_CONTEXT_TEMPLATE.format(
+        today=now.strftime("%A, %Y-%m-%d"),
+        phone_number=phone_number or UNKNOWN_PHONE_NUMBER,
+    )
@@ -0,0 +1,262 @@
+"""Encoders for call recordings uploaded by StreamingS3Recorder.
+
+Each codec takes 16-bit PCM as it is recorded and returns encoded bytes that can
+be uploaded straight away; `header` is prepended once the total size is known
+(only the WAV codecs need one). Codecs are not thread safe but are only used from
+one worker at a time by the recorder.
+
+Approximate size of one minute of 8 kHz mono:
+    wav   (16-bit PCM)  960 KB
+    ulaw  (G.711 WAV)   480 KB, exactly what went over the phone line
+    flac                lossless, size depends on how noisy the line is
+    opus  (16 kbps)     ~120 KB
+
+benchmarks/codec_bench.py measures size and encode CPU for real recordings.
+
+FLAC and Opus need PyAV (`pip install av`).
+"""
+
+import struct
+from typing import Dict, Type
+
+WAVE_FORMAT_MULAW = 7
+
+# G.711 mu-law segment ends, on 14-bit magnitudes
+ULAW_SEGMENT_ENDS = [0x3F, 0x7F, 0xFF, 0x1FF, 0x3FF, 0x7FF, 0xFFF, 0x1FFF]
+ULAW_BIAS = 0x84
+ULAW_CLIP = 8159
+
+# Lookup tables, built on first use: every 16-bit sample (indexed as unsigned)
+# to its mu-law byte, and every mu-law byte to its 16-bit sample
+_ulaw_encode_table = None
+_ulaw_decode_table = None
+
+
+def _ulaw_tables():
+    """
+    G.711 mu-law tables, bit-exact with audioop.lin2ulaw/ulaw2lin, which they
+    replace: audioop is deprecated and gone in Python 3.13.
+    """
+    global _ulaw_encode_table, _ulaw_decode_table
+    if _ulaw_encode_table is None:
+        import numpy as np
+
+        samples = np.arange(-32768, 32768, dtype=np.int32)
+        shifted = samples >> 2
+        mask = np.where(shifted < 0, 0x7F, 0xFF)
+        magnitude = np.minimum(np.abs(shifted), ULAW_CLIP) + (ULAW_BIAS >> 2)
+        segment = np.searchsorted(ULAW_SEGMENT_ENDS, magnitude)
+        quantized = (segment << 4) | ((magnitude >> (segment + 1)) & 0xF)
+        encoded = np.where(segment >= 8, 0x7F, quantized) ^ mask
+        encode_table = np.empty(65536, dtype=np.uint8)
+        encode_table[samples & 0xFFFF] = encoded
+
+        inverted = ~np.arange(256, dtype=np.int32) & 0xFF
+        magnitude = (((inverted & 0xF) << 3) + ULAW_BIAS) << ((inverted & 0x70) >> 4)
+        decode_table = np.where(
+            inverted & 0x80, ULAW_BIAS - magnitude, magnitude - ULAW_BIAS
+        ).astype(np.int16)
+        _ulaw_encode_table, _ulaw_decode_table = encode_table, decode_table
+    return _ulaw_encode_table, _ulaw_decode_table
+
+
+def pcm_to_ulaw(pcm: bytes) -> bytes:
+    """16-bit PCM to 8-bit mu-law."""
+    import numpy as np
+
+    encode_table, _ = _ulaw_tables()
+    return encode_table[np.frombuffer(pcm, dtype=np.uint16)].tobytes()
+
+
+def ulaw_to_pcm(ulaw: bytes) -> bytes:
+    """8-bit mu-law to 16-bit PCM."""
+    import numpy as np
+
+    _, decode_table = _ulaw_tables()
+    return decode_table[np.frombuffer(ulaw, dtype=np.uint8)].tobytes()
+
+
+def wav_header(
+    data_size: int, sample_rate: int, num_channels: int, sample_width: int = 2
+) -> bytes:
+    """Build the 44-byte header of a PCM WAV file holding data_size bytes."""
+    byte_rate = sample_rate * num_channels * sample_width
+    return struct.pack(
+        "<4sI4s4sIHHIIHH4sI",
+        b"RIFF",
+        36 + data_size,
+        b"WAVE",
+        b"fmt ",
+        16,
+        1,  # PCM
+        num_channels,
+        sample_rate,
+        byte_rate,
+        num_channels * sample_width,
+        sample_width * 8,
+        b"data",
+        data_size,
+    )
+
+
+class RecordingCodec:
+    name = ""
+    extension = ""
+    content_type = ""
+
+    def __init__(self, sample_rate: int, num_channels: int = 1):
+        self.sample_rate = sample_rate
+        self.num_channels = num_channels
+
+    def encode(self, pcm: bytes) -> bytes:
+        raise NotImplementedError
+
+    def finish(self) -> bytes:
+        return b""
+
+    def header(self, data_size: int) -> bytes:
+        return b""
+
+
+class PcmWavCodec(RecordingCodec):
+    name = "wav"
+    extension = "wav"
+    content_type = "audio/wav"
+
+    def encode(self, pcm: bytes) -> bytes:
+        return pcm
+
+    def header(self, data_size: int) -> bytes:
+        return wav_header(data_size, self.sample_rate, self.num_channels)
+
+
+class MulawWavCodec(RecordingCodec):
+    name = "ulaw"
+    extension = "wav"
+    content_type = "audio/wav"
+
+    def encode(self, pcm: bytes) -> bytes:
+        return pcm_to_ulaw(pcm)
+
+    def header(self, data_size: int) -> bytes:
+        # Non-PCM WAV: 18-byte fmt chunk plus a fact chunk with the frame count
+        block_align = self.num_channels
+        return struct.pack(
+            "<4sI4s4sIHHIIHHH4sII4sI",
+            b"RIFF",
+            4 + 26 + 12 + 8 + data_size,
+            b"WAVE",
+            b"fmt ",
+            18,
+            WAVE_FORMAT_MULAW,
+            self.num_channels,
+            self.sample_rate,
+            self.sample_rate * block_align,
+            block_align,
+            8,
+            0,
+            b"fact",
+            4,
+            data_size // block_align,
+            b"data",
+            data_size,
+        )
+
+
+class _PyAVCodec(RecordingCodec):
+    container_format = ""
+    codec_name = ""
+    bit_rate = 0
+
+    def __init__(self, sample_rate: int, num_channels: int = 1):
+        super().__init__(sample_rate, num_channels)
+        try:
+            import av
+        except ImportError:
+            raise ImportError(
+                f"The {self.name} recording codec needs PyAV, install it with `pip install av`"
+            )
+
+        self._av = av
+        self._output = _ChunkWriter()
+        self._container = av.open(self._output, mode="w", format=self.container_format)
+        self._stream = self._container.add_stream(
+            self.codec_name,
+            rate=sample_rate,
+            layout="mono" if num_channels == 1 else "stereo",
+        )
+        if self.bit_rate:
+            self._stream.bit_rate = self.bit_rate * num_channels
+
+    def encode(self, pcm: bytes) -> bytes:
+        import numpy as np
+
+        samples = np.frombuffer(pcm, dtype=np.int16).reshape(1, -1)
+        frame = self._av.AudioFrame.from_ndarray(
+            samples, format="s16", layout=self._stream.layout.name
+        )
+        frame.sample_rate = self.sample_rate
+        for packet in self._stream.encode(frame):
+            self._container.mux(packet)
+        return self._output.take()
+
+    def finish(self) -> bytes:
+        for packet in self._stream.encode(None):
+            self._container.mux(packet)
+        self._container.close()
+        return self._output.take()
+
+
+class FlacCodec(_PyAVCodec):
+    name = "flac"
+    extension = "flac"
+    content_type = "audio/flac"
+    container_format = "flac"
+    codec_name = "flac"
+
+
+class OpusCodec(_PyAVCodec):
+    name = "opus"
+    extension = "ogg"
+    content_type = "audio/ogg"
+    container_format = "ogg"
+    codec_name = "libopus"
+    # Per channel; plenty for narrowband speech
+    bit_rate = 16000
+
+
+class _ChunkWriter:
+    """Non-seekable file object for PyAV that hands out what was written so far."""
+
+    def __init__(self):
+        self._buffer = bytearray()
+        self._position = 0
+
+    def write(self, data: bytes) -> int:
+        self._buffer.extend(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def seekable(self) -> bool:
+        return False
+
+    def take(self) -> bytes:
+        data = bytes(self._buffer)
+        self._buffer.clear()
+        return data
+
+
+RECORDING_CODECS: Dict[str, Type[RecordingCodec]] = {
+    codec.name: codec for codec in (PcmWavCodec, MulawWavCodec, FlacCodec, OpusCodec)
+}
+
+
+def create_codec(name: str, sample_rate: int, num_channels: int = 1) -> RecordingCodec:
+    if name not in RECORDING_CODECS:
+        raise ValueError(
+            f"Unknown recording codec {name!r}, expected one of {', '.join(RECORDING_CODECS)}"
+        )
+    return RECORDING_CODECS[name](sample_rate, num_channels)
@@ -0,0 +1,60 @@
+"""Table layout and daily time slots of the restaurant.
+
+Kept free of dependencies so the Streamlit dashboard can import it without agno:
+initialize_collection_for_date there seeds each day's collection from these
+values, and the agent prompt and FAQ answers are generated from them (see
+prompts.py and faq_cache.py).
+"""
+
+from typing import Any, Dict
+
+TABLES: Dict[str, Dict[str, Any]] = {
+    "A": {
+        "size": 4,
+        "location": "window",
+        "description": "Window table with city view",
+        "ambiance": "great for romantic dinners",
+    },
+    "B": {
+        "size": 4,
+        "location": "aisle",
+        "description": "Central aisle table",
+        "ambiance": "lively, in the heart of the restaurant",
+    },
+    "C": {
+        "size": 4,
+        "location": "corner",
+        "description": "Quiet corner table",
+        "ambiance": "good for private conversations",
+    },
+    "D": {
+        "size": 6,
+        "location": "patio",
+        "description": "Outdoor patio table",
+        "ambiance": "fresh air with evening lighting",
+    },
+    "E": {
+        "size": 4,
+        "location": "bar",
+        "description": "Near the bar",
+        "ambiance": "energetic, easy access to drinks",
+    },
+}
+
+TIME_SLOTS = [
+    "9:00",
+    "10:00",
+    "11:00",
+    "12:00",
+    "13:00",
+    "14:00",
+    "15:00",
+    "16:00",
+    "17:00",
+    "18:00",
+    "19:00",
+    "20:00",
+    "21:00",
+]
+
+PRIVATE_DINING_CAPACITY = 20
@@ -1,18 +1,24 @@
 from typing import Dict, Any
 from datetime import datetime, timedelta
-from pymongo import MongoClient
 
 from agno.tools.toolkit import Toolkit
 
 
 class RestaurantBookingToolkit(Toolkit):
-    def __init__(self, mongo_uri: str, db_name: str = "restaurant_booking"):
-        """Initialize parameters: mongo_uri (str), db_name (str, optional)"""
+    def __init__(
+        self, mongo_uri: str, db_name: str = "restaurant_booking", connect: bool = True
+    ):
+        """Initialize parameters: mongo_uri (str), db_name (str, optional),
+        connect (bool, optional; False leaves creating the MongoClient to connect())"""
         super().__init__(name="restaurant_booking")
+        self.mongo_uri = mongo_uri
+        self.db_name = db_name
+        self.client = None
+        self.db = None
 
         try:
-            self.client = MongoClient(mongo_uri)
-            self.db = self.client[db_name]
+            if connect:
+                self.connect()
 
             # Register all functions with the toolkit
             self.register(self.book_table)
@@ -28,6 +34,17 @@ class RestaurantBookingToolkit(Toolkit):
                 f"Database connection error: {str(e)}. Parameters: mongo_uri (str), db_name (str, optional)"
             )
 
+    def connect(self, client=None):
+        """Create the MongoClient; it connects in the background and on first use.
+        client (optional): use this client instead, e.g. a mongomock one"""
+        if self.client is None:
+            if client is None:
+                from pymongo import MongoClient
+
+                client = MongoClient(self.mongo_uri)
+            self.client = client
+            self.db = self.client[self.db_name]
+
     def get_collection_name(self, date: datetime) -> str:
         """Get the collection name for a specific date"""
         return date.strftime("%Y%m%d")
@@ -0,0 +1,133 @@
+import re
+import statistics
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+from agno.models.base import Model
+from loguru import logger
+from pipecat.metrics.metrics import MetricsData
+
+FAST = "fast"
+CAPABLE = "capable"
+
+# Short replies that only confirm, decline or close the conversation
+CONFIRMATION_WORDS = set("""
+    yes yeah yep yup sure ok okay correct right perfect great fine good no nope nah
+    thanks thank you that's thats it all please book confirm go ahead sounds bye
+    goodbye hi hello that is do
+    """.split())
+
+# Words that signal a turn needing more reasoning than a confirmation
+COMPLEX_WORDS = set("""
+    cancel change modify move reschedule instead multiple tables both split private
+    party group people guests allergy allergies birthday anniversary why how which
+    available availability bookings reservations
+    """.split())
+
+NUMBER_WORDS = {
+    "five": 5,
+    "six": 6,
+    "seven": 7,
+    "eight": 8,
+    "nine": 9,
+    "ten": 10,
+    "eleven": 11,
+    "twelve": 12,
+    "fifteen": 15,
+    "twenty": 20,
+}
+
+PARTY_SIZE_NOUNS = {"people", "persons", "guests", "adults", "of"}
+TIME_WORDS = {"am", "pm", "o'clock", "oclock", "tonight", "tomorrow"}
+
+WORD_RE = re.compile(r"[a-z']+|\d+")
+
+
+class RouteMetricsData(MetricsData):
+    route: str
+    ttfb: Optional[float] = None
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+
+
+class ModelRouter:
+    """
+    Picks a fast or a capable model for each user turn.
+
+    Classification is rule based and runs in microseconds: short confirmations and
+    greetings with no numbers go to the fast model; large parties, changes and
+    multi-part questions go to the capable one. Everything else uses
+    `default_route`. AgentLLM swaps the model on its single Agent, so both routes
+    share one conversation history.
+    """
+
+    def __init__(
+        self,
+        models: Dict[str, Model],
+        default_route: str = CAPABLE,
+        max_fast_words: int = 6,
+    ):
+        self._models = models
+        self._default_route = default_route
+        self._max_fast_words = max_fast_words
+        self._ttfbs: Dict[str, List[float]] = defaultdict(list)
+        self._tokens: Dict[str, Dict[str, int]] = defaultdict(
+            lambda: {"turns": 0, "prompt_tokens": 0, "completion_tokens": 0}
+        )
+
+    def classify(self, text: str) -> str:
+        words = WORD_RE.findall(text.lower())
+        if not words:
+            return self._default_route
+
+        for index, word in enumerate(words):
+            size = int(word) if word.isdigit() else NUMBER_WORDS.get(word)
+            if size is None or not 4 < size <= 30:
+                continue
+            # Party sizes above a standard table need the large party rules;
+            # "for 7 pm" or "7:30" are times, not party sizes
+            previous = words[index - 1] if index > 0 else ""
+            following = words[index + 1] if index + 1 < len(words) else ""
+            if following in PARTY_SIZE_NOUNS or (
+                previous in ("of", "for", "are", "be") and following not in TIME_WORDS
+            ):
+                return CAPABLE
+        if any(word in COMPLEX_WORDS for word in words):
+            return CAPABLE
+
+        if len(words) <= self._max_fast_words and all(
+            word in CONFIRMATION_WORDS for word in words
+        ):
+            return FAST
+        return self._default_route
+
+    def model_for(self, route: str) -> Model:
+        return self._models.get(route) or self._models[self._default_route]
+
+    def record(
+        self,
+        route: str,
+        ttfb: Optional[float],
+        prompt_tokens: int,
+        completion_tokens: int,
+    ):
+        if ttfb is not None:
+            self._ttfbs[route].append(ttfb)
+        tokens = self._tokens[route]
+        tokens["turns"] += 1
+        tokens["prompt_tokens"] += prompt_tokens
+        tokens["completion_tokens"] += completion_tokens
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        stats = {}
+        for route, tokens in self._tokens.items():
+            ttfbs = self._ttfbs.get(route) or []
+            stats[route] = dict(tokens)
+            if ttfbs:
+                stats[route]["ttfb_p50"] = round(statistics.median(ttfbs), 3)
+                stats[route]["ttfb_max"] = round(max(ttfbs), 3)
+        return stats
+
+    def log_stats(self):
+        for route, stats in self.stats().items():
+            logger.info(f"Model route {route} ({self.model_for(route).id}): {stats}")
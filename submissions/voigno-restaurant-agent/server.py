@@ -0,0 +1,177 @@
+"""FastAPI app serving Twilio media stream calls at /ws-handler.
+
+Container startup has two phases so app.py can enable Modal memory snapshots:
+`load` imports everything and builds what needs no network or secrets (VAD model,
+tool schemas; the prompt is compiled on import), and runs before the snapshot is
+taken. `connect` creates the network clients and runs after every start or
+restore, followed by the app's startup event. To run it locally:
+
+    uvicorn server:create_app --factory --port 8000
+"""
+
+import asyncio
+import json
+import os
+import time
+
+from fastapi import FastAPI, WebSocket
+from fastapi.middleware.cors import CORSMiddleware
+from loguru import logger
+
+from session_manager import SessionManager
+
+from bot import (
+    claim_recording_spill_dir,
+    component_pool,
+    faq_cache,
+    frame_profiler,
+    local_providers,
+    loop_watchdog,
+    open_provider_connections,
+    run_bot,
+    tool_trace_file,
+    turn_latency,
+    upload_queue,
+    warm_phrase_cache,
+)
+
+# How long a stopping container keeps uploading recordings before spilling them
+RECORDING_DRAIN_SECONDS = 20
+# CPUs of the websocket container (cpu= in app.py)
+CONTAINER_CPU = float(os.getenv("CONTAINER_CPU", "0.125"))
+
+# Active calls of this container and the limits for taking another one
+session_manager = SessionManager(cpu_allotment=CONTAINER_CPU)
+
+# Set by the first connect(); never true in a memory snapshot
+_connected = False
+
+
+def load():
+    """Snapshot-safe startup: no network clients, no secrets."""
+    component_pool.load()
+
+
+def connect():
+    """
+    Post-restore startup: network clients and the secrets they need. Runs once;
+    on Modal the container hook calls it before the app's startup event does.
+    """
+    global _connected
+    if _connected:
+        return
+    claim_recording_spill_dir()
+    component_pool.connect(
+        mongo_uri=os.getenv("MONGODB_URI"),
+        mongo_client=local_providers.mongo_client() if local_providers else None,
+    )
+    _connected = True
+
+
+def create_app() -> FastAPI:
+    web_app = FastAPI()
+
+    @web_app.on_event("startup")
+    async def warm_up():
+        # Create the network clients (and load the VAD model and tools) before
+        # accepting calls; a no-op after app.py's container hooks
+        await asyncio.to_thread(connect)
+        # Synthesize the greeting and fillers before the first call arrives
+        asyncio.create_task(warm_phrase_cache())
+        # Upload recordings after their calls end
+        upload_queue.start()
+        session_manager.start()
+        if loop_watchdog:
+            loop_watchdog.start()
+
+    @web_app.on_event("shutdown")
+    async def finish_uploads():
+        await session_manager.stop()
+        if loop_watchdog:
+            await loop_watchdog.stop()
+        if frame_profiler and os.getenv("FRAME_PROFILE_FILE"):
+            frame_profiler.dump(os.getenv("FRAME_PROFILE_FILE"))
+        await upload_queue.drain(timeout=RECORDING_DRAIN_SECONDS)
+        if tool_trace_file:
+            await asyncio.to_thread(tool_trace_file.close)
+
+    web_app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["*"],
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+
+    @web_app.get("/metrics")
+    async def metrics():
+        metrics = {
+            **session_manager.stats(),
+            "call_setup": component_pool.setup_stats(),
+            "turn_latency": turn_latency.stats(),
+            "pending_uploads": upload_queue.pending,
+            "faq_cache": faq_cache.stats(),
+        }
+        if loop_watchdog:
+            metrics["loop_watchdog"] = loop_watchdog.stats()
+        return metrics
+
+    @web_app.get("/profile")
+    async def profile(reset: bool = False):
+        if not frame_profiler:
+            return {"error": "frame profiling is off, set FRAME_PROFILE=1"}
+        stats = frame_profiler.stats()
+        if reset:
+            frame_profiler.reset()
+        return stats
+
+    @web_app.get("/turns/{call_sid}")
+    async def turns(call_sid: str):
+        return turn_latency.turns(call_sid)
+
+    @web_app.websocket("/ws-handler")
+    async def websocket_handler(websocket: WebSocket):
+        # Closing before accept turns the websocket away with an HTTP 403
+        if session_manager.rejection_reason() is not None:
+            await websocket.close(code=1013)
+            return
+        async with session_manager.session() as session:
+            await handle_call(websocket, session)
+
+    async def handle_call(websocket: WebSocket, session):
+        connections = None
+        try:
+            await websocket.accept()
+            accepted_at = time.monotonic()
+            # Connect to Deepgram, Cartesia and OpenAI while Twilio sends the
+            # start message
+            connections = open_provider_connections()
+            start_data = websocket.iter_text()
+            await start_data.__anext__()
+            call_data = json.loads(await start_data.__anext__())
+            print(call_data, flush=True)
+            stream_sid = call_data["start"]["streamSid"]
+            call_sid = call_data["start"]["callSid"]
+            session.call_sid = call_sid
+            parameters = call_data["start"].get("customParameters", {})
+            print("WebSocket connection accepted")
+            await run_bot(
+                websocket,
+                call_sid,
+                stream_sid,
+                phone_number=parameters.get("From"),
+                accepted_at=accepted_at,
+                connections=connections,
+            )
+
+        except Exception as e:
+            logger.error(f"Error in websocket handler: {e}")
+            import traceback
+
+            logger.error(traceback.format_exc())
+            if connections:
+                await connections.close()
+
+        logger.info("WebSocket connection closed")
+
+    return web_app
@@ -0,0 +1,197 @@
+import asyncio
+import os
+import resource
+import sys
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import Dict, Optional
+
+from loguru import logger
+
+
+@dataclass
+class AdmissionLimits:
+    """
+    What one container may carry before it turns new calls away.
+
+    CPU is a fraction of the container's CPU allotment (`cpu` in app.py), loop
+    lag is the worst delay of the event loop over the last few seconds.
+    """
+
+    max_sessions: int = 4
+    max_cpu: float = 0.9
+    max_loop_lag: float = 0.1
+    max_memory_mb: float = 270
+
+    @classmethod
+    def from_env(cls) -> "AdmissionLimits":
+        """Defaults, overridden by MAX_SESSIONS, MAX_CPU, MAX_LOOP_LAG_MS, MAX_MEMORY_MB."""
+        limits = cls()
+        if os.getenv("MAX_SESSIONS"):
+            limits.max_sessions = int(os.getenv("MAX_SESSIONS"))
+        if os.getenv("MAX_CPU"):
+            limits.max_cpu = float(os.getenv("MAX_CPU"))
+        if os.getenv("MAX_LOOP_LAG_MS"):
+            limits.max_loop_lag = float(os.getenv("MAX_LOOP_LAG_MS")) / 1000
+        if os.getenv("MAX_MEMORY_MB"):
+            limits.max_memory_mb = float(os.getenv("MAX_MEMORY_MB"))
+        return limits
+
+
+@dataclass
+class Session:
+    started_at: float = field(default_factory=time.monotonic)
+    call_sid: Optional[str] = None
+
+
+class SessionManager:
+    """
+    Tracks the calls a container is running and decides whether it can take one
+    more.
+
+    A sampler task measures, every `sample_interval` seconds, the process CPU
+    used as a share of `cpu_allotment`, the resident memory, and how late the
+    event loop wakes up from a sleep. All calls share one process and one event
+    loop, so these are per container; `stats` also divides CPU, and memory above
+    what the idle container used at `start`, by the number of active sessions.
+    `rejection_reason` compares them with the limits and returns why a new call
+    has to be rejected, or None.
+
+    Args:
+        limits: Admission limits (default: AdmissionLimits.from_env())
+        cpu_allotment: CPUs reserved for the container
+        sample_interval: Seconds between resource samples
+        window: Seconds of samples the loop lag and CPU checks look at
+    """
+
+    def __init__(
+        self,
+        limits: Optional[AdmissionLimits] = None,
+        cpu_allotment: float = 0.125,
+        sample_interval: float = 0.5,
+        window: float = 5.0,
+    ):
+        self.limits = limits or AdmissionLimits.from_env()
+        self.cpu_allotment = cpu_allotment
+        self.sample_interval = sample_interval
+        self._sessions: Dict[int, Session] = {}
+        self._next_id = 0
+        size = max(1, int(window / sample_interval))
+        self._cpu_samples: deque[float] = deque(maxlen=size)
+        self._lag_samples: deque[float] = deque(maxlen=size)
+        self._memory_mb = _resident_memory_mb()
+        self._idle_memory_mb = self._memory_mb
+        self._sampler: Optional[asyncio.Task] = None
+        self.admitted = 0
+        self.rejected: Dict[str, int] = {}
+
+    def start(self):
+        if not self._sampler:
+            self._idle_memory_mb = _resident_memory_mb()
+            self._sampler = asyncio.create_task(self._sample())
+
+    async def stop(self):
+        if self._sampler:
+            self._sampler.cancel()
+            self._sampler = None
+
+    @property
+    def active(self) -> int:
+        return len(self._sessions)
+
+    @property
+    def cpu(self) -> float:
+        """Recent CPU use as a share of the allotment."""
+        if not self._cpu_samples:
+            return 0.0
+        return sum(self._cpu_samples) / len(self._cpu_samples)
+
+    @property
+    def loop_lag(self) -> float:
+        """Worst event loop delay in seconds over the window."""
+        return max(self._lag_samples, default=0.0)
+
+    def rejection_reason(self) -> Optional[str]:
+        """Why a new call can't be taken right now, or None if it can."""
+        limits = self.limits
+        reason = None
+        if self.active >= limits.max_sessions:
+            reason = "sessions"
+        elif self._memory_mb >= limits.max_memory_mb:
+            reason = "memory"
+        elif self.cpu >= limits.max_cpu:
+            reason = "cpu"
+        elif self.loop_lag >= limits.max_loop_lag:
+            reason = "loop_lag"
+
+        if reason:
+            self.rejected[reason] = self.rejected.get(reason, 0) + 1
+            logger.warning(f"Rejecting call over the {reason} limit: {self.stats()}")
+        return reason
+
+    @asynccontextmanager
+    async def session(self):
+        """Count a call as active for the duration of the block."""
+        session_id = self._next_id
+        self._next_id += 1
+        session = Session()
+        self._sessions[session_id] = session
+        self.admitted += 1
+        try:
+            yield session
+        finally:
+            del self._sessions[session_id]
+            logger.info(
+                f"Session {session.call_sid} ended after "
+                f"{time.monotonic() - session.started_at:.0f}s, {self.active} active"
+            )
+
+    def stats(self) -> dict:
+        active = self.active
+        now = time.monotonic()
+        return {
+            "active_sessions": active,
+            "max_sessions": self.limits.max_sessions,
+            "cpu": round(self.cpu, 3),
+            "cpu_per_session": round(self.cpu / active, 3) if active else None,
+            "loop_lag_ms": round(self.loop_lag * 1000, 1),
+            "memory_mb": round(self._memory_mb, 1),
+            "memory_per_session_mb": (
+                round((self._memory_mb - self._idle_memory_mb) / active, 1)
+                if active
+                else None
+            ),
+            "admitted": self.admitted,
+            "rejected": dict(self.rejected),
+            "sessions": [
+                {"call_sid": s.call_sid, "age_s": round(now - s.started_at)}
+                for s in self._sessions.values()
+            ],
+        }
+
+    async def _sample(self):
+        loop = asyncio.get_running_loop()
+        last_wall, last_cpu = loop.time(), time.process_time()
+        while True:
+            expected = loop.time() + self.sample_interval
+            await asyncio.sleep(self.sample_interval)
+            now, cpu = loop.time(), time.process_time()
+            self._lag_samples.append(max(0.0, now - expected))
+            self._cpu_samples.append(
+                (cpu - last_cpu) / (now - last_wall) / self.cpu_allotment
+            )
+            self._memory_mb = _resident_memory_mb()
+            last_wall, last_cpu = now, cpu
+
+
+def _resident_memory_mb() -> float:
+    try:
+        with open("/proc/self/statm") as file:
+            pages = int(file.read().split()[1])
+        return pages * resource.getpagesize() / 1024 / 1024
+    except OSError:
+        # No /proc (macOS): peak rather than current memory, in bytes there
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 1024 / (1024 if sys.platform == "darwin" else 1)
@@ -3,8 +3,14 @@ from pymongo import MongoClient
 from datetime import datetime, timedelta
 import pandas as pd
 import plotly.graph_objects as go
+import os
+import sys
 import urllib.parse
 
+# Seed the day collections from the table layout the agent uses
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from restaurant_config import TABLES, TIME_SLOTS  # noqa: E402
+
 # Set page config
 st.set_page_config(page_title="Restaurant Booking System", layout="wide")
 
@@ -67,43 +73,13 @@ def initialize_collection_for_date(date):
     ):
         return True
 
-    # Define tables
-    tables = {
-        "A": {
-            "size": 4,
-            "location": "window",
-            "description": "Window table with city view",
-        },
-        "B": {"size": 4, "location": "aisle", "description": "Central aisle table"},
-        "C": {"size": 4, "location": "corner", "description": "Quiet corner table"},
-        "D": {"size": 6, "location": "patio", "description": "Outdoor patio table"},
-        "E": {"size": 4, "location": "bar", "description": "Near the bar"},
-    }
-
-    # Define time slots
-    time_slots = [
-        "9:00",
-        "10:00",
-        "11:00",
-        "12:00",
-        "13:00",
-        "14:00",
-        "15:00",
-        "16:00",
-        "17:00",
-        "18:00",
-        "19:00",
-        "20:00",
-        "21:00",
-    ]
-
     # Create collection
     collection = db[collection_name]
 
     # Initialize documents
     documents = []
-    for time in time_slots:
-        for table_id, table_info in tables.items():
+    for time in TIME_SLOTS:
+        for table_id, table_info in TABLES.items():
             slot_id = f"{time.replace(':', '')}t{table_id}"
             document = {
                 "slot_id": slot_id,
@@ -0,0 +1,148 @@
+import asyncio
+import json
+import time
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Optional, Tuple
+
+from agno.models.base import Model
+from agno.models.message import Message
+from agno.models.response import ModelResponse
+
+from prompts import count_tokens
+
+
+@dataclass
+class StubReply:
+    """What the stub model answers with: spoken text and/or tool calls."""
+
+    text: str = ""
+    tool_calls: List[Tuple[str, Dict[str, Any]]] = field(default_factory=list)
+
+
+def default_script(messages: List[Message]) -> StubReply:
+    if messages and messages[-1].role == "tool":
+        return StubReply(text="All done, is there anything else I can help with?")
+    return StubReply(text="Sure, let me help you with that.")
+
+
+@dataclass
+class StubModel(Model):
+    """
+    Local stand-in for a chat model, for benchmarks and offline replays.
+
+    `script` decides the reply from the messages sent to the model. `ttfb` returns
+    the delay before the first chunk, so latency distributions can be injected, and
+    `chunk_delay` is the delay between streamed words. Usage metrics are reported
+    with tokens counted the same way as prompts.count_tokens; tool call arguments
+    count as completion tokens. `requests` keeps the usage of every request.
+    """
+
+    id: str = "stub"
+    name: str = "StubModel"
+    provider: str = "Local"
+
+    script: Callable[[List[Message]], StubReply] = default_script
+    ttfb: Callable[[], float] = lambda: 0.0
+    chunk_delay: float = 0.0
+
+    calls: int = 0
+    prompt_tokens: int = 0
+    requests: List[Dict[str, int]] = field(default_factory=list)
+
+    def _reply(self, messages: List[Message]) -> Tuple[StubReply, Dict[str, int]]:
+        self.calls += 1
+        prompt_tokens = sum(count_tokens(str(m.content or "")) for m in messages)
+        self.prompt_tokens += prompt_tokens
+        reply = self.script(messages)
+        completion_tokens = count_tokens(reply.text) if reply.text else 0
+        for name, arguments in reply.tool_calls:
+            completion_tokens += count_tokens(name + json.dumps(arguments))
+        usage = {
+            "input_tokens": prompt_tokens,
+            "output_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        }
+        self.requests.append(usage)
+        return reply, usage
+
+    def _tool_call_dicts(self, reply: StubReply) -> Optional[List[Dict[str, Any]]]:
+        if not reply.tool_calls:
+            return None
+        return [
+            {
+                "id": f"call_{self.calls}_{index}",
+                "type": "function",
+                "function": {"name": name, "arguments": json.dumps(arguments)},
+            }
+            for index, (name, arguments) in enumerate(reply.tool_calls)
+        ]
+
+    def _chunks(
+        self, reply: StubReply, usage: Dict[str, int]
+    ) -> Iterator[ModelResponse]:
+        words = reply.text.split(" ") if reply.text else []
+        for index, word in enumerate(words):
+            yield ModelResponse(
+                role="assistant", content=word if index == 0 else f" {word}"
+            )
+        yield ModelResponse(
+            role="assistant",
+            tool_calls=self._tool_call_dicts(reply),
+            response_usage=usage,
+        )
+
+    def invoke(self, messages: List[Message], **kwargs) -> ModelResponse:
+        time.sleep(self.ttfb())
+        reply, usage = self._reply(messages)
+        return ModelResponse(
+            role="assistant",
+            content=reply.text or None,
+            tool_calls=self._tool_call_dicts(reply),
+            response_usage=usage,
+        )
+
+    async def ainvoke(self, messages: List[Message], **kwargs) -> ModelResponse:
+        await asyncio.sleep(self.ttfb())
+        reply, usage = self._reply(messages)
+        return ModelResponse(
+            role="assistant",
+            content=reply.text or None,
+            tool_calls=self._tool_call_dicts(reply),
+            response_usage=usage,
+        )
+
+    def invoke_stream(
+        self, messages: List[Message], **kwargs
+    ) -> Iterator[ModelResponse]:
+        time.sleep(self.ttfb())
+        reply, usage = self._reply(messages)
+        for chunk in self._chunks(reply, usage):
+            yield chunk
+            time.sleep(self.chunk_delay)
+
+    async def ainvoke_stream(
+        self, messages: List[Message], **kwargs
+    ) -> AsyncIterator[ModelResponse]:
+        await asyncio.sleep(self.ttfb())
+        reply, usage = self._reply(messages)
+        for chunk in self._chunks(reply, usage):
+            yield chunk
+            await asyncio.sleep(self.chunk_delay)
+
+    def parse_provider_response(
+        self, response: ModelResponse, **kwargs
+    ) -> ModelResponse:
+        return response
+
+    def parse_provider_response_delta(self, response: ModelResponse) -> ModelResponse:
+        return response
+
+
+def scripted_replies(replies: List[StubReply]) -> Callable[[List[Message]], StubReply]:
+    """Script that plays back a fixed list of replies, then the default behaviour."""
+    iterator = iter(replies)
+
+    def script(messages: List[Message]) -> StubReply:
+        return next(iterator, None) or default_script(messages)
+
+    return script
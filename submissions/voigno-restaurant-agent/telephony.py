@@ -0,0 +1,84 @@
+"""Audio formats of the Twilio media stream and the pipeline around it.
+
+Twilio sends and expects 8 kHz mono μ-law in 20 ms frames. With the telephony
+audio path the whole pipeline (VAD, STT, TTS and the recording) runs at 8 kHz,
+so the only conversion left is μ-law <-> 16-bit PCM in TwilioFrameSerializer;
+the wideband path is pipecat's default of 16 kHz in and 24 kHz out, which needs
+resampling on every frame in both directions.
+
+The TwiML that starts the stream carries the caller's number as stream
+parameters, which arrive in the `start` message of the websocket.
+"""
+
+import base64
+import json
+import os
+from dataclasses import dataclass
+from typing import Dict, Iterable, Iterator
+from urllib.parse import parse_qs
+from xml.sax.saxutils import quoteattr
+
+TWILIO_SAMPLE_RATE = 8000
+# 20 ms of 8 kHz μ-law, the size of each Twilio media payload
+TWILIO_FRAME_BYTES = 160
+# Fields of Twilio's voice webhook passed on to the media stream as
+# <Parameter>s, so the bot knows the caller without a REST lookup
+STREAM_PARAMETERS = ("From", "To")
+
+
+@dataclass(frozen=True)
+class AudioPath:
+    name: str
+    in_sample_rate: int
+    out_sample_rate: int
+
+
+TELEPHONY = AudioPath("telephony", TWILIO_SAMPLE_RATE, TWILIO_SAMPLE_RATE)
+WIDEBAND = AudioPath("wideband", 16000, 24000)
+
+
+def audio_path_from_env() -> AudioPath:
+    """TELEPHONY unless TELEPHONY_AUDIO=0 asks for the wideband pipeline."""
+    return WIDEBAND if os.getenv("TELEPHONY_AUDIO", "1") == "0" else TELEPHONY
+
+
+def twilio_media_message(stream_sid: str, ulaw: bytes) -> str:
+    """A Twilio `media` websocket event carrying one μ-law payload."""
+    return json.dumps(
+        {
+            "event": "media",
+            "streamSid": stream_sid,
+            "media": {"payload": base64.b64encode(ulaw).decode("utf-8")},
+        }
+    )
+
+
+def twilio_media_messages(stream_sid: str, ulaw: bytes) -> Iterator[str]:
+    """Split μ-law audio into 20 ms Twilio media events."""
+    for start in range(0, len(ulaw), TWILIO_FRAME_BYTES):
+        yield twilio_media_message(stream_sid, ulaw[start : start + TWILIO_FRAME_BYTES])
+
+
+def read_twilio_capture(lines: Iterable[str]) -> Iterator[str]:
+    """Media events from a captured Twilio websocket session, one JSON per line."""
+    for line in lines:
+        line = line.strip()
+        if line and json.loads(line).get("event") == "media":
+            yield line
+
+
+def stream_parameters_from_webhook(body: bytes) -> Dict[str, str]:
+    """STREAM_PARAMETERS from the form-encoded body of Twilio's voice webhook."""
+    form = parse_qs(body.decode("utf-8"))
+    return {name: form[name][0] for name in STREAM_PARAMETERS if form.get(name)}
+
+
+def render_stream_twiml(template: str, parameters: Dict[str, str]) -> str:
+    """Fill the {parameters} slot of the <Stream> in templates/streams.xml."""
+    return template.replace(
+        "{parameters}",
+        "".join(
+            f"<Parameter name={quoteattr(name)} value={quoteattr(value)}/>"
+            for name, value in parameters.items()
+        ),
+    )
@@ -0,0 +1,123 @@
+import json
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from loguru import logger
+from pipecat.metrics.metrics import MetricsData
+
+# Tools that only read the booking collections and can be answered from cache
+READ_ONLY_TOOLS = {
+    "find_available_tables",
+    "find_available_time_slots",
+    "find_customer_bookings",
+    "get_all_bookings",
+    "check_availability_across_days",
+}
+
+# Tools that may change what the read-only tools would return
+MUTATING_TOOLS = {"book_table", "cancel_booking"}
+
+# Integer arguments: agno validates tool calls against the toolkit's annotations,
+# so "4" reaches the toolkit as 4
+INTEGER_ARGUMENTS = {"party_size"}
+
+# Other callers book too: how long a read-only result may be served from cache
+RESULT_TTL_SECONDS = 30.0
+
+
+class ToolCacheMetricsData(MetricsData):
+    tool: str
+    hit: bool
+    hits: int
+    misses: int
+
+
+class ToolResultCache:
+    """
+    Per-session memoization of read-only RestaurantBookingToolkit results.
+
+    Used as an Agno tool hook (Agent(tool_hooks=[cache])), so every tool call of the
+    session passes through it. Read-only results are keyed by tool name and
+    arguments as the toolkit queries them and expire after `ttl` seconds, as
+    other calls book the same tables. The whole cache is dropped after any
+    mutating tool call, even a failed one: a booking that fails because the slot
+    was just taken means the cached availability is stale. Agno runs sync tools
+    in worker threads, hence the lock.
+    """
+
+    def __init__(
+        self,
+        read_only_tools: set = READ_ONLY_TOOLS,
+        mutating_tools: set = MUTATING_TOOLS,
+        ttl: float = RESULT_TTL_SECONDS,
+    ):
+        self._read_only_tools = read_only_tools
+        self._mutating_tools = mutating_tools
+        self._ttl = ttl
+        # key -> (monotonic time cached, result)
+        self._results: Dict[str, Tuple[float, Any]] = {}
+        self._last_lookup: Dict[str, bool] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __call__(
+        self, function_name: str, function_call: Callable, arguments: Dict[str, Any]
+    ):
+        if function_name in self._mutating_tools:
+            result = function_call(**arguments)
+            self.invalidate()
+            return result
+
+        if function_name not in self._read_only_tools:
+            return function_call(**arguments)
+
+        key = self.make_key(function_name, arguments)
+        with self._lock:
+            cached = self._results.get(key)
+            if cached and time.monotonic() - cached[0] < self._ttl:
+                self.hits += 1
+                self._last_lookup[key] = True
+                logger.debug(f"Tool cache hit for {function_name}({arguments})")
+                return cached[1]
+
+        result = function_call(**arguments)
+        with self._lock:
+            self.misses += 1
+            self._last_lookup[key] = False
+            # Errors are often transient (e.g. a dropped connection), don't pin them
+            if not str(result).startswith(("Error", "Invalid")):
+                self._results[key] = (time.monotonic(), result)
+        return result
+
+    def invalidate(self):
+        with self._lock:
+            if self._results:
+                logger.debug(f"Invalidating {len(self._results)} cached tool result(s)")
+            self._results.clear()
+
+    def was_hit(self, function_name: str, arguments: Dict[str, Any]) -> Optional[bool]:
+        """Whether the last call with these arguments was served from cache.
+
+        Returns None if the call did not go through the cache.
+        """
+        with self._lock:
+            return self._last_lookup.pop(self.make_key(function_name, arguments), None)
+
+    @staticmethod
+    def make_key(function_name: str, arguments: Dict[str, Any]) -> str:
+        normalized = {
+            name: _normalize_value(name, value)
+            for name, value in (arguments or {}).items()
+            if value is not None and value != ""
+        }
+        return f"{function_name}:{json.dumps(normalized, sort_keys=True, default=str)}"
+
+
+def _normalize_value(name: str, value: Any) -> Any:
+    # Other strings are matched exactly by the queries: "+1 555 000 9999" or
+    # "Window" find nothing that "+15550009999" or "window" would
+    if name in INTEGER_ARGUMENTS and isinstance(value, str) and value.strip().isdigit():
+        return int(value)
+    return value
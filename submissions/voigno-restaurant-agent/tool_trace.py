@@ -0,0 +1,145 @@
+import hashlib
+import json
+import os
+import queue
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from loguru import logger
+
+# Arguments holding a caller's phone number; traces keep a salted hash instead
+PHONE_ARGUMENTS = {"customer_phone"}
+
+
+class ToolTraceFile:
+    """
+    Append-only JSON-lines file of the tool calls of every call in a container.
+
+    One compact line per completed tool call:
+
+        {"ts": 1760870000.123, "call": "CA...", "tool": "book_table",
+         "args": {...}, "ms": 12.5, "bytes": 96, "cached": false}
+
+    `ts` is the wall-clock start of the tool call, `ms` the time from agno's
+    ToolCallStarted to its ToolCallCompleted event, `bytes` the UTF-8 size of the
+    result, and `cached` whether ToolResultCache answered it (null if the tool
+    doesn't go through the cache). Phone numbers in the arguments are replaced
+    by a pseudonym that is stable within the file, so a caller's calls still
+    line up. Records are queued and written by a thread of their own, started
+    on the first record, so the event loop never waits for the disk and no file
+    or thread is held in a memory snapshot; `close` (server shutdown) writes
+    what is still queued. benchmarks/tool_trace_replay.py replays a trace
+    against a toolkit backend.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._salt = os.urandom(16)
+        self._queue: "queue.SimpleQueue[Optional[str]]" = queue.SimpleQueue()
+        self._writer: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self.records = 0
+
+    def for_call(self, call_id: str) -> "ToolTrace":
+        return ToolTrace(self, call_id)
+
+    def pseudonym(self, phone: str) -> str:
+        digest = hashlib.sha256(self._salt + str(phone).encode()).hexdigest()
+        return f"+1555{int(digest, 16) % 10**7:07d}"
+
+    def write(self, record: Dict[str, Any]):
+        """Queue a record; returns immediately."""
+        with self._lock:
+            if self._writer is None:
+                self._writer = threading.Thread(
+                    target=self._write_lines, name="tool-trace", daemon=True
+                )
+                self._writer.start()
+        self._queue.put(json.dumps(record, separators=(",", ":"), default=str))
+
+    def close(self, timeout: float = 5.0):
+        """Write the queued records and close the file."""
+        with self._lock:
+            writer, self._writer = self._writer, None
+        if writer is None:
+            return
+        self._queue.put(None)
+        writer.join(timeout)
+
+    def _write_lines(self):
+        file = None
+        while True:
+            line = self._queue.get()
+            if line is None:
+                break
+            try:
+                if file is None:
+                    directory = os.path.dirname(self.path)
+                    if directory:
+                        os.makedirs(directory, exist_ok=True)
+                    file = open(self.path, "a", encoding="utf-8")
+                file.write(line + "\n")
+                file.flush()
+                self.records += 1
+            except OSError as e:
+                # A full disk must not break the calls
+                logger.warning(f"Tool trace write to {self.path} failed: {e}")
+        if file is not None:
+            file.close()
+
+
+class ToolTrace:
+    """The tool calls of one call, as AgentLLM pushes their frames."""
+
+    def __init__(self, trace_file: ToolTraceFile, call_id: str):
+        self._file = trace_file
+        self.call_id = call_id
+        self._started: Dict[str, tuple] = {}
+
+    def started(self, tool_call_id: str):
+        self._started[tool_call_id] = (time.time(), time.monotonic())
+
+    def completed(
+        self,
+        tool_call_id: str,
+        function_name: str,
+        arguments: Dict[str, Any],
+        result: Any,
+        cached: Optional[bool] = None,
+    ):
+        now = time.monotonic()
+        started_at, started = self._started.pop(tool_call_id, (time.time(), now))
+        self._file.write(
+            {
+                "ts": round(started_at, 3),
+                "call": self.call_id,
+                "tool": function_name,
+                "args": {
+                    name: (
+                        self._file.pseudonym(value)
+                        if name in PHONE_ARGUMENTS and value
+                        else value
+                    )
+                    for name, value in (arguments or {}).items()
+                },
+                "ms": round((now - started) * 1000, 2),
+                "bytes": len(str(result).encode()),
+                "cached": cached,
+            }
+        )
+
+
+def read_trace(path: str) -> List[Dict[str, Any]]:
+    """The records of a trace file, oldest first; a torn last line is skipped."""
+    records = []
+    with open(path, encoding="utf-8") as file:
+        for line in file:
+            if not line.strip():
+                continue
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError:
+                logger.warning(f"Skipping unreadable tool trace line in {path}")
+    records.sort(key=lambda record: record["ts"])
+    return records
@@ -0,0 +1,211 @@
+import json
+from collections import deque
+from dataclasses import asdict, dataclass, field
+from typing import Callable, Dict, List, Optional, Sequence
+
+from loguru import logger
+from pipecat.frames.frames import (
+    LLMMessagesFrame,
+    LLMTextFrame,
+    OutputAudioRawFrame,
+    TranscriptionFrame,
+    TTSAudioRawFrame,
+    UserStartedSpeakingFrame,
+    UserStoppedSpeakingFrame,
+)
+from pipecat.observers.base_observer import BaseObserver, FramePushed
+from pipecat.processors.frame_processor import FrameProcessor
+
+# Stages of a turn, in order; each is the time from the previous milestone
+STAGES = (
+    "transcript",
+    "aggregation",
+    "llm_first_token",
+    "tts_first_audio",
+    "first_write",
+)
+
+
+@dataclass
+class TurnLatency:
+    """
+    Timing of one turn, from the caller going quiet to the first reply audio
+    written to the Twilio websocket. Stage durations are in milliseconds; a stage
+    the turn never reached (e.g. the caller interrupted) is None.
+
+    - transcript: VAD stop to the last final transcript of the turn. Deepgram
+      often finalizes before the VAD stops, which counts as 0.
+    - aggregation: to AgentMessageAggregator pushing the user message
+    - llm_first_token: to the first text of the reply, from the LLM or the FAQ
+      responder (`answered_by`)
+    - tts_first_audio: to the first audio from the TTS service
+    - first_write: to the first audio the output transport sent afterwards
+    """
+
+    call_sid: str
+    turn: int
+    answered_by: Optional[str] = None
+    stages: Dict[str, Optional[float]] = field(default_factory=dict)
+    total_ms: Optional[float] = None
+    complete: bool = False
+
+
+class TurnLatencyStats:
+    """
+    Turn latency records of the container's recent calls, aggregated into
+    p50/p95/p99 per stage.
+
+    Args:
+        window: Turns kept for the percentiles
+        calls: Calls whose turns are kept for `turns`
+    """
+
+    def __init__(self, window: int = 500, calls: int = 50):
+        self._turns: deque[TurnLatency] = deque(maxlen=window)
+        self._by_call: Dict[str, List[TurnLatency]] = {}
+        self._calls = calls
+
+    def record(self, turn: TurnLatency):
+        self._turns.append(turn)
+        if turn.call_sid not in self._by_call and len(self._by_call) >= self._calls:
+            del self._by_call[next(iter(self._by_call))]
+        self._by_call.setdefault(turn.call_sid, []).append(turn)
+
+    def turns(self, call_sid: str) -> List[dict]:
+        return [asdict(turn) for turn in self._by_call.get(call_sid, [])]
+
+    def stats(self) -> dict:
+        complete = [turn for turn in self._turns if turn.complete]
+        stats = {
+            stage: _percentiles([turn.stages.get(stage) for turn in complete])
+            for stage in STAGES
+        }
+        stats["total"] = _percentiles([turn.total_ms for turn in complete])
+        return {
+            "turns": len(self._turns),
+            "incomplete": len(self._turns) - len(complete),
+            "stages_ms": stats,
+        }
+
+
+class TurnLatencyObserver(BaseObserver):
+    """
+    Pipeline observer that times every turn of a call (see TurnLatency) and
+    passes the record to `on_turn`.
+
+    Frames are attributed by the processor that pushed them, so a frame passing
+    through later processors is only counted once, and cached filler audio from
+    the phrase player is not mistaken for the reply.
+
+    Args:
+        call_sid: Call the turns belong to
+        vad: Processor pushing UserStarted/StoppedSpeakingFrame (transport.input())
+        stt: Speech-to-text service
+        aggregator: AgentMessageAggregator
+        responders: Processors whose text answers a turn (LLM, FAQ responder)
+        tts: Text-to-speech service
+        output: transport.output()
+        on_turn: Called with every finished or abandoned turn
+    """
+
+    def __init__(
+        self,
+        *,
+        call_sid: str,
+        vad: FrameProcessor,
+        stt: FrameProcessor,
+        aggregator: FrameProcessor,
+        responders: Sequence[FrameProcessor],
+        tts: FrameProcessor,
+        output: FrameProcessor,
+        on_turn: Callable[[TurnLatency], None],
+    ):
+        self._call_sid = call_sid
+        self._vad = vad
+        self._stt = stt
+        self._aggregator = aggregator
+        self._responders = list(responders)
+        self._tts = tts
+        self._output = output
+        self._on_turn = on_turn
+        self._turn = 0
+        self._milestones: Dict[str, int] = {}
+        self._answered_by: Optional[str] = None
+
+    async def on_push_frame(self, data: FramePushed):
+        source, frame, now = data.source, data.frame, data.timestamp
+        reached = self._milestones
+
+        if source is self._vad and isinstance(frame, UserStartedSpeakingFrame):
+            if "aggregation" in reached:
+                # The caller interrupted a reply still in progress
+                self._emit()
+            else:
+                # The caller only paused; the turn ends at the next VAD stop
+                reached.pop("vad_stop", None)
+        elif source is self._vad and isinstance(frame, UserStoppedSpeakingFrame):
+            if "aggregation" not in reached:
+                reached["vad_stop"] = now
+        elif source is self._stt and isinstance(frame, TranscriptionFrame):
+            if "aggregation" not in reached:
+                reached["transcript"] = now
+        elif source is self._aggregator and isinstance(frame, LLMMessagesFrame):
+            if "aggregation" in reached:
+                # A late transcript started another reply to the same utterance
+                self._emit()
+                self._milestones = {
+                    k: v for k, v in reached.items() if k in ("vad_stop", "transcript")
+                }
+            self._milestones["aggregation"] = now
+        elif isinstance(frame, LLMTextFrame) and source in self._responders:
+            if "aggregation" in reached and "llm_first_token" not in reached:
+                reached["llm_first_token"] = now
+                self._answered_by = source.name
+        elif source is self._tts and isinstance(frame, TTSAudioRawFrame):
+            if "llm_first_token" in reached and "tts_first_audio" not in reached:
+                reached["tts_first_audio"] = now
+        elif source is self._output and isinstance(frame, OutputAudioRawFrame):
+            if "tts_first_audio" in reached:
+                reached["first_write"] = now
+                self._emit()
+
+    def _emit(self):
+        reached, self._milestones = self._milestones, {}
+        self._turn += 1
+        turn = TurnLatency(
+            call_sid=self._call_sid, turn=self._turn, answered_by=self._answered_by
+        )
+        self._answered_by = None
+
+        start = reached.get("vad_stop")
+        previous = start
+        for stage in STAGES:
+            at = reached.get(stage)
+            if at is None:
+                turn.stages[stage] = None
+                continue
+            if stage == "transcript":
+                # Transcripts that arrived while the caller was still talking
+                at = max(at, start) if start is not None else None
+            if at is not None and previous is not None:
+                turn.stages[stage] = round((at - previous) / 1e6, 1)
+            else:
+                turn.stages[stage] = None
+            previous = at if at is not None else previous
+
+        turn.complete = start is not None and "first_write" in reached
+        if turn.complete:
+            turn.total_ms = round((reached["first_write"] - start) / 1e6, 1)
+        logger.info(f"Turn latency: {json.dumps(asdict(turn))}")
+        self._on_turn(turn)
+
+
+def _percentiles(values: List[Optional[float]]) -> Dict[str, float]:
+    ordered = sorted(value for value in values if value is not None)
+    if not ordered:
+        return {}
+
+    def at(q: float) -> float:
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    return {"p50_ms": at(0.5), "p95_ms": at(0.95), "p99_ms": at(0.99)}
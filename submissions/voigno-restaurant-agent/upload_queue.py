@@ -0,0 +1,203 @@
+import asyncio
+import glob
+import os
+import random
+import time
+from typing import Optional
+
+from loguru import logger
+
+from audio_s3 import StreamingS3Recorder
+
+
+class RecordingUploadQueue:
+    """
+    Finish call recordings in the background so call teardown never waits on S3.
+
+    `submit` hands over a recorder when a call ends and returns straight away.
+    A few workers close each recorder and upload the rest of it, retrying with
+    exponential backoff and jitter. Recordings that can't be uploaded after
+    `max_attempts`, or that arrive while `max_in_memory` are already waiting,
+    are spilled to `spill_dir`, so a slow or unavailable S3 costs disk, not
+    memory. Nothing in a container reads its spills back: `upload_spilled`
+    uploads them later, which needs `spill_dir` to outlive the container (on
+    Modal, a subdirectory of the Volume app.py mounts).
+
+    Args:
+        max_concurrent: Recordings uploaded at the same time
+        max_in_memory: Recordings waiting in memory before new ones are spilled
+        max_attempts: Upload attempts before a recording is spilled
+        base_delay: Seconds before the first retry, doubled on each attempt
+        max_delay: Upper bound of the retry delay in seconds
+        spill_dir: Directory for recordings that can't be uploaded yet
+    """
+
+    def __init__(
+        self,
+        max_concurrent: int = 2,
+        max_in_memory: int = 8,
+        max_attempts: int = 5,
+        base_delay: float = 1.0,
+        max_delay: float = 30.0,
+        spill_dir: Optional[str] = None,
+    ):
+        self.max_concurrent = max_concurrent
+        self.max_in_memory = max_in_memory
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.spill_dir = spill_dir
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._workers = []
+        self._spilling = set()
+        self.uploaded = 0
+        self.failed = 0
+        self.spilled = 0
+
+    def start(self):
+        """Start the workers."""
+        if self._workers:
+            return
+        self._workers = [
+            asyncio.create_task(self._worker()) for _ in range(self.max_concurrent)
+        ]
+
+    def submit(self, recorder: StreamingS3Recorder):
+        """Queue a finished call's recording for upload; never blocks."""
+        if self._queue.qsize() >= self.max_in_memory and self.spill_dir:
+            logger.warning(f"Upload queue full, spilling {recorder.uri} to disk")
+            self._spill_in_background(recorder)
+            return
+        self._queue.put_nowait(recorder)
+
+    @property
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    async def drain(self, timeout: float = 20.0, spill_timeout: float = 5.0):
+        """
+        Wait up to `timeout` seconds for queued uploads on shutdown, then spill
+        whatever is left for `upload_spilled`. Cancelled workers get up to
+        `spill_timeout` seconds to spill the recording in hand.
+        """
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning(
+                f"Upload queue not drained after {timeout}s, spilling {self.pending} recordings"
+            )
+        workers, self._workers = self._workers, []
+        for worker in workers:
+            worker.cancel()
+        if workers:
+            # A cancelled worker spills its recording before it exits
+            _, unfinished = await asyncio.wait(workers, timeout=spill_timeout)
+            if unfinished:
+                logger.error(
+                    f"{len(unfinished)} upload worker(s) still spilling after {spill_timeout}s"
+                )
+
+        while not self._queue.empty():
+            await self._spill(self._queue.get_nowait())
+            self._queue.task_done()
+        if self._spilling:
+            await asyncio.gather(*self._spilling, return_exceptions=True)
+        logger.info(
+            f"Upload queue stopped: {self.uploaded} uploaded, {self.spilled} spilled, {self.failed} failed"
+        )
+
+    async def _worker(self):
+        while True:
+            recorder = await self._queue.get()
+            try:
+                await self._upload(recorder)
+            except asyncio.CancelledError:
+                await self._spill(recorder)
+                raise
+            except Exception as e:
+                logger.error(f"Error uploading recording {recorder.uri}: {e}")
+                self.failed += 1
+            finally:
+                self._queue.task_done()
+
+    async def _upload(self, recorder: StreamingS3Recorder):
+        await recorder.close()
+        if recorder.data_size == 0:
+            logger.info(f"No audio recorded for {recorder.uri}, skipping upload")
+            await recorder.abort()
+            return
+
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                uri = await recorder.upload()
+                self.uploaded += 1
+                logger.info(f"Saved {recorder.data_size} bytes of audio to {uri}")
+                return
+            except Exception as e:
+                if attempt == self.max_attempts:
+                    logger.error(
+                        f"Giving up on {recorder.uri} after {attempt} attempts: {e}"
+                    )
+                    break
+                delay = min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+                delay *= random.uniform(0.5, 1.0)
+                logger.warning(
+                    f"Upload of {recorder.uri} failed (attempt {attempt}), retrying in {delay:.1f}s: {e}"
+                )
+                await asyncio.sleep(delay)
+
+        if not await self._spill(recorder):
+            self.failed += 1
+
+    def _spill_in_background(self, recorder: StreamingS3Recorder):
+        task = asyncio.create_task(self._spill(recorder))
+        self._spilling.add(task)
+        task.add_done_callback(self._spilling.discard)
+
+    async def _spill(self, recorder: StreamingS3Recorder) -> bool:
+        if not self.spill_dir:
+            logger.error(f"Dropping recording {recorder.uri}: no spill directory")
+            return False
+        try:
+            await recorder.close()
+            if recorder.data_size == 0:
+                await recorder.abort()
+                return True
+            path = await recorder.spill()
+            self.spilled += 1
+            logger.info(f"Spilled recording {recorder.uri} to {path}")
+            return True
+        except Exception as e:
+            logger.error(f"Could not spill recording {recorder.uri}: {e}")
+            return False
+
+
+async def upload_spilled(
+    spill_root: str, timeout: float = 300.0, min_age: float = 60.0
+) -> RecordingUploadQueue:
+    """
+    Upload the recordings spilled under `spill_root`, one subdirectory per
+    container, and remove the subdirectories left empty. Recordings that fail
+    again are spilled back in place for the next run. Manifests younger than
+    `min_age` seconds are left alone, as their audio may not have been written
+    out (or committed to the Volume) yet.
+
+    Never run two at once over the same directory, or a recording can be
+    uploaded twice; app.py runs it as a scheduled function on one container.
+    """
+    queue = RecordingUploadQueue(spill_dir=spill_root)
+    queue.start()
+    for path in sorted(glob.glob(os.path.join(spill_root, "*", "*.json"))):
+        if time.time() - os.path.getmtime(path) < min_age:
+            continue
+        try:
+            queue.submit(StreamingS3Recorder.load(path))
+            logger.info(f"Resuming spilled recording {path}")
+        except Exception as e:
+            logger.error(f"Could not load spilled recording {path}: {e}")
+    await queue.drain(timeout=timeout)
+
+    for directory in glob.glob(os.path.join(spill_root, "*", "")):
+        if not os.listdir(directory):
+            os.rmdir(directory)
+    return queue